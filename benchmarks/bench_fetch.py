@@ -0,0 +1,100 @@
+"""Spot-switch fetch latency against a local stub Open-Meteo server.
+
+Compares the old path (two sequential ``requests.get`` calls, each on a new
+connection) with ``surfcast.fetch.fetch_responses`` (concurrent requests on
+the shared keep-alive session). The stub server sleeps on every new connection to
+stand in for the TCP/TLS handshake and on every request for the round trip.
+
+    python benchmarks/bench_fetch.py [--rounds 20] [--rtt-ms 40] [--handshake-ms 80]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from surfcast import fetch, net
+
+STUB_BODY = json.dumps({
+    "hourly": {"time": [f"2024-01-01T{h:02d}:00" for h in range(24)],
+               "wave_height": [1.0] * 24, "temperature_2m": [20.0] * 24},
+    "daily": {"time": ["2024-01-01"], "sunrise": ["2024-01-01T06:00"],
+              "sunset": ["2024-01-01T18:00"], "temperature_2m_max": [25.0],
+              "temperature_2m_min": [15.0], "weather_code": [1]},
+}).encode()
+
+
+def make_handler(rtt, handshake):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            time.sleep(handshake)
+            super().setup()
+
+        def do_GET(self):
+            time.sleep(rtt)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(STUB_BODY)))
+            self.end_headers()
+            self.wfile.write(STUB_BODY)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def sequential_fetch(lat, lng, days):
+    """The pre-session fetch path: two requests, one after the other"""
+    marine = requests.get(net.build_marine_url([lat], [lng], days), timeout=15)
+    weather = requests.get(net.build_weather_url([lat], [lng], days), timeout=15)
+    return marine, weather
+
+
+def measure(fetch_pair, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        marine, weather = fetch_pair(34.0195, -118.4912, 3)
+        assert marine.status_code == 200 and weather.status_code == 200
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=40)
+    parser.add_argument("--handshake-ms", type=float, default=80)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0),
+                                 make_handler(args.rtt_ms / 1000, args.handshake_ms / 1000))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    net.MARINE_API_URL = f"{base}/v1/marine"
+    net.WEATHER_API_URL = f"{base}/v1/forecast"
+
+    results = {
+        "sequential, new connections": measure(sequential_fetch, args.rounds),
+        "concurrent, shared session": measure(fetch.fetch_responses, args.rounds),
+    }
+    server.shutdown()
+
+    for name, samples in results.items():
+        print(f"{name:<30} median {statistics.median(samples):7.1f} ms   "
+              f"min {min(samples):7.1f} ms   max {max(samples):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Parse and aggregate throughput, in-process against the process pool.
+
+Decodes, processes and aggregates the recorded 16-day fixtures for many
+locations, first in this process and then through a ``ParsePool`` with
+1, 2, ... up to one worker per core, and reports locations per second.
+Pool start-up is excluded: each pool is warmed before it is timed.
+
+    python benchmarks/bench_parse_pool.py [--locations 500] [--days 16] [--rounds 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from surfcast.aggregate import forecast_summary
+from surfcast.fetch import parse_location
+from surfcast.pool import ParsePool
+
+from stub import fixture_bytes
+
+
+def in_process(items):
+    for marine, weather in items:
+        yield parse_location(marine, weather)
+
+
+def measure(parse, items, rounds):
+    """Median locations per second, summaries included"""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for data in parse(iter(items)):
+            forecast_summary(data)
+        samples.append(len(items) / (time.perf_counter() - start))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=500)
+    parser.add_argument("--days", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    items = [(fixture_bytes('marine', args.days), fixture_bytes('forecast', args.days))] * args.locations
+    baseline = measure(in_process, items, args.rounds)
+    print(f"{'in-process':<12} {baseline:7.0f} locations/s")
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        pool = ParsePool(workers)
+        try:
+            list(pool.imap(items[:workers * 2]))
+            rate = measure(pool.imap, items, args.rounds)
+        finally:
+            pool.close()
+        print(f"{workers:>2} workers   {rate:7.0f} locations/s   {rate / baseline:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Time from launching the app to its first painted frame.
+
+Starts ``python -m waves`` offscreen with SURFCAST_PROFILE_STARTUP=exit,
+which quits right after the first paint, and measures wall time from
+spawn to the app's startup report, interpreter start-up included. Each
+run gets a fresh settings directory, either empty or with the default
+spot's forecast already cached from the recorded fixtures.
+
+    python benchmarks/bench_startup.py [--rounds 10] [--target-ms 300]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from surfcast.cache import ForecastCache
+from surfcast.manager import fetch_days
+
+from stub import fixture_bytes
+
+# Mirrors waves.DEFAULT_SPOT, without importing Qt here
+DEFAULT_LAT, DEFAULT_LNG, DEFAULT_DAYS = 34.0195, -118.4912, 3
+
+
+def seed_cache(config_dir, days=DEFAULT_DAYS):
+    """Cache the default spot's forecast where the app will look for it"""
+    days = fetch_days(days)
+    cache = ForecastCache(os.path.join(config_dir, "SurfCast", "forecast_cache.sqlite3"))
+    cache.put(DEFAULT_LAT, DEFAULT_LNG, days, fixture_bytes('marine', days), fixture_bytes('forecast', days))
+
+
+def launch(cached):
+    """Seconds from spawn to first paint, and the app's own report line"""
+    with tempfile.TemporaryDirectory(prefix="surfcast-startup-") as config_dir:
+        if cached:
+            seed_cache(config_dir)
+        env = dict(os.environ, QT_QPA_PLATFORM="offscreen", XDG_CONFIG_HOME=config_dir,
+                   SURFCAST_PROFILE_STARTUP="exit")
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-m", "waves"], cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        report = None
+        for line in process.stderr:
+            if line.startswith("startup:"):
+                elapsed = time.perf_counter() - start
+                report = line.strip()
+                break
+        process.wait(timeout=30)
+        if report is None:
+            raise RuntimeError(f"app exited with {process.returncode} before painting")
+        return elapsed, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=300,
+                        help="exit 1 if the cached median is slower (default: 300)")
+    args = parser.parse_args()
+
+    launch(False)  # warm the bytecode and OS file caches
+    medians = {}
+    for cached in (False, True):
+        samples = []
+        for _ in range(args.rounds):
+            elapsed, report = launch(cached)
+            samples.append(elapsed * 1000)
+        name = "cached last spot" if cached else "empty cache"
+        medians[cached] = statistics.median(samples)
+        print(f"{name:<18} median {medians[cached]:6.0f} ms   min {min(samples):6.0f} ms   "
+              f"max {max(samples):6.0f} ms   ({report})")
+
+    verdict = "within" if medians[True] <= args.target_ms else "over"
+    print(f"first paint with cached data is {verdict} the {args.target_ms:.0f} ms target")
+    return 0 if medians[True] <= args.target_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
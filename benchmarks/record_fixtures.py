@@ -0,0 +1,53 @@
+"""Record fresh API responses into benchmarks/fixtures/ for the benchmark suite.
+
+Fetches a 16-day marine and weather forecast for one spot and one
+Nominatim search from the live APIs. Re-record when upstream adds or
+changes variables, then save new baselines since timings will move.
+
+    python benchmarks/record_fixtures.py [--spot "Jaws, Maui"] [--query "santa cruz"]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from surfcast import net
+from surfcast.search import NOMINATIM_HEADERS, nominatim_url
+from surfcast.spots import POPULAR_SURF_SPOTS
+
+from stub import FIXTURES
+
+
+def fetch_json(url, headers=None):
+    response = net.get_http_session().get(url, headers=headers, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spot", default="Jaws, Maui", help="catalogue spot to record (default: Jaws, Maui)")
+    parser.add_argument("--query", default="santa cruz", help="Nominatim query to record")
+    args = parser.parse_args()
+
+    spot = next((spot for spot in POPULAR_SURF_SPOTS if spot['name'] == args.spot), None)
+    if spot is None:
+        parser.error(f"unknown spot {args.spot!r}")
+
+    responses = {
+        'marine': fetch_json(net.build_marine_url([spot['lat']], [spot['lng']], 16)),
+        'forecast': fetch_json(net.build_weather_url([spot['lat']], [spot['lng']], 16)),
+        'nominatim': fetch_json(nominatim_url(args.query), headers=NOMINATIM_HEADERS),
+    }
+    os.makedirs(FIXTURES, exist_ok=True)
+    for name, data in responses.items():
+        path = os.path.join(FIXTURES, f"{name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+        print(f"wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
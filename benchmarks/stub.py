@@ -0,0 +1,123 @@
+"""Local stand-in for the Open-Meteo and Nominatim APIs, serving recorded fixtures.
+
+The marine and forecast fixtures are single-location 16-day responses.
+Requests are answered with them cut to the requested forecast_days, one
+copy per requested coordinate, as a JSON array when several coordinates
+are given, exactly as upstream does. Nominatim searches get the recorded
+search response whatever the query.
+
+    with FixtureServer() as server:
+        server.install()  # point surfcast.net at the stub
+        ...
+"""
+import json
+import os
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from surfcast import net
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fixture_bytes(name, days):
+    """A recorded response cut to a number of forecast days, as JSON bytes"""
+    data = load_fixture(name)
+    for section, length in (('hourly', days * 24), ('daily', days)):
+        data[section] = {key: values[:length] for key, values in data[section].items()}
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+class FixtureServer:
+    """Threaded HTTP server answering API requests from the fixtures"""
+
+    def __init__(self, rtt=0.0):
+        self.rtt = rtt  # seconds slept before answering, to stand in for the network
+        self.requests = 0
+        self._bodies = {}
+        self._nominatim = json.dumps(load_fixture('nominatim')).encode()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def install(self):
+        """Point the surfcast API URLs at this server"""
+        net.MARINE_API_URL = f"{self.base_url}/v1/marine"
+        net.WEATHER_API_URL = f"{self.base_url}/v1/forecast"
+        net.NOMINATIM_API_URL = f"{self.base_url}/search"
+
+    def location_body(self, name, days):
+        """Fixture bytes without the coordinates, cached per API and day count"""
+        key = (name, days)
+        if key not in self._bodies:
+            data = json.loads(fixture_bytes(name, days))
+            del data['latitude'], data['longitude']
+            self._bodies[key] = json.dumps(data, separators=(',', ':')).encode()
+        return self._bodies[key]
+
+    def forecast_body(self, name, query):
+        days = int(query['forecast_days'][0])
+        rest = self.location_body(name, days)[1:]
+        items = [b'{"latitude":%s,"longitude":%s,' % (lat.encode(), lng.encode()) + rest
+                 for lat, lng in zip(query['latitude'][0].split(','), query['longitude'][0].split(','))]
+        return items[0] if len(items) == 1 else b'[' + b','.join(items) + b']'
+
+    def _handler(self):
+        server = self
+
+        class FixtureHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Send headers and body in one write; separate small writes stall on delayed ACKs
+            wbufsize = 64 * 1024
+
+            def do_GET(self):
+                server.requests += 1
+                url = urllib.parse.urlsplit(self.path)
+                query = urllib.parse.parse_qs(url.query)
+                if server.rtt:
+                    time.sleep(server.rtt)
+                if url.path == "/v1/marine":
+                    body = server.forecast_body('marine', query)
+                elif url.path == "/v1/forecast":
+                    body = server.forecast_body('forecast', query)
+                elif url.path == "/search":
+                    body = server._nominatim
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return FixtureHandler
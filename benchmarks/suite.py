@@ -0,0 +1,504 @@
+"""Benchmark suite over recorded API fixtures, with saved baselines.
+
+Covers JSON decoding, forecast processing, daily grouping and statistics,
+ranking and session scoring, spot search, batch fetches, tile lookups, the
+forecast archive, the Qt widget rebuilds, map rendering and the end-to-end
+spot switch, scaled from 1 to 1000 spots and from 3 to 16 forecast days.
+Network requests go to the local fixture server in stub.py, and the Qt
+cases run offscreen with a throwaway settings directory. Qt cases are
+skipped when PyQt5 is not installed.
+
+    python benchmarks/suite.py                      # run everything
+    python benchmarks/suite.py --quick -k search    # smaller scales, matching cases only
+    python benchmarks/suite.py --save main          # store results as a baseline
+    python benchmarks/suite.py --compare main       # exit 1 on any regression
+
+Baselines are JSON files in benchmarks/baselines/. A case regresses when
+its median is more than --tolerance slower than the baseline median and
+by more than the noise floor; compare on the machine that saved it.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from surfcast import decode
+from surfcast.aggregate import DailyAggregate, group_by_day
+from surfcast.archive import ForecastArchive, encode_frame
+from surfcast.cache import SearchCache
+from surfcast.cli import rank_forecasts
+from surfcast.fetch import iter_batch_forecasts
+from surfcast.frame import process_forecast
+from surfcast.rank import ForecastStack, best_sessions, score_hours
+from surfcast.search import search_catalogue, search_locations
+from surfcast.spots import POPULAR_SURF_SPOTS
+from surfcast.tiles import Region, TileStore
+
+from stub import FixtureServer, fixture_bytes
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+DAYS = (3, 7, 16)
+SPOTS = (1, 10, 100, 1000)
+QUICK = {'days': (3, 16), 'spots': (1, 10, 100)}
+
+TOLERANCE = 0.25  # fraction slower than baseline that counts as a regression
+NOISE_FLOOR = 0.0002  # seconds; differences below this are never regressions
+
+BENCHMARKS = []
+
+
+def benchmark(name, **params):
+    """Register a case; params map names to the values it is run with.
+
+    The decorated function does its setup and returns the callable to time.
+    """
+    def register(func):
+        BENCHMARKS.append((name, params, func))
+        return func
+    return register
+
+
+def make_spots(count):
+    """count distinct spots: the catalogue, then copies shifted 0.1° at a time"""
+    spots = []
+    for n in range(count):
+        spot = POPULAR_SURF_SPOTS[n % len(POPULAR_SURF_SPOTS)]
+        shift = 0.1 * (n // len(POPULAR_SURF_SPOTS))
+        spots.append({'name': f"{spot['name']} {n}", 'lat': round(spot['lat'] + shift, 4),
+                      'lng': round(spot['lng'] + shift, 4), 'type': spot['type'], 'swell': spot['swell']})
+    return spots
+
+
+def fixture_data(days):
+    return (decode.loads(fixture_bytes('marine', days)), decode.loads(fixture_bytes('forecast', days)))
+
+
+def processed(days):
+    data = process_forecast(*fixture_data(days))
+    data['hourly'].compact()
+    return data
+
+
+# Core
+
+
+@benchmark("decode", days=DAYS)
+def bench_decode(days):
+    marine, weather = fixture_bytes('marine', days), fixture_bytes('forecast', days)
+    return lambda: (decode.loads(marine), decode.loads(weather))
+
+
+@benchmark("process_data", days=DAYS)
+def bench_process_data(days):
+    marine, weather = fixture_data(days)
+
+    def run():
+        process_forecast(marine, weather)['hourly'].compact()
+    return run
+
+
+@benchmark("group_by_day", days=DAYS)
+def bench_group_by_day(days):
+    frame = processed(days)['hourly']
+    return lambda: group_by_day(frame)
+
+
+@benchmark("daily_aggregate", days=DAYS)
+def bench_daily_aggregate(days):
+    frame = processed(days)['hourly']
+    return lambda: DailyAggregate(frame)
+
+
+@benchmark("rank", spots=SPOTS, days=DAYS)
+def bench_rank(spots, days):
+    data = processed(days)
+    forecasts = [(spot, data) for spot in make_spots(spots)]
+    return lambda: rank_forecasts(forecasts)
+
+
+@benchmark("session_stack", spots=SPOTS, days=DAYS)
+def bench_session_stack(spots, days):
+    data = processed(days)
+    data['hourly'].compact()
+    spots = make_spots(spots)
+    return lambda: ForecastStack(spots, [data] * len(spots))
+
+
+@benchmark("best_sessions", spots=SPOTS, days=DAYS)
+def bench_best_sessions(spots, days):
+    """Scoring every hour and picking the top 10 sessions, data already stacked"""
+    data = processed(days)
+    data['hourly'].compact()
+    stack = ForecastStack(make_spots(spots), [data] * spots)
+
+    def run():
+        score_hours(stack)
+        best_sessions(stack, 10)
+    return run
+
+
+@benchmark("search_catalogue", query=("pipe", "santa teresa", "uluwatoo"))
+def bench_search_catalogue(query):
+    return lambda: search_catalogue(query, SearchCache())
+
+
+@benchmark("search_nominatim")
+def bench_search_nominatim():
+    return lambda: search_locations("santa cruz lighthouse", SearchCache())
+
+
+@benchmark("batch_fetch", spots=SPOTS, days=DAYS)
+def bench_batch_fetch(spots, days):
+    spots = make_spots(spots)
+
+    def run():
+        received = sum(1 for _ in iter_batch_forecasts(spots, days))
+        assert received == len(spots)
+    return run
+
+
+_tile = None
+
+
+def stored_tile():
+    """A tile fetched once from the fixture server into a throwaway store"""
+    global _tile
+    if _tile is None:
+        store = TileStore(tempfile.mkdtemp(prefix="surfcast-tiles-"))
+        _tile = store.fetch(Region.containing(34.0, -118.5))
+    return _tile
+
+
+@benchmark("tile_interpolate", spots=SPOTS)
+def bench_tile_interpolate(spots):
+    """Forecasts for spots across a region, interpolated from its stored tile"""
+    tile = stored_tile()
+    region = tile.region
+    points = [(region.south + (region.north - region.south) * (n * 0.618 % 1),
+               region.west + (region.east - region.west) * (n * 0.382 % 1)) for n in range(spots)]
+
+    def run():
+        for lat, lng in points:
+            tile.forecast(lat, lng)
+    return run
+
+
+ARCHIVE_SPOT = (8.4069, -83.1358)
+_archive = None
+
+
+def seeded_archive(years=1):
+    """A throwaway archive holding one spot's 16-day forecast for every 6-hourly run"""
+    global _archive
+    if _archive is None:
+        import numpy as np
+        from surfcast.frame import HOURLY_COLUMNS, ForecastFrame
+
+        _archive = ForecastArchive(os.path.join(tempfile.mkdtemp(prefix="surfcast-archive-"), "archive.sqlite3"))
+        frame = processed(16)['hourly']
+        rng = np.random.default_rng(0)
+        fetched_at = time.time() - years * 365 * 86400
+        for _ in range(years * 365 * 4):
+            start = np.datetime64(int(fetched_at // 3600), 'h').astype('datetime64[m]')
+            columns = {name: np.round(frame.column(name) + rng.normal(0, 0.1, len(frame)), 2)
+                       if name.endswith(("height", "period")) else frame.column(name) for name in HOURLY_COLUMNS}
+            _archive.add(*ARCHIVE_SPOT, {'hourly': ForecastFrame.from_arrays(
+                start + np.arange(len(frame)) * np.timedelta64(60, 'm'), columns)}, fetched_at)
+            fetched_at += 6 * 3600
+    return _archive
+
+
+@benchmark("archive_encode", days=DAYS)
+def bench_archive_encode(days):
+    frame = processed(days)['hourly']
+    return lambda: encode_frame(frame)
+
+
+@benchmark("archive_history")
+def bench_archive_history():
+    """The last 5 runs of one spot out of a year of archived runs"""
+    archive = seeded_archive()
+    return lambda: archive.history(*ARCHIVE_SPOT, 5)
+
+
+@benchmark("archive_valid_time")
+def bench_archive_valid_time():
+    """Every archived forecast of one hour's wave height"""
+    import numpy as np
+
+    archive = seeded_archive()
+    when = np.datetime64(int(time.time() // 3600) - 30 * 24, 'h')
+    return lambda: archive.valid_time(*ARCHIVE_SPOT, when, ['wave_height'])
+
+
+# Qt widgets, offscreen
+
+_window = None
+
+
+def qt_window():
+    """The shared offscreen SurfCastApp, or None without PyQt5"""
+    global _window
+    if _window is None:
+        try:
+            from PyQt5.QtWidgets import QApplication
+        except ImportError:
+            return None
+        # Keep the app's settings, favorites and caches out of the user's profile
+        os.environ["XDG_CONFIG_HOME"] = tempfile.mkdtemp(prefix="surfcast-bench-")
+        app = QApplication.instance() or QApplication([sys.argv[0]])
+        import waves
+        _window = waves.SurfCastApp()
+        _window.resize(1200, 800)
+        _window.show()
+        # The startup fetch only begins after the first paint
+        wait_for(lambda: _window.surf_data is not None and not _window.progress_bar.isVisible())
+        _window.app = app
+    return _window
+
+
+def wait_for(condition, timeout=30):
+    from PyQt5.QtWidgets import QApplication
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("timed out waiting for the app")
+        QApplication.processEvents()
+        time.sleep(0.0002)
+
+
+@benchmark("widget_rebuild", days=DAYS)
+def bench_widget_rebuild(days):
+    window = qt_window()
+    if window is None:
+        return None
+    data = processed(days)
+
+    def run():
+        window.surf_data = data
+        window.update_ui_with_data()
+        window.repaint()
+    return run
+
+
+@benchmark("chart_render", days=DAYS)
+def bench_chart_render(days):
+    window = qt_window()
+    if window is None:
+        return None
+    window.tab_widget.setCurrentIndex(0)
+    window.wave_chart.set_frame(processed(days)['hourly'])
+
+    def run():
+        window.wave_chart.set_frame(window.wave_chart.frame)
+        window.wave_chart.repaint()
+    return run
+
+
+@benchmark("map_render")
+def bench_map_render():
+    """Colouring and drawing one hour of a tile, read from its memory map"""
+    window = qt_window()
+    if window is None:
+        return None
+    window.tab_widget.setCurrentWidget(window.map_tab)
+    wait_for(window.swell_map.isVisible)
+    tile = stored_tile()
+    hours = itertools.cycle(range(len(tile)))
+    window.swell_map.set_tile(tile)
+
+    def run():
+        window.swell_map.set_hour(next(hours))
+        window.swell_map.repaint()
+    return run
+
+
+@benchmark("forecast_table", spots=SPOTS)
+def bench_forecast_table(spots):
+    window = qt_window()
+    if window is None:
+        return None
+    window.tab_widget.setCurrentIndex(1)
+    frame = processed(7)['hourly']
+    series = [(spot['name'], frame) for spot in make_spots(spots)]
+
+    def run():
+        window.forecast_model.set_forecasts(series)
+        window.forecast_view.viewport().repaint()
+    return run
+
+
+@benchmark("spot_switch", cache=("cold", "warm"), days=DAYS)
+def bench_spot_switch(cache, days):
+    """Selecting a spot until its forecast is on screen, fetched or from cache"""
+    window = qt_window()
+    if window is None:
+        return None
+    window.tab_widget.setCurrentIndex(0)
+    window.selected_days = days
+    locations = (itertools.count() if cache == "cold" else itertools.repeat(0))
+    # Distinct model grid cells, so a cold switch never hits the cache
+    base_lat = 20.0 + days
+
+    def run():
+        n = next(locations)
+        previous = window.surf_data
+        window.current_location = {'lat': round(base_lat + 0.1 * (n % 100), 4),
+                                   'lng': round(-150.0 - 0.1 * (n // 100), 4)}
+        window.fetch_surf_data()
+        wait_for(lambda: window.surf_data is not previous and not window.progress_bar.isVisible())
+        window.repaint()
+
+    if cache == "warm":
+        run()
+    return run
+
+
+# Runner
+
+
+def cases(quick=False, keyword=None):
+    """Expand the registered benchmarks into (case id, name, kwargs, setup)"""
+    for name, params, func in BENCHMARKS:
+        values = [QUICK.get(key, options) if quick else options for key, options in params.items()]
+        for combination in itertools.product(*values):
+            kwargs = dict(zip(params, combination))
+            case_id = name + ("[" + ",".join(f"{k}={v}" for k, v in kwargs.items()) + "]" if kwargs else "")
+            if keyword is None or keyword in case_id:
+                yield case_id, name, kwargs, func
+
+
+def measure(run, min_time, min_rounds, max_rounds):
+    """Time repeated calls until min_time has passed, within the round limits"""
+    run()  # warm up caches and lazy imports
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_rounds and (len(samples) < min_rounds or
+                                         time.perf_counter() - started < min_time):
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'max': max(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'rounds': len(samples),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    import numpy
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'json_backend': decode.backend(),
+        'commit': commit,
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    return f"{seconds * 1000:.2f}ms" if seconds >= 0.001 else f"{seconds * 1e6:.1f}µs"
+
+
+def compare(results, baseline, tolerance):
+    """Rows of (case id, ratio, regressed) against a baseline's medians"""
+    rows = []
+    for case_id, result in results.items():
+        base = baseline['results'].get(case_id)
+        if base is None:
+            rows.append((case_id, None, False))
+            continue
+        ratio = result['median'] / base['median'] if base['median'] else float('inf')
+        regressed = (ratio > 1 + tolerance and
+                     result['median'] - base['median'] > NOISE_FLOOR)
+        rows.append((case_id, ratio, regressed))
+    return rows
+
+
+def baseline_path(name):
+    return name if name.endswith(".json") else os.path.join(BASELINES, f"{name}.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="keyword", help="only run cases whose id contains this text")
+    parser.add_argument("--quick", action="store_true", help="days 3 and 16 and up to 100 spots only")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend per case (default: 0.5)")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--rtt-ms", type=float, default=0, help="simulated network round trip (default: 0)")
+    parser.add_argument("--save", metavar="NAME", help="save results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help=f"allowed slowdown before a case fails --compare (default: {TOLERANCE})")
+    parser.add_argument("--list", action="store_true", help="list case ids and exit")
+    args = parser.parse_args(argv)
+
+    selected = list(cases(args.quick, args.keyword))
+    if args.list:
+        for case_id, *_ in selected:
+            print(case_id)
+        return 0
+    baseline = None
+    if args.compare:
+        with open(baseline_path(args.compare), encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    with FixtureServer(rtt=args.rtt_ms / 1000) as server:
+        server.install()
+        for case_id, name, kwargs, func in selected:
+            run = func(**kwargs)
+            if run is None:
+                print(f"{case_id:<44} skipped (PyQt5 not installed)")
+                continue
+            result = results[case_id] = measure(run, args.min_time, args.min_rounds, args.max_rounds)
+            line = (f"{case_id:<44} median {format_seconds(result['median']):>9}   "
+                    f"min {format_seconds(result['min']):>9}   rounds {result['rounds']:>4}")
+            base = baseline['results'].get(case_id) if baseline else None
+            if base:
+                line += f"   x{result['median'] / base['median']:.2f} vs baseline"
+            print(line, flush=True)
+
+    payload = {'environment': environment(), 'results': results}
+    if args.save:
+        os.makedirs(BASELINES, exist_ok=True)
+        with open(baseline_path(args.save), "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"saved baseline {baseline_path(args.save)}")
+    if baseline is None:
+        return 0
+
+    regressions = [row for row in compare(results, baseline, args.tolerance) if row[2]]
+    for case_id, ratio, _ in regressions:
+        print(f"REGRESSION {case_id}: {ratio:.2f}x the baseline median", file=sys.stderr)
+    if baseline['environment'].get('machine') != payload['environment']['machine']:
+        print("note: baseline was saved on a different machine type", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
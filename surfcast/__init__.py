@@ -0,0 +1,20 @@
+"""SurfCast core: forecast fetching, processing, caching and spot search.
+
+Nothing in this package imports Qt, so it can run headless. Submodules are
+not imported here, so ``python -m surfcast`` only pays for what it uses:
+
+- ``surfcast.net``: endpoints, URL builders and the shared HTTP session
+- ``surfcast.fetch``: single-spot and batched forecast fetching
+- ``surfcast.frame``: columnar ``ForecastFrame`` and response processing
+- ``surfcast.aggregate``: daily grouping and summaries
+- ``surfcast.pool``: optional process pool for parsing and aggregating batches
+- ``surfcast.rank``: vectorized best-session ranking across spots
+- ``surfcast.tiles``: regional marine forecast tiles with bilinear lookup
+- ``surfcast.manager``: coalescing, cancellable requests for interactive views
+- ``surfcast.archive``: append-only archive of past forecasts by grid cell and model run
+- ``surfcast.cache``: on-disk forecast cache and search result cache
+- ``surfcast.snapshot``: portable offline snapshots of the caches and map tiles
+- ``surfcast.spots``: the built-in spot catalogue
+- ``surfcast.search`` / ``surfcast.geo``: text and spatial spot lookup
+- ``surfcast.cli``: command-line entry point
+"""
@@ -0,0 +1,207 @@
+"""Daily aggregation of hourly forecasts"""
+from datetime import datetime
+
+import numpy as np
+
+from .frame import HOURLY_COLUMNS
+from .metrics import METRICS
+
+COMPASS_16 = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+              "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+
+
+def compass_point(degrees):
+    """Convert a direction in degrees to a 16-point compass label"""
+    if degrees is None:
+        return "N/A"
+    try:
+        index = int((degrees + 11.25) / 22.5) % 16
+        return COMPASS_16[index]
+    except (TypeError, ValueError):
+        return "N/A"
+
+
+# Direction columns and the magnitude that weights their circular mean
+DIRECTION_WEIGHTS = {
+    'wave_direction': 'wave_height',
+    'swell_direction': 'swell_height',
+    'wind_wave_direction': 'wind_wave_height',
+    'wind_direction': 'wind_speed',
+}
+PERCENTILES = (10, 50, 90)
+SCALAR_STATS = ('min', 'max', 'mean') + tuple(f'p{q}' for q in PERCENTILES) + ('count',)
+DIRECTION_STATS = ('mean', 'resultant', 'count')
+SCALAR_COLUMNS = tuple(name for name in HOURLY_COLUMNS if name not in DIRECTION_WEIGHTS)
+
+
+def day_bounds(hourly_data):
+    """Dates and [start, stop) row bounds of each day in a ForecastFrame"""
+    try:
+        days = hourly_data.timestamps.astype('datetime64[D]')
+    except ValueError:
+        days = np.array([], dtype='datetime64[D]')
+    if not len(days):
+        empty = np.array([], dtype=int)
+        return days, empty, empty
+    # Rows are in time order, so each day is one contiguous slice
+    boundaries = np.flatnonzero(days[1:] != days[:-1]) + 1
+    starts = np.concatenate([[0], boundaries]).astype(int)
+    stops = np.concatenate([boundaries, [len(days)]]).astype(int)
+    return days[starts], starts, stops
+
+
+def group_by_day(hourly_data):
+    """Split a ForecastFrame into per-day frames keyed by date"""
+    dates, starts, stops = day_bounds(hourly_data)
+    return {date.astype(datetime): hourly_data[start:stop]
+            for date, start, stop in zip(dates, starts, stops)}
+
+
+class DailyAggregate:
+    """Per-day statistics for every column of a ForecastFrame.
+
+    The hourly columns are laid out once as a (column, day, hour) block padded
+    with NaN, so min, max, mean and percentiles for all variables and days
+    are each a single NaN-aware reduction. Direction columns are summarised
+    by their circular mean, weighted by the matching height or speed, along
+    with the resultant length (1 when every hour agrees, 0 when spread out).
+    Statistics computed elsewhere, e.g. in a worker process, can be passed
+    in as the blocks returned by pack().
+    """
+
+    def __init__(self, hourly_data, packed=None):
+        self.frame = hourly_data
+        self.dates, self.starts, self.stops = day_bounds(hourly_data)
+        self.stats = {}
+        if packed is not None:
+            self._unpack(*packed)
+        elif len(self.dates):
+            with METRICS.span('aggregate.daily'):
+                self._aggregate()
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _aggregate(self):
+        lengths = self.stops - self.starts
+        day_index = np.repeat(np.arange(len(lengths)), lengths)
+        hour_index = np.arange(lengths.sum()) - self.starts[day_index]
+
+        def padded(columns):
+            block = np.full((len(columns), len(lengths), lengths.max()), np.nan)
+            block[:, day_index, hour_index] = [self.frame.column(name) for name in columns]
+            return block
+
+        scalars = SCALAR_COLUMNS
+        # Sorting puts each day's NaN padding last, so order statistics
+        # index straight into the first count values
+        ordered = np.sort(padded(scalars), axis=2)
+        counts = (~np.isnan(ordered)).sum(axis=2)
+        last = np.maximum(counts - 1, 0)[..., None]
+        results = [ordered[..., 0], np.take_along_axis(ordered, last, axis=2)[..., 0]]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            results.append(np.nansum(ordered, axis=2) / counts)
+        for q in PERCENTILES:
+            position = last * (q / 100)
+            below = np.take_along_axis(ordered, np.floor(position).astype(int), axis=2)
+            above = np.take_along_axis(ordered, np.ceil(position).astype(int), axis=2)
+            results.append((below + (above - below) * (position - np.floor(position)))[..., 0])
+        results.append(counts)
+        for i, name in enumerate(scalars):
+            self.stats[name] = dict(zip(SCALAR_STATS, (result[i] for result in results)))
+
+        directions = list(DIRECTION_WEIGHTS)
+        radians = np.radians(padded(directions))
+        weights = padded([DIRECTION_WEIGHTS[name] for name in directions])
+        valid = ~np.isnan(radians)
+        weights = np.where(valid & ~np.isnan(weights), weights, 0.0)
+        # Calm or missing magnitudes fall back to an unweighted mean
+        unweighted = weights.sum(axis=2, keepdims=True) <= 0
+        weights = np.where(unweighted, valid.astype(float), weights)
+        total = weights.sum(axis=2)
+        sin_sum = (weights * np.where(valid, np.sin(radians), 0.0)).sum(axis=2)
+        cos_sum = (weights * np.where(valid, np.cos(radians), 0.0)).sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(total > 0, np.round(np.degrees(np.arctan2(sin_sum, cos_sum)), 6) % 360, np.nan)
+            resultant = np.where(total > 0, np.hypot(sin_sum, cos_sum) / total, np.nan)
+        for i, name in enumerate(directions):
+            self.stats[name] = {'mean': mean[i], 'resultant': resultant[i], 'count': valid[i].sum(axis=1)}
+
+    def pack(self):
+        """Statistics as two float arrays: (column, stat, day) for scalars and for directions"""
+        if not self.stats:
+            days = len(self.dates)
+            return (np.full((len(SCALAR_COLUMNS), len(SCALAR_STATS), days), np.nan),
+                    np.full((len(DIRECTION_WEIGHTS), len(DIRECTION_STATS), days), np.nan))
+        return (np.array([[self.stats[name][stat] for stat in SCALAR_STATS] for name in SCALAR_COLUMNS],
+                         dtype=float),
+                np.array([[self.stats[name][stat] for stat in DIRECTION_STATS] for name in DIRECTION_WEIGHTS],
+                         dtype=float))
+
+    def _unpack(self, scalars, directions):
+        if not len(self.dates):
+            return
+        for block, names, stats in ((scalars, SCALAR_COLUMNS, SCALAR_STATS),
+                                    (directions, DIRECTION_WEIGHTS, DIRECTION_STATS)):
+            for name, rows in zip(names, block):
+                self.stats[name] = dict(zip(stats, rows))
+                self.stats[name]['count'] = rows[-1].astype(int)
+
+    def stat(self, name, stat):
+        """Per-day array of one statistic for one column"""
+        return self.stats[name][stat]
+
+    def index(self, date):
+        """Day index for a date, or None if the forecast does not cover it"""
+        i = int(np.searchsorted(self.dates, np.datetime64(date, 'D')))
+        return i if i < len(self.dates) and self.dates[i] == np.datetime64(date, 'D') else None
+
+    def day(self, i):
+        """The hourly frame of one day"""
+        return self.frame[int(self.starts[i]):int(self.stops[i])]
+
+    def day_stats(self, i):
+        """Every statistic of every column for one day, NaN as None"""
+        return {name: {stat: int(values[i]) if stat == 'count'
+                       else None if np.isnan(values[i]) else float(values[i])
+                       for stat, values in stats.items()}
+                for name, stats in self.stats.items()}
+
+    def summary(self, i):
+        """Wave range, mean wind and dominant swell direction for one day.
+
+        Returns None when the day has no usable wave, wind or swell data.
+        """
+        waves, winds = self.stats['wave_height'], self.stats['wind_speed']
+        swell = self.stats['swell_direction']
+        if not waves['count'][i] or not winds['count'][i] or not swell['count'][i]:
+            return None
+        return {
+            'min_wave': float(waves['min'][i]),
+            'max_wave': float(waves['max'][i]),
+            'avg_wind': float(winds['mean'][i]),
+            'swell_direction': float(swell['mean'][i]),
+        }
+
+
+def day_summary(day_data):
+    """Wave range, mean wind and dominant swell direction for one day.
+
+    Returns None when the day has no usable wave, wind or swell data.
+    """
+    aggregate = DailyAggregate(day_data)
+    return aggregate.summary(0) if len(aggregate) else None
+
+
+def forecast_summary(data):
+    """Current conditions and per-day summaries and statistics of a processed forecast"""
+    hourly = data['hourly']
+    aggregate = data.get('aggregate')
+    if aggregate is None:
+        aggregate = DailyAggregate(hourly)
+    return {
+        'current': hourly[0].to_dict() if len(hourly) else None,
+        'days': [dict(date=date.astype(datetime).isoformat(), **(aggregate.summary(i) or {}),
+                      stats=aggregate.day_stats(i))
+                 for i, date in enumerate(aggregate.dates)],
+    }
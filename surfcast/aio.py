@@ -0,0 +1,193 @@
+"""asyncio fetch engine with per-host concurrency and rate limits.
+
+All requests go through AsyncFetchEngine.get, which holds a semaphore for
+the upstream host and, where the host has a rate policy (Nominatim allows
+1 request per second), a token bucket. Requests submitted under a key
+cancel the previous request with that key, so a superseded spot switch or
+search never delivers a result.
+
+aiohttp is used when installed, so any number of in-flight requests share
+the event loop thread. Without it requests run on the shared requests
+session in net.HTTP_EXECUTOR. aiohttp is only imported by the first
+request, keeping it off the app's startup path.
+"""
+import asyncio
+import importlib.util
+import time
+import urllib.parse
+
+from . import net
+from .cache import SEARCH_CACHE
+from .decode import loads
+from .fetch import resolve_forecast, revalidation_headers
+from .metrics import METRICS
+from .search import (NOMINATIM_HEADERS, SearchError, nominatim_url, parse_nominatim, saved_results,
+                     search_catalogue, similar_spots, with_similar)
+
+HAVE_AIOHTTP = importlib.util.find_spec('aiohttp') is not None
+
+# Per-host (max concurrent requests, requests per second or None)
+HOST_LIMITS = {
+    'nominatim.openstreetmap.org': (1, 1.0),
+}
+DEFAULT_HOST_LIMIT = (6, None)
+
+
+def timing_trace_config():
+    """aiohttp trace hooks recording DNS and connection setup spans"""
+    import aiohttp
+    config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.host = params.url.host
+
+    def start(attr):
+        async def on_start(session, context, params):
+            setattr(context, attr, time.perf_counter())
+        return on_start
+
+    def end(attr, name):
+        async def on_end(session, context, params):
+            started = getattr(context, attr, None)
+            if started is not None:
+                METRICS.observe(name, time.perf_counter() - started, host=context.host)
+        return on_end
+
+    config.on_request_start.append(on_request_start)
+    config.on_dns_resolvehost_start.append(start('dns_start'))
+    config.on_dns_resolvehost_end.append(end('dns_start', 'http.dns'))
+    config.on_connection_create_start.append(start('connect_start'))
+    config.on_connection_create_end.append(end('connect_start', 'http.connect'))
+    return config
+
+
+class TokenBucket:
+    """Token-bucket rate limiter for coroutines"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncFetchEngine:
+    """Runs forecast and search requests as tasks on the current event loop"""
+
+    def __init__(self, host_limits=None):
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self._semaphores = {}
+        self._buckets = {}
+        self._tasks = {}
+        self._client = None
+
+    def _limits(self, host):
+        if host not in self._semaphores:
+            concurrency, rate = self.host_limits.get(host, DEFAULT_HOST_LIMIT)
+            self._semaphores[host] = asyncio.Semaphore(concurrency)
+            self._buckets[host] = TokenBucket(rate) if rate else None
+        return self._semaphores[host], self._buckets[host]
+
+    async def get(self, url, headers=None, timeout=15):
+        """GET a URL within its host's limits, returning (status, body bytes)"""
+        status, body, response_headers = await self.request(url, headers, timeout)
+        return status, body
+
+    async def request(self, url, headers=None, timeout=15):
+        """GET a URL within its host's limits, returning (status, body, response headers)"""
+        host = urllib.parse.urlsplit(url).hostname
+        semaphore, bucket = self._limits(host)
+        async with semaphore:
+            if bucket is not None:
+                await bucket.acquire()
+            if HAVE_AIOHTTP:
+                import aiohttp
+                if self._client is None:
+                    self._client = aiohttp.ClientSession(trace_configs=[timing_trace_config()])
+                start = time.perf_counter()
+                async with self._client.get(url, headers=headers,
+                                            timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    METRICS.observe('http.ttfb', time.perf_counter() - start, host=host)
+                    with METRICS.span('http.download', host=host):
+                        body = await response.read()
+                    return response.status, body, response.headers
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                net.HTTP_EXECUTOR,
+                lambda: net.get_http_session().get(url, headers=headers, timeout=timeout))
+            return response.status_code, response.content, response.headers
+
+    @METRICS.timed('fetch.forecast')
+    async def fetch_forecast(self, lat, lng, days=3, cache=None):
+        """Fetch and process one location's forecast, revalidating and updating cache if given"""
+        marine_headers, weather_headers = revalidation_headers(lat, lng, days, cache)
+        marine, weather = await asyncio.gather(
+            self.request(net.build_marine_url([lat], [lng], days), marine_headers),
+            self.request(net.build_weather_url([lat], [lng], days), weather_headers))
+        return resolve_forecast(lat, lng, days, cache, marine, weather)
+
+    async def search_locations(self, query, cache=None, offline=False):
+        """Search the catalogue, falling back to rate-limited Nominatim, then to expired results"""
+        cache = SEARCH_CACHE if cache is None else cache
+        results = search_catalogue(query, cache)
+        if results is not None:
+            return results
+        similar = similar_spots(query)
+        if offline:
+            return saved_results(query, cache, similar)
+
+        try:
+            status, body = await self.get(nominatim_url(query), headers=NOMINATIM_HEADERS, timeout=10)
+            if status != 200:
+                raise SearchError(f"Search API error: {status}")
+            results = parse_nominatim(loads(body))
+        except Exception:
+            stale = cache.get(query, stale=True)
+            if stale is not None:
+                return stale
+            if similar:
+                return similar
+            raise
+        results = with_similar(results, similar)
+        cache.put(query, results)
+        return results
+
+    def submit(self, key, coro):
+        """Schedule coro as a task, cancelling the previous task for key"""
+        previous = self._tasks.get(key)
+        if previous is not None and not previous.done():
+            previous.cancel()
+        task = asyncio.ensure_future(coro)
+        self._tasks[key] = task
+        task.add_done_callback(lambda done: self._tasks.get(key) is done and self._tasks.pop(key))
+        return task
+
+    def pending(self):
+        """Number of submitted tasks still running"""
+        return len(self._tasks)
+
+    def cancel(self, key):
+        task = self._tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    async def close(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
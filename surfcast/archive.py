@@ -0,0 +1,291 @@
+"""Append-only archive of fetched forecasts for hindcasts and accuracy analysis.
+
+Every forecast is kept per model grid cell and model run in one SQLite
+table clustered by (cell, run), with the first valid time indexed, so
+"the last five runs for this spot" and "every forecast made for this
+hour" are index range scans however many years are stored.
+
+Each forecast's hourly columns are stored in a compact columnar block.
+Values are quantized to the precision upstream reports them in, then
+each column is either delta encoded (a base value and the smallest
+integer type holding the hour-to-hour changes) or dictionary encoded
+(distinct values plus one byte per hour), whichever is smaller. Missing
+hours are a packed bitmask. The block is zlib-compressed. A 16-day
+forecast takes a few kilobytes against about 45 kB of raw JSON, and a
+refetch that returns the same forecast as the newest archived one is not
+stored again.
+
+Times are local to the spot, as fetched. Daily fields are not archived.
+"""
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .cache import ForecastCache
+from .frame import ForecastFrame
+from .metrics import METRICS
+
+# Archived columns and their decimal places; the order is part of the format
+ARCHIVE_COLUMNS = (
+    ('wave_height', 2), ('wave_direction', 0), ('wave_period', 2),
+    ('swell_height', 2), ('swell_direction', 0), ('swell_period', 2),
+    ('wind_wave_height', 2), ('wind_wave_direction', 0), ('wind_wave_period', 2),
+    ('temperature', 1), ('apparent_temp', 1), ('humidity', 0), ('precipitation', 0),
+    ('weather_code', 0), ('wind_speed', 1), ('wind_direction', 0), ('visibility', 0),
+)
+FORMAT_VERSION = 1
+
+# Column encodings; MASKED is set when a packed missing-value bitmask follows the header
+MISSING, DELTA, DICTIONARY = 0, 1, 2
+MASKED = 0x80
+INT_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+# Longest forecast archived, bounding the valid-time index scan
+MAX_HOURS = 16 * 24
+
+ArchivedForecast = namedtuple('ArchivedForecast', 'run fetched_at hourly')
+
+
+def _int_type(low, high):
+    return next(code for code, dtype in enumerate(INT_TYPES)
+                if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max)
+
+
+def encode_column(values, decimals):
+    """Encode one float column as bytes, choosing delta or dictionary encoding"""
+    missing = np.isnan(values)
+    if missing.all():
+        return struct.pack('<B', MISSING)
+    quantized = np.round(values * 10 ** decimals)
+    if missing.any():
+        # Carry the last value through gaps, and the first back through a leading one, so gaps cost nothing
+        positions = np.where(missing, -1, np.arange(len(values)))
+        np.maximum.accumulate(positions, out=positions)
+        positions[positions < 0] = np.argmax(~missing)
+        quantized = quantized[positions]
+    quantized = quantized.astype(np.int64)
+    flag = MASKED if missing.any() else 0
+    mask = np.packbits(missing).tobytes() if flag else b""
+
+    deltas = np.diff(quantized)
+    delta_code = _int_type(int(deltas.min(initial=0)), int(deltas.max(initial=0)))
+    delta_size = deltas.size * INT_TYPES[delta_code]().itemsize
+    uniques, indexes = np.unique(quantized, return_inverse=True)
+    if len(uniques) <= 256:
+        dictionary_code = _int_type(int(uniques[0]), int(uniques[-1]))
+        if len(uniques) * INT_TYPES[dictionary_code]().itemsize + len(indexes) < delta_size:
+            return (struct.pack('<BBH', DICTIONARY | flag, dictionary_code, len(uniques)) + mask +
+                    uniques.astype(INT_TYPES[dictionary_code]).tobytes() + indexes.astype(np.uint8).tobytes())
+    return (struct.pack('<BBq', DELTA | flag, delta_code, int(quantized[0])) + mask +
+            deltas.astype(INT_TYPES[delta_code]).tobytes())
+
+
+def decode_column(buffer, offset, hours, decimals, skip=False):
+    """Decode a column at offset, returning (values, next offset).
+
+    values is None for a column with no data, or when skip only steps over it.
+    """
+    encoding, = struct.unpack_from('<B', buffer, offset)
+    if encoding == MISSING:
+        return None, offset + 1
+    masked, encoding = encoding & MASKED, encoding & ~MASKED
+    if encoding == DELTA:
+        code, base = struct.unpack_from('<Bq', buffer, offset + 1)
+        offset += 10
+    else:
+        code, size = struct.unpack_from('<BH', buffer, offset + 1)
+        offset += 4
+    missing = None
+    if masked:
+        length = (hours + 7) // 8
+        missing = np.unpackbits(np.frombuffer(buffer, np.uint8, length, offset), count=hours).astype(bool)
+        offset += length
+    dtype = INT_TYPES[code]
+    if skip:
+        itemsize = np.dtype(dtype).itemsize
+        return None, offset + ((hours - 1) * itemsize if encoding == DELTA else size * itemsize + hours)
+    if encoding == DELTA:
+        deltas = np.frombuffer(buffer, dtype, hours - 1, offset)
+        offset += deltas.nbytes
+        quantized = np.empty(hours, dtype=np.int64)
+        quantized[0] = base
+        np.cumsum(deltas, out=quantized[1:])
+        quantized[1:] += base
+    else:
+        uniques = np.frombuffer(buffer, dtype, size, offset)
+        offset += uniques.nbytes
+        indexes = np.frombuffer(buffer, np.uint8, hours, offset)
+        offset += hours
+        quantized = uniques[indexes]
+    values = quantized / 10 ** decimals
+    if missing is not None:
+        values[missing] = np.nan
+    return values, offset
+
+
+def encode_frame(frame):
+    """(first valid time in epoch minutes, hours, compressed block) for an hourly ForecastFrame"""
+    minutes = frame.timestamps.astype('datetime64[m]').astype(np.int64)
+    hours = len(minutes)
+    if hours and not (np.diff(minutes) == 60).all():
+        raise ValueError("archived forecasts must be hourly without gaps")
+    block = [struct.pack('<BH', FORMAT_VERSION, hours)]
+    block += [encode_column(frame.column(name), decimals) for name, decimals in ARCHIVE_COLUMNS]
+    return int(minutes[0]) if hours else 0, hours, zlib.compress(b"".join(block), 9)
+
+
+def decode_columns(data, columns=None):
+    """Decode an encoded block to (hours, {column: values}), optionally only some columns"""
+    buffer = zlib.decompress(data)
+    version, hours = struct.unpack_from('<BH', buffer)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unknown archive format {version}")
+    arrays = {}
+    offset = 3
+    for name, decimals in ARCHIVE_COLUMNS:
+        values, offset = decode_column(buffer, offset, hours, decimals,
+                                       skip=columns is not None and name not in columns)
+        if values is not None:
+            arrays[name] = values
+    return hours, arrays
+
+
+def decode_frame(start, data, columns=None):
+    """Rebuild a ForecastFrame from an encoded block"""
+    hours, arrays = decode_columns(data, columns)
+    timestamps = np.datetime64(start, 'm') + np.arange(hours) * np.timedelta64(60, 'm')
+    return ForecastFrame.from_arrays(timestamps, arrays)
+
+
+class ForecastArchive:
+    """Append-only SQLite archive of hourly forecasts by grid cell and model run"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cells = {}
+        self._writer = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS cells (
+                id INTEGER PRIMARY KEY,
+                lat REAL NOT NULL,
+                lng REAL NOT NULL,
+                UNIQUE (lat, lng)
+            )""")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                cell INTEGER NOT NULL,
+                run INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                start INTEGER NOT NULL,
+                hours INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (cell, run)
+            ) WITHOUT ROWID""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS runs_valid ON runs (cell, start)")
+        self._db.commit()
+
+    def _cell(self, lat, lng, create=False):
+        """Row id of a location's grid cell, or None if it has no forecasts"""
+        key = ForecastCache.grid_cell(lat, lng)
+        cell = self._cells.get(key)
+        if cell is None:
+            if create:
+                self._db.execute("INSERT OR IGNORE INTO cells (lat, lng) VALUES (?, ?)", key)
+            row = self._db.execute("SELECT id FROM cells WHERE lat = ? AND lng = ?", key).fetchone()
+            if row is None:
+                return None
+            cell = self._cells[key] = row[0]
+        return cell
+
+    @METRICS.timed('archive.add')
+    def add(self, lat, lng, data, fetched_at=None):
+        """Archive a processed forecast; False if it adds nothing to the newest one stored"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        run = int(ForecastCache.model_run(fetched_at))
+        start, hours, block = encode_frame(data['hourly'])
+        if not hours:
+            return False
+        with self._lock:
+            cell = self._cell(lat, lng, create=True)
+            latest = self._db.execute(
+                "SELECT run, start, hours, data FROM runs WHERE cell = ? ORDER BY run DESC LIMIT 1",
+                (cell,)).fetchone()
+            if latest is not None:
+                # Unchanged upstream, or a shorter fetch within the same run
+                if latest[1:] == (start, hours, block) or (latest[0] == run and latest[2] >= hours):
+                    return False
+            self._db.execute(
+                "INSERT OR REPLACE INTO runs (cell, run, fetched_at, start, hours, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (cell, run, fetched_at, start, hours, block))
+            self._db.commit()
+        METRICS.inc('archive.stored')
+        return True
+
+    def add_async(self, lat, lng, data, fetched_at=None):
+        """Archive on a background writer thread, in submission order"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="surfcast-archive")
+        return self._writer.submit(self.add, lat, lng, data, fetched_at)
+
+    @METRICS.timed('archive.history')
+    def history(self, lat, lng, runs=5, columns=None):
+        """The newest archived forecasts for a location, newest first"""
+        with self._lock:
+            cell = self._cell(lat, lng)
+            rows = [] if cell is None else self._db.execute(
+                "SELECT run, fetched_at, start, data FROM runs WHERE cell = ? ORDER BY run DESC LIMIT ?",
+                (cell, runs)).fetchall()
+        return [ArchivedForecast(datetime.fromtimestamp(run, timezone.utc), fetched_at,
+                                 decode_frame(start, data, columns))
+                for run, fetched_at, start, data in rows]
+
+    @METRICS.timed('archive.valid_time')
+    def valid_time(self, lat, lng, when, columns=None):
+        """Every archived forecast of one local hour, oldest first.
+
+        Returns (run, hour, {column: value}) tuples, where hour is how far
+        into that forecast the valid time falls.
+        """
+        minute = int(np.datetime64(when, 'm').astype(np.int64))
+        with self._lock:
+            cell = self._cell(lat, lng)
+            rows = [] if cell is None else self._db.execute(
+                "SELECT run, start, hours, data FROM runs WHERE cell = ? AND start BETWEEN ? AND ? "
+                "ORDER BY run", (cell, minute - MAX_HOURS * 60, minute)).fetchall()
+        forecasts = []
+        for run, start, hours, data in rows:
+            index, offset = divmod(minute - start, 60)
+            if offset or index >= hours:
+                continue
+            arrays = decode_columns(data, columns)[1]
+            values = {name: float(arrays[name][index]) if name in arrays else float('nan')
+                      for name in (columns or [name for name, _ in ARCHIVE_COLUMNS])}
+            forecasts.append((datetime.fromtimestamp(run, timezone.utc), index, values))
+        return forecasts
+
+    def stats(self):
+        with self._lock:
+            cells, = self._db.execute("SELECT COUNT(*) FROM cells").fetchone()
+            runs, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM runs").fetchone()
+        return {'cells': cells, 'runs': runs, 'bytes': size}
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.shutdown()
+        with self._lock:
+            self._db.close()
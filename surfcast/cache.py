@@ -0,0 +1,363 @@
+"""Forecast and search result caches"""
+import os
+import json
+import math
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict, namedtuple
+
+from .decode import loads
+from .net import MARINE_DAILY, MARINE_HOURLY, WEATHER_DAILY, WEATHER_HOURLY
+
+CacheEntry = namedtuple('CacheEntry', 'marine_data weather_data fetched_at expires_at validators',
+                        defaults=(None,))
+
+
+class ForecastCache:
+    """Persistent forecast cache keyed by marine model grid cell.
+
+    Raw API responses are stored zlib-compressed in a SQLite file. Entries
+    expire at the next upstream model update but are never dropped for age,
+    so stale data can still be shown offline; the total size is bounded by
+    evicting the least recently used entries. ETag and Last-Modified
+    validators are kept with each entry for conditional revalidation.
+
+    Reads do not write: access times are held in memory and written in
+    one batch every FLUSH_READS reads, with the next write, or on flush().
+    """
+    GRID_RESOLUTION = 0.05  # degrees, finest Open-Meteo marine model
+    MODEL_UPDATE_INTERVAL = 6 * 3600  # seconds between upstream model runs
+    MAX_BYTES = 50 * 1024 * 1024
+    FLUSH_READS = 64
+
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._accessed = {}  # key -> last read time, not yet written
+        self._reads = 0  # reads since access times were last written
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS forecasts (
+                key TEXT PRIMARY KEY,
+                marine BLOB NOT NULL,
+                weather BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(forecasts)")]
+        if 'validators' not in columns:
+            self._db.execute("ALTER TABLE forecasts ADD COLUMN validators TEXT")
+        self._db.commit()
+
+    @classmethod
+    def grid_cell(cls, lat, lng):
+        """Snap a coordinate to the centre of its model grid cell"""
+        res = cls.GRID_RESOLUTION
+        return round(round(lat / res) * res, 4), round(round(lng / res) * res, 4)
+
+    @classmethod
+    def make_key(cls, lat, lng, days):
+        cell_lat, cell_lng = cls.grid_cell(lat, lng)
+        variables = hashlib.sha1("|".join(
+            [MARINE_HOURLY, MARINE_DAILY, WEATHER_HOURLY, WEATHER_DAILY]).encode()).hexdigest()[:8]
+        return f"{cell_lat:.4f}:{cell_lng:.4f}:{days}:{variables}"
+
+    @classmethod
+    def next_model_update(cls, timestamp):
+        interval = cls.MODEL_UPDATE_INTERVAL
+        return (math.floor(timestamp / interval) + 1) * interval
+
+    @classmethod
+    def model_run(cls, timestamp):
+        """Start of the upstream model run current at a timestamp"""
+        return cls.next_model_update(timestamp) - cls.MODEL_UPDATE_INTERVAL
+
+    @classmethod
+    def runs_behind(cls, fetched_at, now=None):
+        """How many model updates have come out since data was fetched"""
+        now = time.time() if now is None else now
+        return max(0, round((cls.model_run(now) - cls.model_run(fetched_at)) / cls.MODEL_UPDATE_INTERVAL))
+
+    def get(self, lat, lng, days):
+        """Return the CacheEntry for a location, fresh or stale, or None"""
+        key = self.make_key(lat, lng, days)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT marine, weather, fetched_at, expires_at, validators FROM forecasts WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            if now < row[3]:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            self._accessed[key] = now
+            self._reads += 1
+            if self._reads >= self.FLUSH_READS:
+                self._write_accessed()
+                self._db.commit()
+        marine, weather, fetched_at, expires_at, validators = row
+        return CacheEntry(loads(zlib.decompress(marine)), loads(zlib.decompress(weather)),
+                          fetched_at, expires_at, json.loads(validators) if validators else None)
+
+    def expiry(self, lat, lng, days):
+        """Return when a location's entry expires, or None if it is not cached"""
+        with self._lock:
+            row = self._db.execute("SELECT expires_at FROM forecasts WHERE key = ?",
+                                   (self.make_key(lat, lng, days),)).fetchone()
+        return row[0] if row else None
+
+    def get_validators(self, lat, lng, days):
+        """Return the stored {'marine': ..., 'weather': ...} validators, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT validators FROM forecasts WHERE key = ?",
+                                   (self.make_key(lat, lng, days),)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def put(self, lat, lng, days, marine_body, weather_body, fetched_at=None, validators=None):
+        """Store raw marine and weather response bodies for a location"""
+        self.put_many([(lat, lng, days, marine_body, weather_body)], fetched_at, validators)
+
+    def put_many(self, rows, fetched_at=None, validators=None):
+        """Store (lat, lng, days, marine body, weather body) rows in one transaction"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        values = []
+        for lat, lng, days, marine_body, weather_body in rows:
+            marine = zlib.compress(marine_body)
+            weather = zlib.compress(weather_body)
+            values.append((self.make_key(lat, lng, days), marine, weather, len(marine) + len(weather),
+                           fetched_at, self.next_model_update(fetched_at), fetched_at,
+                           json.dumps(validators) if validators else None))
+        if not values:
+            return
+        with self._lock:
+            self._write_accessed(skip={row[0] for row in values})
+            self._db.executemany(
+                "INSERT OR REPLACE INTO forecasts "
+                "(key, marine, weather, size, fetched_at, expires_at, accessed_at, validators) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values)
+            self._evict()
+            self._db.commit()
+
+    def touch(self, lat, lng, days, fetched_at=None):
+        """Mark an entry as confirmed current upstream, as after a 304 response"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        key = self.make_key(lat, lng, days)
+        with self._lock:
+            self._write_accessed(skip={key})
+            self._db.execute(
+                "UPDATE forecasts SET fetched_at = ?, expires_at = ?, accessed_at = ? WHERE key = ?",
+                (fetched_at, self.next_model_update(fetched_at), fetched_at, key))
+            self._db.commit()
+
+    def dump(self, keys=None):
+        """Stored rows as (key, marine, weather, fetched_at, validators), bodies still compressed"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, marine, weather, fetched_at, validators FROM forecasts").fetchall()
+        if keys is not None:
+            keys = set(keys)
+            rows = [row for row in rows if row[0] in keys]
+        return [(key, marine, weather, fetched_at, json.loads(validators) if validators else None)
+                for key, marine, weather, fetched_at, validators in rows]
+
+    def restore(self, key, marine, weather, fetched_at, validators=None):
+        """Store a row from dump() unless a newer one is already cached; True if stored"""
+        with self._lock:
+            row = self._db.execute("SELECT fetched_at FROM forecasts WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] >= fetched_at:
+                return False
+            self._write_accessed(skip={key})
+            self._db.execute(
+                "INSERT OR REPLACE INTO forecasts "
+                "(key, marine, weather, size, fetched_at, expires_at, accessed_at, validators) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, marine, weather, len(marine) + len(weather), fetched_at,
+                 self.next_model_update(fetched_at), time.time(),
+                 json.dumps(validators) if validators else None))
+            self._evict()
+            self._db.commit()
+        return True
+
+    def stats(self):
+        with self._lock:
+            size, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM forecasts").fetchone()
+            return {'hits': self.hits, 'stale_hits': self.stale_hits, 'misses': self.misses,
+                    'size': size, 'bytes': total}
+
+    def flush(self):
+        """Write pending access times"""
+        with self._lock:
+            if self._accessed:
+                self._write_accessed()
+                self._db.commit()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+    def _write_accessed(self, skip=()):
+        # Entries about to be rewritten get a new access time anyway
+        self._db.executemany("UPDATE forecasts SET accessed_at = ? WHERE key = ?",
+                             [(accessed_at, key) for key, accessed_at in self._accessed.items()
+                              if key not in skip])
+        self._accessed.clear()
+        self._reads = 0
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM forecasts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+                "SELECT key, size FROM forecasts ORDER BY accessed_at").fetchall():
+            self._db.execute("DELETE FROM forecasts WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    @staticmethod
+    def is_fresh(entry, now=None):
+        return (time.time() if now is None else now) < entry.expires_at
+
+
+def normalize_query(query):
+    """Canonical form of a search query: NFKC, case-folded, single-spaced"""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+class SearchCache:
+    """Thread-safe LRU cache of search results with expiry.
+
+    Queries are normalized so "Pipe", "pipe" and "pipe " share an entry.
+    When a path is given, entries are loaded from and saved to a JSON file
+    so geocoding results survive restarts. Expired entries are kept, like
+    stale forecasts, and can still be read with stale=True when offline.
+    Entries put with persist=False stay in memory only, and are left out of
+    the file and of dump().
+    """
+    MAX_ENTRIES = 512
+    TTL = 7 * 24 * 3600  # seconds; place coordinates rarely change
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES, ttl=TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._volatile = set()  # keys of entries never written to disk
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def get(self, query, stale=False):
+        """Return cached results for a query, or None; expired results too if stale"""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not stale and time.time() - entry[0] > self.ttl:
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, query, results, persist=True):
+        """Cache results for a query, saving to disk unless persist is False"""
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = (time.time(), results)
+            self._entries.move_to_end(key)
+            if persist:
+                self._volatile.discard(key)
+            else:
+                self._volatile.add(key)
+            self._trim()
+            if persist and self.path:
+                self._save()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'size': len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._volatile.clear()
+
+    def dump(self):
+        """Every entry as [query, stored at, results], oldest first"""
+        with self._lock:
+            return self._persistent()
+
+    def merge(self, entries):
+        """Add dump() entries newer than the ones held, saving once; returns how many were added"""
+        added = 0
+        with self._lock:
+            for key, stamp, results in sorted(entries, key=lambda entry: entry[1]):
+                current = self._entries.get(key)
+                if current is not None and current[0] >= stamp:
+                    continue
+                self._entries[key] = (stamp, results)
+                self._entries.move_to_end(key)
+                self._volatile.discard(key)
+                added += 1
+            self._trim()
+            if added and self.path:
+                self._save()
+        return added
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, stamp, results in saved:
+            self._entries[key] = (stamp, results)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _trim(self):
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            self._volatile.discard(key)
+            self.evictions += 1
+
+    def _persistent(self):
+        return [[key, stamp, results] for key, (stamp, results) in self._entries.items()
+                if key not in self._volatile]
+
+    def _save(self):
+        entries = self._persistent()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+# Cache for surf spot searches, shared by every search that is not given one
+SEARCH_CACHE = SearchCache()
@@ -0,0 +1,282 @@
+"""Command-line forecast collection: fetch, rank and report surf spots.
+
+    python -m surfcast bali --count 5 --days 5
+    python -m surfcast --near 36.96,-122.02 --radius 150 --json ranked.json
+    python -m surfcast pipeline --watch --json board.json
+    python -m surfcast hawaii --metrics surfcast.prom
+    python -m surfcast --near 21.6,-158.1 --radius 50 --days 7 --sessions 5
+    python -m surfcast pavones --count 1 --archive forecasts.sqlite3 --history 5
+    python -m surfcast --near 9.9,-85.7 --radius 80 --count 30 --days 16 --snapshot guanacaste.surfcast
+
+Heavy imports (NumPy, requests, the catalogue) happen inside main() so that
+argument parsing and --help stay fast.
+"""
+import argparse
+import json
+import sys
+
+
+def parse_coordinates(text):
+    try:
+        lat, lng = (float(part) for part in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected LAT,LNG")
+    return lat, lng
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="surfcast", description="Fetch forecasts for surf spots and rank them by peak wave height.")
+    parser.add_argument("query", nargs="?", help="spot search text (default: the whole catalogue)")
+    parser.add_argument("--near", type=parse_coordinates, metavar="LAT,LNG",
+                        help="only spots around this point")
+    parser.add_argument("--radius", type=float, default=100.0, metavar="KM",
+                        help="search radius for --near (default: 100)")
+    parser.add_argument("-n", "--count", type=int, default=10, help="number of spots to fetch (default: 10)")
+    parser.add_argument("--days", type=int, default=3, choices=range(1, 17), metavar="{1..16}",
+                        help="forecast days (default: 3)")
+    parser.add_argument("--sessions", type=int, metavar="K",
+                        help="list the K best 3-hour sessions across the spots instead")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and report again after each upstream model update")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write fetch and parse timings as Prometheus text after each report")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="parse and aggregate in N worker processes (default: SURFCAST_PARSE_WORKERS, "
+                             "else in-process)")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="reuse forecasts from this cache file until the next model update, "
+                             "and store fetched ones in it")
+    parser.add_argument("--archive", metavar="PATH",
+                        help="append every fetched forecast to this forecast archive")
+    parser.add_argument("--history", type=int, metavar="RUNS",
+                        help="show how the forecast changed over the last RUNS archived model runs "
+                             "instead of fetching (needs --archive)")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="write the spots' forecasts and map regions to an offline snapshot file instead")
+    return parser
+
+
+def select_spots(args):
+    """Pick catalogue spots from the query and --near filters"""
+    from .geo import SPOT_LOCATOR
+    from .search import SPOT_INDEX
+    from .spots import POPULAR_SURF_SPOTS
+
+    if args.near:
+        spots = [spot for spot, _ in SPOT_LOCATOR.within(args.near[0], args.near[1], args.radius)]
+    else:
+        spots = list(POPULAR_SURF_SPOTS)
+    if args.query:
+        matches = set(SPOT_INDEX.search(args.query, limit=len(POPULAR_SURF_SPOTS)))
+        spots = [spot for spot in spots if spot in matches]
+    return spots[:args.count]
+
+
+def rank_forecasts(forecasts):
+    """Order (spot, processed data) pairs by the highest daily wave maximum.
+
+    Returns (spot, data, rank.BestDay or None) triples; spots without a
+    usable day go last.
+    """
+    from .rank import ForecastStack, best_days
+
+    forecasts = list(forecasts)
+    days = best_days(ForecastStack([spot for spot, _ in forecasts], [data for _, data in forecasts]))
+    ranked = [(spot, data, best) for (spot, data), best in zip(forecasts, days)]
+    return sorted(ranked, key=lambda item: item[2].max_wave if item[2] is not None else 0, reverse=True)
+
+
+def write_json(args, payload):
+    if args.json == "-":
+        json.dump(payload, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+
+
+def report_sessions(args, forecasts):
+    """Print or write the best sessions across fetched (spot, data) pairs"""
+    from .rank import ForecastStack, best_sessions
+
+    spots, data = zip(*forecasts)
+    sessions = best_sessions(ForecastStack(spots, data), args.sessions)
+    if args.json:
+        write_json(args, [dict(session.spot.to_dict(), start=session.start.isoformat(),
+                               end=session.end.isoformat(), score=round(session.score, 2),
+                               swell_height=round(session.swell_height, 2),
+                               swell_period=round(session.swell_period, 1),
+                               wind_speed=round(session.wind_speed, 1)) for session in sessions])
+        return
+    for rank, session in enumerate(sessions, 1):
+        print(f"{rank:3}. {session.spot['name']:<32} {session.start:%a %d %b %H:%M}-{session.end:%H:%M}  "
+              f"score {session.score:4.1f}  swell {session.swell_height:3.1f}m @ {session.swell_period:2.0f}s  "
+              f"wind {session.wind_speed:3.0f}km/h")
+
+
+def daily_peaks(hourly):
+    """Highest wave height per local date of an hourly frame, as {date: metres}"""
+    import numpy as np
+
+    heights = hourly.column('wave_height')
+    dates = hourly.timestamps.astype('datetime64[D]')
+    peaks = {}
+    for date in np.unique(dates):
+        values = heights[dates == date]
+        if not np.isnan(values).all():
+            peaks[str(date)] = round(float(np.nanmax(values)), 2)
+    return peaks
+
+
+def report_history(args, spots):
+    """Print or write each spot's daily peak waves over its newest archived runs"""
+    from .archive import ForecastArchive
+
+    archive = ForecastArchive(args.archive)
+    try:
+        results = [(spot, [(forecast.run, daily_peaks(forecast.hourly))
+                           for forecast in archive.history(spot['lat'], spot['lng'], args.history,
+                                                           columns=('wave_height',))])
+                   for spot in spots]
+    finally:
+        archive.close()
+
+    if args.json:
+        write_json(args, [dict(spot.to_dict(), runs=[{'run': run.isoformat(), 'max_wave': peaks}
+                                                     for run, peaks in runs])
+                          for spot, runs in results])
+        return any(runs for _, runs in results)
+    for spot, runs in results:
+        print(spot['name'])
+        if not runs:
+            print("  no archived forecasts")
+            continue
+        dates = sorted(set().union(*(peaks for _, peaks in runs)))
+        print(f"  {'run':<16}" + "".join(f"{date[5:]:>7}" for date in dates))
+        for run, peaks in runs:
+            print(f"  {run:%Y-%m-%d %HZ}   " + "".join(
+                f"{peaks[date]:7.1f}" if date in peaks else f"{'':7}" for date in dates))
+    return any(runs for _, runs in results)
+
+
+def write_snapshot(args, spots):
+    """Prefetch the spots and their map regions into a snapshot file for machines without a network"""
+    import os
+    import tempfile
+    from .cache import ForecastCache
+    from .snapshot import prefetch_snapshot
+    from .tiles import Region, TileStore
+
+    regions = list(dict.fromkeys(Region.containing(spot['lat'], spot['lng']) for spot in spots))
+    with tempfile.TemporaryDirectory(prefix="surfcast-snapshot-") as scratch:
+        counts, failures = prefetch_snapshot(
+            args.snapshot, [spot.to_dict() for spot in spots], args.days,
+            ForecastCache(os.path.join(scratch, "forecasts.sqlite3"), max_bytes=sys.maxsize),
+            tile_store=TileStore(os.path.join(scratch, "tiles")), regions=regions,
+            on_progress=lambda text: print(text, file=sys.stderr))
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    print(f"{args.snapshot}: {counts['forecasts']} forecasts, {counts['tiles']} map regions, "
+          f"{counts['bytes'] / 1024:.0f} KB")
+    return bool(counts['forecasts'])
+
+
+def report(args, spots):
+    """Fetch, rank and print or write one round of forecasts; True if any arrived"""
+    from .aggregate import compass_point, forecast_summary
+    from .fetch import iter_batch_forecasts
+
+    errors = []
+    fetched = list(iter_batch_forecasts(spots, args.days, on_error=errors.append, pool=args.pool,
+                                        cache=args.cache_store))
+    for error in errors:
+        print(error, file=sys.stderr)
+    if args.archive_store is not None:
+        for spot, data in fetched:
+            args.archive_store.add(spot['lat'], spot['lng'], data)
+    if args.sessions and fetched:
+        report_sessions(args, fetched)
+        return True
+    ranked = rank_forecasts(fetched)
+
+    if args.json:
+        write_json(args, [dict(spot.to_dict(), **forecast_summary(data)) for spot, data, _ in ranked])
+    else:
+        for rank, (spot, _, best) in enumerate(ranked, 1):
+            if best is None:
+                print(f"{rank:3}. {spot['name']:<32} data unavailable")
+                continue
+            print(f"{rank:3}. {spot['name']:<32} {best.max_wave:4.1f}m on {best.date}  "
+                  f"wind {best.avg_wind:3.0f}km/h  swell {compass_point(best.swell_direction)}")
+    return bool(fetched)
+
+
+def watch(args, spots):
+    """Report on a refresh schedule until interrupted"""
+    import time
+    from .cache import ForecastCache
+    from .fetch import FetchError
+    from .refresh import RefreshScheduler
+
+    def refresh(spots):
+        if not args.json:
+            print(time.strftime("-- %Y-%m-%d %H:%M --"))
+        try:
+            if not report(args, spots):
+                raise FetchError("No forecasts received")
+        finally:
+            write_metrics(args)
+        return ForecastCache.next_model_update(time.time())
+
+    scheduler = RefreshScheduler()
+    scheduler.schedule("spots", spots, time.time())
+    try:
+        scheduler.run(refresh)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def write_metrics(args):
+    if args.metrics:
+        from .metrics import METRICS
+        METRICS.write_prometheus(args.metrics)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.history is not None and not args.archive:
+        parser.error("--history needs --archive")
+    spots = select_spots(args)
+    if not spots:
+        print("No matching spots", file=sys.stderr)
+        return 1
+    if args.history is not None:
+        return 0 if report_history(args, spots) else 1
+    if args.snapshot:
+        return 0 if write_snapshot(args, spots) else 1
+    from .archive import ForecastArchive
+    from .cache import ForecastCache
+    from .pool import ParsePool, workers_from_env
+
+    args.archive_store = ForecastArchive(args.archive) if args.archive else None
+    args.cache_store = ForecastCache(args.cache) if args.cache else None
+
+    workers = args.workers if args.workers is not None else workers_from_env()
+    args.pool = ParsePool(workers) if workers and len(spots) > 1 else None
+    try:
+        if args.watch:
+            return watch(args, spots)
+        return 0 if report(args, spots) else 1
+    finally:
+        if args.pool is not None:
+            args.pool.close()
+        if args.archive_store is not None:
+            args.archive_store.close()
+        if args.cache_store is not None:
+            args.cache_store.close()
+        if not args.watch:
+            write_metrics(args)
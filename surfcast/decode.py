@@ -0,0 +1,130 @@
+"""JSON decoding: pluggable parser backends and streaming array items.
+
+loads() uses the fastest installed backend (orjson, then msgspec, then the
+standard library); set SURFCAST_JSON_BACKEND or call set_backend() to pick
+one. iter_items() splits a streamed top-level JSON array into its elements
+as bytes arrive, so a multi-location response is decoded one location at
+a time and never held whole, either as bytes or as Python objects.
+"""
+import json
+import os
+
+import numpy as np
+
+from .metrics import METRICS
+
+BACKENDS = {'json': json.loads}
+try:
+    import orjson
+    BACKENDS['orjson'] = orjson.loads
+except ImportError:
+    pass
+try:
+    import msgspec
+    BACKENDS['msgspec'] = msgspec.json.decode
+except ImportError:
+    pass
+
+PREFERRED_BACKENDS = ('orjson', 'msgspec', 'json')
+CHUNK_SIZE = 64 * 1024
+
+_backend_name = None
+_loads = None
+
+
+def set_backend(name):
+    """Select the JSON backend used by loads()"""
+    global _backend_name, _loads
+    if name not in BACKENDS:
+        raise ValueError(f"JSON backend {name!r} is not available (have: {', '.join(BACKENDS)})")
+    _backend_name, _loads = name, BACKENDS[name]
+
+
+def backend():
+    return _backend_name
+
+
+def loads(data):
+    """Decode JSON bytes or text with the selected backend"""
+    with METRICS.span('parse.json'):
+        return _loads(data)
+
+
+set_backend(os.environ.get('SURFCAST_JSON_BACKEND') or
+            next(name for name in PREFERRED_BACKENDS if name in BACKENDS))
+
+QUOTE, BACKSLASH = ord('"'), ord('\\')
+OPENERS = np.array([ord('['), ord('{')], dtype=np.uint8)
+BRACKETS = np.array([ord('['), ord(']'), ord('{'), ord('}')], dtype=np.uint8)
+
+
+def _unescaped(data, quotes):
+    """Drop quotes preceded by an odd run of backslashes"""
+    keep = np.ones(len(quotes), dtype=bool)
+    for i in np.flatnonzero(data[np.maximum(quotes - 1, 0)] == BACKSLASH):
+        run, q = 0, quotes[i] - 1
+        while q >= 0 and data[q] == BACKSLASH:
+            run, q = run + 1, q - 1
+        keep[i] = run % 2 == 0
+    return quotes[keep]
+
+
+def iter_item_bytes(chunks):
+    """Yield the raw bytes of each element of a streamed top-level JSON array.
+
+    A top-level object is yielded whole, as a one-element sequence. Each
+    chunk is classified with NumPy: quote parity marks which brackets sit
+    inside strings and a running sum of the rest gives the nesting depth,
+    so element boundaries are found without a Python step per token. The
+    buffer never holds more than the unfinished element plus one chunk.
+    """
+    buffer = b""
+    scan = 0  # offset in buffer where unscanned bytes begin
+    start = None  # offset where the unfinished element began
+    item_depth = None  # nesting depth of elements: 1 in an array, 0 for an object
+    depth = 0
+    in_string = 0
+    for chunk in chunks:
+        buffer += chunk
+        data = np.frombuffer(buffer, dtype=np.uint8)[scan:]
+        # Trailing backslashes may escape the next chunk's first byte; rescan them then
+        stop = len(data)
+        while stop and data[stop - 1] == BACKSLASH:
+            stop -= 1
+        data = data[:stop]
+
+        quotes = np.flatnonzero(data == QUOTE)
+        if len(quotes) and (data == BACKSLASH).any():
+            quotes = _unescaped(data, quotes)
+        brackets = np.flatnonzero(np.isin(data, BRACKETS))
+        brackets = brackets[(np.searchsorted(quotes, brackets) + in_string) % 2 == 0]
+        in_string = (in_string + len(quotes)) % 2
+
+        if len(brackets):
+            opening = np.isin(data[brackets], OPENERS)
+            after = depth + np.cumsum(np.where(opening, 1, -1))
+            before = after - np.where(opening, 1, -1)
+            if item_depth is None:
+                item_depth = 0 if data[brackets[0]] == ord('{') else 1
+            starts = brackets[opening & (before == item_depth)] + scan
+            ends = brackets[~opening & (after == item_depth)] + scan + 1
+            depth = int(after[-1])
+            if start is not None:
+                starts = np.concatenate([[start], starts])
+            for item_start, item_end in zip(starts, ends):
+                yield buffer[item_start:item_end]
+            start = int(starts[len(ends)]) if len(starts) > len(ends) else None
+
+        scan += stop
+        # Keep only the unfinished element
+        keep = scan if start is None else start
+        buffer = buffer[keep:]
+        scan -= keep
+        if start is not None:
+            start = 0
+
+
+def iter_items(chunks):
+    """Decode each element of a streamed top-level JSON array"""
+    for item in iter_item_bytes(chunks):
+        yield loads(item)
@@ -0,0 +1,40 @@
+"""Downsampling of long time series for drawing"""
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The rest are split into
+    threshold - 2 buckets and from each the point forming the largest
+    triangle with the previously kept point and the next bucket's average
+    is kept, which preserves peaks and troughs that plain striding drops.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(int) + 1
+    edges[-1] = n - 1
+    # Average of every bucket, computed up front; the last bucket looks at the final point
+    lengths = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / lengths, x[-1])
+    avg_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / lengths, y[-1])
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        bx, by = avg_x[i + 1], avg_y[i + 1]
+        area = np.abs((x[a] - bx) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (by - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(x, y, threshold):
+    """LTTB-downsample a series, skipping missing (NaN) values"""
+    valid = ~np.isnan(y)
+    x, y = x[valid], y[valid]
+    keep = lttb_indices(x, y, threshold)
+    return x[keep], y[keep]
@@ -0,0 +1,232 @@
+"""Forecast fetching for single spots and batches of spots"""
+import json
+from collections import deque
+
+from . import net
+from .decode import CHUNK_SIZE, iter_item_bytes, loads
+from .frame import process_forecast
+from .metrics import METRICS
+
+
+class FetchError(Exception):
+    """Raised when an upstream forecast API answers with an error status"""
+
+    @classmethod
+    def from_status(cls, marine_status, weather_status):
+        return cls(f"Failed to fetch weather data: Marine {marine_status}, Weather {weather_status}")
+
+
+def fetch_responses(lat, lng, days, marine_headers=None, weather_headers=None):
+    """Fetch marine and weather responses concurrently on the shared session"""
+    session = net.get_http_session()
+    weather_future = net.HTTP_EXECUTOR.submit(
+        session.get, net.build_weather_url([lat], [lng], days), headers=weather_headers, timeout=15)
+    try:
+        marine_response = session.get(net.build_marine_url([lat], [lng], days),
+                                      headers=marine_headers, timeout=15)
+    except Exception:
+        # The marine error is the one raised; the weather call is dropped, whatever its outcome
+        if not weather_future.cancel():
+            weather_future.add_done_callback(discard_response)
+        raise
+    try:
+        return marine_response, weather_future.result()
+    except Exception:
+        marine_response.close()
+        raise
+
+
+def discard_response(future):
+    """Close a no longer wanted response once its request finishes, ignoring its error"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def revalidation_headers(lat, lng, days, cache):
+    """Conditional request headers for the marine and weather calls"""
+    validators = cache.get_validators(lat, lng, days) if cache is not None else None
+    if not validators:
+        return None, None
+    return (net.conditional_headers(validators.get('marine')),
+            net.conditional_headers(validators.get('weather')))
+
+
+def resolve_forecast(lat, lng, days, cache, marine, weather):
+    """Process (status, body, headers) marine and weather responses.
+
+    A 304 answer reuses the cached body for that side; when both sides are
+    unchanged the cached entry is just marked current. New bodies are
+    stored in the cache with their validators.
+    """
+    (marine_status, marine_body, marine_headers) = marine
+    (weather_status, weather_body, weather_headers) = weather
+    allowed = (200, 304) if cache is not None else (200,)
+    if marine_status not in allowed or weather_status not in allowed:
+        raise FetchError.from_status(marine_status, weather_status)
+
+    entry = None
+    if 304 in (marine_status, weather_status):
+        entry = cache.get(lat, lng, days)
+        if entry is None:
+            raise FetchError.from_status(marine_status, weather_status)
+        if marine_status == weather_status == 304:
+            cache.touch(lat, lng, days)
+            return process_forecast(entry.marine_data, entry.weather_data)
+
+    previous = (entry.validators if entry is not None else None) or {}
+    if marine_status == 304:
+        marine_data, marine_body = entry.marine_data, json.dumps(entry.marine_data).encode()
+        marine_validator = previous.get('marine')
+    else:
+        marine_data, marine_validator = loads(marine_body), net.response_validator(marine_headers)
+    if weather_status == 304:
+        weather_data, weather_body = entry.weather_data, json.dumps(entry.weather_data).encode()
+        weather_validator = previous.get('weather')
+    else:
+        weather_data, weather_validator = loads(weather_body), net.response_validator(weather_headers)
+    if cache is not None:
+        validators = {'marine': marine_validator, 'weather': weather_validator}
+        cache.put(lat, lng, days, marine_body, weather_body,
+                  validators=validators if any(validators.values()) else None)
+    return process_forecast(marine_data, weather_data)
+
+
+@METRICS.timed('fetch.forecast')
+def fetch_forecast(lat, lng, days=3, cache=None):
+    """Fetch and process one location's forecast, revalidating and updating cache if given"""
+    marine_response, weather_response = fetch_responses(
+        lat, lng, days, *revalidation_headers(lat, lng, days, cache))
+    return resolve_forecast(
+        lat, lng, days, cache,
+        (marine_response.status_code, marine_response.content, marine_response.headers),
+        (weather_response.status_code, weather_response.content, weather_response.headers))
+
+
+def parse_location(marine_bytes, weather_bytes):
+    """Decode and process one location's raw marine and weather JSON"""
+    data = process_forecast(loads(marine_bytes), loads(weather_bytes))
+    data['hourly'].compact()
+    return data
+
+
+# Limits for packing coordinates into one multi-location request
+MAX_URL_LENGTH = 8000
+MAX_LOCATIONS = 1000
+
+
+def plan_batches(spots, days, max_url_length=MAX_URL_LENGTH, max_locations=MAX_LOCATIONS):
+    """Split spots into groups that each fit in one request URL"""
+    base_length = max(len(net.build_marine_url([], [], days)),
+                      len(net.build_weather_url([], [], days)))
+    budget = max_url_length - base_length
+    batch, length = [], 0
+    for spot in spots:
+        cost = len(str(spot['lat'])) + len(str(spot['lng'])) + 2
+        if batch and (len(batch) >= max_locations or length + cost > budget):
+            yield batch
+            batch, length = [], 0
+        batch.append(spot)
+        length += cost
+    if batch:
+        yield batch
+
+
+def cached_forecast(spot, days, cache):
+    """A spot's processed forecast from the cache if it is fresh there, else None"""
+    entry = cache.get(spot['lat'], spot['lng'], days)
+    if entry is None or not cache.is_fresh(entry):
+        return None
+    data = process_forecast(entry.marine_data, entry.weather_data)
+    data['hourly'].compact()
+    return data
+
+
+def iter_batch_forecasts(spots, days=3, on_error=None, pool=None, cache=None):
+    """Yield (spot, processed data) pairs for many spots, batch by batch.
+
+    Spots are packed into comma-separated latitude/longitude lists, as many
+    per request as the URL length allows, and all batches are requested
+    concurrently. Response bodies are streamed and decoded one location at
+    a time, each straight into compact column arrays, so memory follows
+    one location rather than the whole batch. With a pool.ParsePool the
+    decoding and daily aggregation run in its worker processes while this
+    thread keeps reading. A failed batch, including one that ends early,
+    is reported through on_error and skipped; without a callback the error
+    is raised.
+
+    With a cache.ForecastCache, spots fresh there are yielded from it
+    first and only the rest are requested; each location received is
+    stored back, one transaction per batch.
+    """
+    hits = []
+    if cache is not None:
+        misses = []
+        for spot in spots:
+            data = cached_forecast(spot, days, cache)
+            if data is None:
+                misses.append(spot)
+            else:
+                hits.append((spot, data))
+        spots = misses
+
+    session = net.get_http_session()
+    pending = []
+    for batch in plan_batches(spots, days):
+        lats = [spot['lat'] for spot in batch]
+        lngs = [spot['lng'] for spot in batch]
+        pending.append((
+            batch,
+            net.HTTP_EXECUTOR.submit(session.get, net.build_marine_url(lats, lngs, days),
+                                     timeout=30, stream=True),
+            net.HTTP_EXECUTOR.submit(session.get, net.build_weather_url(lats, lngs, days),
+                                     timeout=30, stream=True),
+        ))
+    yield from hits
+
+    for batch, marine_future, weather_future in pending:
+        marine_response = weather_response = None
+        # Bodies read but not yet parsed, and parsed ones waiting to be cached
+        bodies, parsed = deque(), []
+        try:
+            marine_response = marine_future.result()
+            weather_response = weather_future.result()
+            if marine_response.status_code != 200 or weather_response.status_code != 200:
+                raise FetchError(f"Failed to fetch batch of {len(batch)} spots: "
+                                 f"Marine {marine_response.status_code}, Weather {weather_response.status_code}")
+            # Single-location requests come back as a bare object, read as one item
+            marine_items = iter_item_bytes(marine_response.iter_content(CHUNK_SIZE))
+            weather_items = iter_item_bytes(weather_response.iter_content(CHUNK_SIZE))
+            items = zip(marine_items, weather_items)
+            if cache is not None:
+                items = keep_bodies(items, bodies)
+            if pool is None:
+                forecasts = (parse_location(marine, weather) for marine, weather in items)
+            else:
+                forecasts = pool.imap(items, limit=len(batch))
+            received = 0
+            for spot, data in zip(batch, forecasts):
+                received += 1
+                if cache is not None:
+                    parsed.append((spot['lat'], spot['lng'], days, *bodies.popleft()))
+                yield spot, data
+            extra = next(marine_items, None) is not None or next(weather_items, None) is not None
+            if received != len(batch) or extra:
+                raise FetchError(f"Expected {len(batch)} locations, got "
+                                 f"{received}{' and more' if extra else ''}")
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(f"Error fetching batch: {str(e)}")
+        finally:
+            for response in (marine_response, weather_response):
+                if response is not None:
+                    response.close()
+            if parsed:
+                cache.put_many(parsed)
+
+
+def keep_bodies(items, bodies):
+    """Pass (marine, weather) body pairs through, appending each to bodies"""
+    for item in items:
+        bodies.append(item)
+        yield item
@@ -0,0 +1,191 @@
+"""Columnar storage for processed forecasts"""
+import numpy as np
+
+from .metrics import METRICS
+
+# Hourly forecast columns mapped to their upstream (api, variable) source
+HOURLY_COLUMNS = {
+    'wave_height': ('marine', 'wave_height'),
+    'wave_direction': ('marine', 'wave_direction'),
+    'wave_period': ('marine', 'wave_period'),
+    'swell_height': ('marine', 'swell_wave_height'),
+    'swell_direction': ('marine', 'swell_wave_direction'),
+    'swell_period': ('marine', 'swell_wave_period'),
+    'wind_wave_height': ('marine', 'wind_wave_height'),
+    'wind_wave_direction': ('marine', 'wind_wave_direction'),
+    'wind_wave_period': ('marine', 'wind_wave_period'),
+    'temperature': ('weather', 'temperature_2m'),
+    'apparent_temp': ('weather', 'apparent_temperature'),
+    'humidity': ('weather', 'relative_humidity_2m'),
+    'precipitation': ('weather', 'precipitation_probability'),
+    'weather_code': ('weather', 'weather_code'),
+    'wind_speed': ('weather', 'wind_speed_10m'),
+    'wind_direction': ('weather', 'wind_direction_10m'),
+    'visibility': ('weather', 'visibility'),
+}
+
+
+class ForecastRow:
+    """Read-only view of one hour of a ForecastFrame"""
+    __slots__ = ('_frame', '_index')
+
+    def __init__(self, frame, index):
+        self._frame = frame
+        self._index = index
+
+    def __getitem__(self, key):
+        if key == 'time':
+            return self._frame.times[self._index]
+        value = self._frame.column(key)[self._index]
+        # Missing values read as 0, like the old per-hour dicts
+        return 0.0 if np.isnan(value) else float(value)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return ['time'] + list(HOURLY_COLUMNS)
+
+    def to_dict(self):
+        return {key: self[key] for key in self.keys()}
+
+
+class ForecastFrame:
+    """Columnar hourly forecast backed by NumPy arrays.
+
+    Upstream Open-Meteo column lists are referenced, not copied, and each is
+    converted to a float array (missing values as NaN) the first time it is
+    read. Slicing returns a frame that shares those arrays.
+    """
+
+    def __init__(self, times, sources, start=0, stop=None, arrays=None):
+        self._times = times
+        self._sources = sources
+        self._start = start
+        self._stop = len(times) if stop is None else stop
+        self._arrays = {} if arrays is None else arrays
+
+    @classmethod
+    def from_open_meteo(cls, marine_data, weather_data):
+        """Build a frame from raw marine and weather API responses"""
+        sources = {
+            'marine': marine_data.get('hourly') or {},
+            'weather': weather_data.get('hourly') or {},
+        }
+        return cls(sources['marine'].get('time') or [], sources)
+
+    @classmethod
+    def from_arrays(cls, timestamps, columns):
+        """Build a frame from a datetime64[m] array and a {column: array} mapping; missing columns read as NaN"""
+        arrays = dict(columns, time=timestamps)
+        times = np.datetime_as_string(timestamps, unit='m').tolist()
+        return cls(times, {'marine': {}, 'weather': {}}, arrays=arrays)
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("ForecastFrame slices must be contiguous")
+            return ForecastFrame(self._times, self._sources,
+                                 self._start + start, self._start + max(start, stop),
+                                 self._arrays)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ForecastFrame index out of range")
+        return ForecastRow(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield ForecastRow(self, i)
+
+    @property
+    def times(self):
+        """ISO time strings for the rows in this frame"""
+        return self._times[self._start:self._stop]
+
+    @property
+    def timestamps(self):
+        """Row times as a datetime64[m] array"""
+        return self._full_array('time')[self._start:self._stop]
+
+    def column(self, name):
+        """Float array for a column, NaN where the value is missing"""
+        if name not in HOURLY_COLUMNS:
+            raise KeyError(name)
+        return self._full_array(name)[self._start:self._stop]
+
+    def mask(self, name):
+        """Boolean array that is True where a column value is missing"""
+        return np.isnan(self.column(name))
+
+    def compact(self):
+        """Convert every column to an array now and release the upstream lists"""
+        for name in ['time', *HOURLY_COLUMNS]:
+            self._full_array(name)
+        self._sources = {source: {} for source in self._sources}
+        return self
+
+    def to_records(self):
+        """Materialize the frame as a list of per-hour dicts"""
+        return [row.to_dict() for row in self]
+
+    def _full_array(self, name):
+        array = self._arrays.get(name)
+        if array is None:
+            array = self._arrays[name] = self._convert(name)
+        return array
+
+    def _convert(self, name):
+        size = len(self._times)
+        if name == 'time':
+            times = self._times
+            if times and times[0].endswith('Z'):
+                times = [t[:-1] for t in times]
+            return np.array(times, dtype='datetime64[m]')
+        source, key = HOURLY_COLUMNS[name]
+        values = self._sources[source].get(key) or []
+        try:
+            array = np.array(values[:size], dtype=float)
+        except (TypeError, ValueError):
+            array = np.full(0, np.nan)
+        if len(array) < size:
+            array = np.concatenate([array, np.full(size - len(array), np.nan)])
+        return array
+
+
+@METRICS.timed('parse.forecast')
+def process_forecast(marine_data, weather_data):
+    """Combine one location's marine and weather responses"""
+    hourly_data = ForecastFrame.from_open_meteo(marine_data, weather_data)
+
+    # Process daily data
+    daily_data = []
+    for i, date_str in enumerate(weather_data['daily']['time']):
+        daily_data.append({
+            'date': date_str,
+            'sunrise': weather_data['daily']['sunrise'][i],
+            'sunset': weather_data['daily']['sunset'][i],
+            'temp_max': weather_data['daily']['temperature_2m_max'][i],
+            'temp_min': weather_data['daily']['temperature_2m_min'][i],
+            'weather_code': weather_data['daily']['weather_code'][i]
+        })
+
+    return {
+        'hourly': hourly_data,
+        'daily': daily_data
+    }
+
+
+def slice_forecast(data, days):
+    """The first days of a processed forecast, sharing its arrays"""
+    return {
+        'hourly': data['hourly'][:days * 24],
+        'daily': data['daily'][:days]
+    }
@@ -0,0 +1,105 @@
+"""Spatial queries over spot coordinates"""
+import math
+import threading
+
+import numpy as np
+
+from .spots import POPULAR_SURF_SPOTS
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km; arguments may be NumPy arrays"""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class SpatialIndex:
+    """Grid index over spot coordinates for radius and nearest-spot queries.
+
+    Spots are bucketed into 1-degree cells and stored sorted by cell, so a
+    query only computes haversine distances for spots in the cells its
+    radius overlaps. The grid is built on the first query.
+    """
+    CELL_DEGREES = 1.0
+    MAX_CELLS = 2000  # beyond this many cells a full scan is cheaper
+
+    def __init__(self, spots):
+        self.spots = spots
+        self._lock = threading.Lock()
+        self._built = False
+
+    def _build(self):
+        self._rows = int(math.ceil(180 / self.CELL_DEGREES)) + 1
+        self._cols = int(math.ceil(360 / self.CELL_DEGREES))
+        if hasattr(self.spots, 'coordinates'):
+            lats, lngs = self.spots.coordinates()
+        else:
+            lats = np.array([spot['lat'] for spot in self.spots], dtype=float)
+            lngs = np.array([spot['lng'] for spot in self.spots], dtype=float)
+        keys = self._cell_keys(lats, lngs)
+        order = np.argsort(keys, kind='stable')
+        self._order = order
+        self._keys = keys[order]
+        self._lats = lats[order]
+        self._lngs = lngs[order]
+        self._built = True
+
+    def _cell_keys(self, lats, lngs):
+        rows = np.floor((np.asarray(lats) + 90) / self.CELL_DEGREES).astype(np.int64)
+        cols = np.floor((np.asarray(lngs) + 180) / self.CELL_DEGREES).astype(np.int64) % self._cols
+        return rows * self._cols + cols
+
+    def _candidates(self, lat, lng, radius_km):
+        """Positions (in cell order) of spots in cells the radius overlaps"""
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        lat_lo, lat_hi = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+        cos_lat = math.cos(math.radians(max(abs(lat_lo), abs(lat_hi))))
+        rows = np.arange(int((lat_lo + 90) // self.CELL_DEGREES),
+                         int((lat_hi + 90) // self.CELL_DEGREES) + 1)
+        if cos_lat < 1e-6 or dlat / cos_lat >= 180:
+            cols = np.arange(self._cols)
+        else:
+            dlng = dlat / cos_lat
+            cols = np.arange(int((lng - dlng + 180) // self.CELL_DEGREES),
+                             int((lng + dlng + 180) // self.CELL_DEGREES) + 1) % self._cols
+        if len(rows) * len(cols) > self.MAX_CELLS:
+            return np.arange(len(self._keys))
+        keys = np.unique(np.add.outer(rows * self._cols, cols).ravel())
+        starts = np.searchsorted(self._keys, keys, side='left')
+        stops = np.searchsorted(self._keys, keys, side='right')
+        nonempty = stops > starts
+        if not nonempty.any():
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(a, b) for a, b in zip(starts[nonempty], stops[nonempty])])
+
+    def within(self, lat, lng, radius_km):
+        """Spots within radius_km of a point as (spot, distance_km), nearest first"""
+        with self._lock:
+            if not self._built:
+                self._build()
+        if not len(self._keys):
+            return []
+        positions = self._candidates(lat, lng, radius_km)
+        distances = haversine_km(lat, lng, self._lats[positions], self._lngs[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        ranked = np.argsort(distances, kind='stable')
+        return [(self.spots[self._order[positions[i]]], float(distances[i])) for i in ranked]
+
+    def nearest(self, lat, lng, k=1, max_km=None):
+        """The k spots closest to a point as (spot, distance_km), nearest first"""
+        limit = math.pi * EARTH_RADIUS_KM if max_km is None else max_km
+        radius = min(50.0, limit)
+        while True:
+            found = self.within(lat, lng, radius)
+            if len(found) >= k or radius >= limit:
+                return found[:k]
+            radius = min(radius * 4, limit)
+
+
+# Spatial index over the built-in catalogue
+SPOT_LOCATOR = SpatialIndex(POPULAR_SURF_SPOTS)
@@ -0,0 +1,129 @@
+"""Coalescing, cancellable forecast requests for interactive spot switching.
+
+Every view request starts a new generation: earlier view requests are
+superseded, their callbacks dropped and their fetches cancelled unless a
+background refresh still waits on them, so a late answer can never paint
+the wrong spot. Requests for the same model grid cell share one in-flight
+fetch. Day counts are rounded up to a fetch tier, so one 7-day fetch also
+answers the 3- and 5-day views, which are sliced from it.
+
+Fetching is pluggable: start(lat, lng, days, done) begins a fetch that
+calls done(data, error) on the manager's thread when it finishes, and
+returns a handle with a cancel() method. The manager itself is not
+thread-safe and is meant to be driven from the UI thread.
+"""
+from .cache import ForecastCache
+from .frame import slice_forecast
+from .metrics import METRICS
+
+# Day counts actually fetched; views are sliced from the smallest tier covering them
+FETCH_TIERS = (7, 16)
+
+
+def fetch_days(days, tiers=FETCH_TIERS):
+    """Days to fetch for a view of days: the smallest tier that covers it"""
+    return next((tier for tier in tiers if tier >= days), days)
+
+
+class InFlight:
+    """One running fetch and the callbacks waiting for it"""
+    __slots__ = ('days', 'handle', 'waiters')
+
+    def __init__(self, days):
+        self.days = days
+        self.handle = None
+        self.waiters = []  # (generation or None for background, days, on_ready, on_error)
+
+
+class RequestManager:
+    """Generation-tagged forecast requests with coalescing and slicing"""
+
+    def __init__(self, start, tiers=FETCH_TIERS):
+        self.start = start
+        self.tiers = tiers
+        self.generation = 0
+        self._inflight = {}  # (grid cell, fetched days) -> InFlight
+
+    def fetch_days(self, days):
+        return fetch_days(days, self.tiers)
+
+    def cache_days(self, days):
+        """Day counts whose cache entries can answer a view, best first"""
+        return list(dict.fromkeys([*(tier for tier in self.tiers if tier >= days), days]))
+
+    def cached(self, cache, lat, lng, days):
+        """The cache entry that answers a view, as (entry, days it holds), or (None, None)"""
+        for cached_days in self.cache_days(days):
+            entry = cache.get(lat, lng, cached_days)
+            if entry is not None:
+                return entry, cached_days
+        return None, None
+
+    def request(self, lat, lng, days, on_ready, on_error, background=False):
+        """Fetch a spot's forecast covering days and deliver it sliced to days.
+
+        View requests supersede every earlier view request and return their
+        generation. Background requests, such as auto-refreshes, are never
+        superseded and return None, but share fetches with views.
+        """
+        generation = None
+        if not background:
+            self.generation += 1
+            generation = self.generation
+        cell = ForecastCache.grid_cell(lat, lng)
+        key, inflight = self._covering(cell, days)
+        started = inflight is None
+        if started:
+            key = (cell, self.fetch_days(days))
+            inflight = self._inflight[key] = InFlight(key[1])
+        else:
+            METRICS.inc('requests.coalesced')
+        inflight.waiters.append((generation, days, on_ready, on_error))
+        if not background:
+            self._supersede(generation)
+        if started:
+            inflight.handle = self.start(lat, lng, inflight.days,
+                                         lambda data, error: self._finish(key, inflight, data, error))
+        return generation
+
+    def cancel(self):
+        """Supersede every view request without starting a new one"""
+        self.generation += 1
+        self._supersede(self.generation)
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def pending(self):
+        """Number of fetches in flight"""
+        return len(self._inflight)
+
+    def _covering(self, cell, days):
+        for key, inflight in self._inflight.items():
+            if key[0] == cell and inflight.days >= days:
+                return key, inflight
+        return None, None
+
+    def _supersede(self, generation):
+        for key, inflight in list(self._inflight.items()):
+            inflight.waiters = [waiter for waiter in inflight.waiters
+                                if waiter[0] is None or waiter[0] >= generation]
+            if not inflight.waiters:
+                del self._inflight[key]
+                if inflight.handle is not None:
+                    inflight.handle.cancel()
+                METRICS.inc('requests.cancelled')
+
+    def _finish(self, key, inflight, data, error):
+        if self._inflight.get(key) is not inflight:
+            # Cancelled, but the fetch could not be stopped in time
+            METRICS.inc('requests.discarded')
+            return
+        del self._inflight[key]
+        for generation, days, on_ready, on_error in inflight.waiters:
+            if generation is not None and generation != self.generation:
+                METRICS.inc('requests.discarded')
+            elif error is not None:
+                on_error(error)
+            else:
+                on_ready(slice_forecast(data, days))
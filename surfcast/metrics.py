@@ -0,0 +1,189 @@
+"""Timing spans, counters and gauges for fetch, parse and render phases.
+
+Every span name keeps cumulative Prometheus-style bucket counts plus a
+rolling window of recent samples for percentiles and the app's histogram.
+Set SURFCAST_METRICS_JSONL to a path to also append every sample there as
+one JSON object per line; to_prometheus() renders the text exposition
+format for a node_exporter textfile or a scrape endpoint.
+"""
+import bisect
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Upper bounds in seconds, from 1 ms to 30 s
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+WINDOW = 512
+
+
+class Histogram:
+    """Cumulative bucket counts and a rolling window of one span's durations"""
+
+    def __init__(self, window=WINDOW):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def percentile(self, q):
+        """q-th percentile (0-100) of the rolling window, or None if empty"""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'last': self.recent[-1] if self.recent else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'max': max(self.recent) if self.recent else None,
+        }
+
+
+class Metrics:
+    """Thread-safe registry of span histograms, counters and gauges"""
+
+    def __init__(self, jsonl_path=None):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration for a span, optionally labelled"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+            if self.jsonl_path:
+                self._append({'ts': time.time(), 'span': name, 'seconds': seconds, **labels})
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the body of a with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name):
+        """Decorator timing every call of a function or coroutine function as a span"""
+        def decorate(func):
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, read):
+        """Register a callable sampled whenever metrics are read"""
+        with self._lock:
+            self.gauges[name] = read
+
+    def last(self, name, **labels):
+        """Most recent duration of a span, or None"""
+        with self._lock:
+            histogram = self.histograms.get((name, tuple(sorted(labels.items()))))
+            return histogram.recent[-1] if histogram and histogram.recent else None
+
+    def recent(self, name, **labels):
+        """Rolling window samples of one labelled series of a span"""
+        with self._lock:
+            histogram = self.histograms.get((name, tuple(sorted(labels.items()))))
+            return list(histogram.recent) if histogram else []
+
+    def _gauge_values(self):
+        values = {}
+        for name, read in list(self.gauges.items()):
+            try:
+                values[name] = float(read())
+            except Exception:
+                continue
+        return values
+
+    def snapshot(self):
+        """Spans, counters and gauges as plain data"""
+        with self._lock:
+            spans = [dict(name=name, labels=dict(labels), **histogram.summary())
+                     for (name, labels), histogram in sorted(self.histograms.items())]
+            counters = dict(self.counters)
+        return {'spans': spans, 'counters': counters, 'gauges': self._gauge_values()}
+
+    def to_prometheus(self, prefix="surfcast"):
+        """Render everything in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            names = sorted({name for name, _ in self.histograms})
+            for name in names:
+                metric = f"{prefix}_{name.replace('.', '_')}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for (span, labels), histogram in sorted(self.histograms.items()):
+                    if span != name:
+                        continue
+                    label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + ("+Inf",), histogram.buckets):
+                        cumulative += count
+                        bucket_labels = ",".join(filter(None, [label_text, f'le="{bound}"']))
+                        lines.append(f"{metric}_bucket{{{bucket_labels}}} {cumulative}")
+                    suffix = f"{{{label_text}}}" if label_text else ""
+                    lines.append(f"{metric}_sum{suffix} {histogram.sum}")
+                    lines.append(f"{metric}_count{suffix} {histogram.count}")
+            counters = sorted(self.counters.items())
+        for name, value in counters:
+            metric = f"{prefix}_{name.replace('.', '_')}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, value in sorted(self._gauge_values().items()):
+            metric = f"{prefix}_{name.replace('.', '_')}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Atomically write the Prometheus text to a file"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def _append(self, record):
+        try:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+
+
+# Process-wide registry used by the fetch, parse and UI code
+METRICS = Metrics(jsonl_path=os.environ.get('SURFCAST_METRICS_JSONL'))
@@ -0,0 +1,76 @@
+"""HTTP plumbing shared by every Open-Meteo and Nominatim request.
+
+requests is imported when the shared session is first created, not at
+import time, so importing the URL builders and constants stays cheap.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Upstream API endpoints
+MARINE_API_URL = "https://marine-api.open-meteo.com/v1/marine"
+WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast"
+NOMINATIM_API_URL = "https://nominatim.openstreetmap.org/search"
+
+# Variables requested from each API
+MARINE_HOURLY = "wave_height,wave_direction,wave_period,wind_wave_height,wind_wave_direction,wind_wave_period,swell_wave_height,swell_wave_direction,swell_wave_period"
+MARINE_DAILY = "wave_height_max,wave_direction_dominant,wave_period_max,wind_wave_height_max,wind_wave_direction_dominant,wind_wave_period_max"
+WEATHER_HOURLY = "temperature_2m,relative_humidity_2m,apparent_temperature,precipitation_probability,weather_code,wind_speed_10m,wind_direction_10m,visibility"
+WEATHER_DAILY = "sunrise,sunset,temperature_2m_max,temperature_2m_min,weather_code"
+
+# Shared keep-alive HTTP session, one connection pool per upstream host
+_http_session = None
+_http_session_lock = threading.Lock()
+
+# Worker pool for issuing independent requests concurrently
+HTTP_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="surfcast-http")
+
+
+def get_http_session():
+    """Return the process-wide requests session, creating it on first use"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            import requests
+            from .transport import TimedHTTPAdapter
+            session = requests.Session()
+            adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=8)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def is_timeout(error):
+    """True for a request that timed out, from requests, aiohttp or asyncio"""
+    import asyncio
+    import requests
+    return isinstance(error, (asyncio.TimeoutError, requests.exceptions.Timeout))
+
+
+def build_marine_url(lats, lngs, days, timezone="auto"):
+    """Marine API URL for one or more comma-joined coordinates"""
+    return (f"{MARINE_API_URL}?latitude={','.join(map(str, lats))}&longitude={','.join(map(str, lngs))}"
+            f"&hourly={MARINE_HOURLY}&daily={MARINE_DAILY}&timezone={timezone}&forecast_days={days}")
+
+
+def build_weather_url(lats, lngs, days):
+    """Forecast API URL for one or more comma-joined coordinates"""
+    return (f"{WEATHER_API_URL}?latitude={','.join(map(str, lats))}&longitude={','.join(map(str, lngs))}"
+            f"&hourly={WEATHER_HOURLY}&daily={WEATHER_DAILY}&timezone=auto&forecast_days={days}")
+
+
+def conditional_headers(validator):
+    """If-None-Match / If-Modified-Since headers for a stored validator"""
+    headers = {}
+    if validator:
+        if validator.get('etag'):
+            headers['If-None-Match'] = validator['etag']
+        if validator.get('last_modified'):
+            headers['If-Modified-Since'] = validator['last_modified']
+    return headers or None
+
+
+def response_validator(headers):
+    """ETag and Last-Modified of a response, or None if upstream sent neither"""
+    validator = {'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}
+    return validator if any(validator.values()) else None
@@ -0,0 +1,133 @@
+"""Optional process pool for decoding, processing and aggregating forecasts.
+
+In a batch refresh the network stage only splits responses into raw
+per-location JSON items; with a ParsePool each marine/weather item pair
+is decoded, turned into columns and aggregated by day in a worker
+process, outside the fetching thread's GIL. Workers send back compact
+array blocks (one float64 block of hourly columns, the daily fields and
+the packed daily statistics), never lists of per-hour dicts, and the
+parent rebuilds a ForecastFrame and DailyAggregate around them without
+copying.
+
+The pool is off by default. Set SURFCAST_PARSE_WORKERS to a worker count
+(or "auto" for one per core) to use it for the app's batch fetches, or
+pass --workers to the command line. Workers are spawned, not forked, so
+they never inherit the app's threads or Qt state.
+"""
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+import numpy as np
+
+from .aggregate import DailyAggregate
+from .fetch import parse_location
+from .frame import HOURLY_COLUMNS, ForecastFrame
+from .metrics import METRICS
+
+COLUMNS = tuple(HOURLY_COLUMNS)
+DAILY_VALUES = ('temp_max', 'temp_min', 'weather_code')
+
+
+def parse_packed(marine_bytes, weather_bytes):
+    """Worker task: parse and aggregate one location into array blocks"""
+    start = time.perf_counter()
+    data = parse_location(marine_bytes, weather_bytes)
+    hourly, daily = data['hourly'], data['daily']
+    values = np.array([hourly.column(name) for name in COLUMNS], dtype=float).reshape(len(COLUMNS), -1)
+    daily_times = np.array([[day['date'] for day in daily], [day['sunrise'] for day in daily],
+                            [day['sunset'] for day in daily]], dtype='datetime64[m]').reshape(3, -1)
+    daily_values = np.array([[np.nan if day[key] is None else day[key] for key in DAILY_VALUES]
+                             for day in daily], dtype=float).reshape(-1, len(DAILY_VALUES)).T
+    return (hourly.timestamps, values, daily_times, daily_values, DailyAggregate(hourly).pack(),
+            time.perf_counter() - start)
+
+
+def unpack(packed):
+    """Rebuild a processed forecast, with its DailyAggregate, from parse_packed() output"""
+    timestamps, values, daily_times, daily_values, stats, seconds = packed
+    METRICS.observe('parse.worker', seconds)
+    hourly = ForecastFrame.from_arrays(timestamps, dict(zip(COLUMNS, values)))
+    dates = np.datetime_as_string(daily_times[0], unit='D').tolist()
+    sunrises, sunsets = (np.datetime_as_string(times, unit='m').tolist() for times in daily_times[1:])
+    daily = []
+    for i, date in enumerate(dates):
+        day = {'date': date, 'sunrise': sunrises[i], 'sunset': sunsets[i]}
+        for key, value in zip(DAILY_VALUES, daily_values[:, i]):
+            day[key] = None if np.isnan(value) else int(value) if key == 'weather_code' else float(value)
+        daily.append(day)
+    return {'hourly': hourly, 'daily': daily, 'aggregate': DailyAggregate(hourly, packed=stats)}
+
+
+class ParsePool:
+    """Spawned worker processes parsing forecast items, results in submission order"""
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def imap(self, items, limit=None):
+        """Parse (marine bytes, weather bytes) pairs, yielding processed forecasts in order.
+
+        At most two items per worker are in flight, so memory stays bounded
+        however long the input is. Stops after limit items when given,
+        leaving the rest of the input unread.
+        """
+        executor = self.executor()
+        pending = deque()
+        try:
+            for marine, weather in islice(items, limit):
+                pending.append(executor.submit(parse_packed, marine, weather))
+                if len(pending) >= 2 * self.workers:
+                    yield unpack(pending.popleft().result())
+            while pending:
+                yield unpack(pending.popleft().result())
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+def workers_from_env(value=None):
+    """Worker count from SURFCAST_PARSE_WORKERS ("auto" for one per core), or None when off"""
+    value = os.environ.get('SURFCAST_PARSE_WORKERS', '') if value is None else value
+    if value.strip().lower() == 'auto':
+        return os.cpu_count() or 1
+    try:
+        return int(value) or None
+    except ValueError:
+        return None
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def default_pool():
+    """The shared pool configured by SURFCAST_PARSE_WORKERS, or None when disabled"""
+    global _default_pool
+    workers = workers_from_env()
+    if workers is None:
+        return None
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = ParsePool(workers)
+        return _default_pool
@@ -0,0 +1,366 @@
+"""Vectorized "best session" ranking across many spots.
+
+Each spot's hourly swell height, period and direction and its wind speed
+and direction are stacked into (spots, hours) arrays, together with the
+spot's break type and preferred swell direction from the catalogue, and
+every hour of every spot is scored in one pass. Scores are averaged over
+sliding windows of a few hours and the best window per spot and day
+competes for the top K, so ranking is a handful of array operations
+however many spots there are.
+
+The preferred swell direction is also taken as the way the break faces,
+so wind blowing from the opposite direction counts as offshore. Hours
+outside sunrise to sunset score zero.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from .metrics import METRICS
+
+# Compass labels used for preferred swell in the catalogue, in degrees
+COMPASS_DEGREES = {'N': 0.0, 'NE': 45.0, 'E': 90.0, 'SE': 135.0,
+                   'S': 180.0, 'SW': 225.0, 'W': 270.0, 'NW': 315.0}
+
+# Break type -> (ideal swell height, tolerance) in metres
+BREAK_SIZES = {
+    'Beach Break': (1.2, 0.8),
+    'Sand Bottom': (1.2, 0.8),
+    'Inlet Break': (1.2, 0.8),
+    'River Mouth': (1.5, 1.0),
+    'Point Break': (1.8, 1.2),
+    'Reef Break': (2.0, 1.3),
+    'Seamount': (4.0, 2.5),
+}
+DEFAULT_BREAK_SIZE = (1.5, 1.0)
+
+# Swell periods scored from MIN_PERIOD (wind chop) up to GOOD_PERIOD (groundswell)
+MIN_PERIOD = 6.0
+GOOD_PERIOD = 14.0
+# Wind speed in km/h at which onshore wind spoils a session entirely
+BLOWN_OUT_KMH = 40.0
+
+SESSION_HOURS = 3
+STACK_COLUMNS = ('swell_height', 'swell_period', 'wind_speed')
+DIRECTION_COLUMNS = ('swell_direction', 'wind_direction')
+# Stacked for best_days() only; not scored, so missing values do not make an hour unusable
+PEAK_COLUMNS = ('wave_height',)
+
+Session = namedtuple('Session', 'spot start end score swell_height swell_period wind_speed')
+BestDay = namedtuple('BestDay', 'date max_wave avg_wind swell_direction')
+
+
+# Spots without catalogue fields borrow them from a catalogue spot this close
+CATALOGUE_MATCH_KM = 1.0
+
+
+def spot_profile(spot):
+    """(ideal height, tolerance, preferred swell degrees or NaN) for a spot record.
+
+    Favorites and searched places carry only a name and coordinates; they
+    take the break type and swell of a catalogue spot at the same place.
+    """
+    if spot.get('type') is None:
+        from .geo import SPOT_LOCATOR
+        match = SPOT_LOCATOR.nearest(spot['lat'], spot['lng'], max_km=CATALOGUE_MATCH_KM)
+        if match:
+            spot = match[0][0]
+    ideal, tolerance = BREAK_SIZES.get(spot.get('type'), DEFAULT_BREAK_SIZE)
+    return ideal, tolerance, COMPASS_DEGREES.get(spot.get('swell'), np.nan)
+
+
+class ForecastStack:
+    """Hourly columns of many spots' forecasts stacked into (spots, hours) arrays.
+
+    Shorter forecasts are padded with NaN. Arrays are float32 and directions
+    are kept as unit vectors, so scoring is a few in-place multiply-adds
+    rather than trigonometry. Hour h of every spot is assumed to fall on
+    day h // 24, as Open-Meteo responses start at local midnight.
+    """
+
+    def __init__(self, spots, forecasts, hours=None):
+        self.spots = list(spots)
+        frames = [data['hourly'] for data in forecasts]
+        hours = max((len(frame) for frame in frames), default=0) if hours is None else hours
+        self.hours = hours
+        self.columns = {}
+        for name in STACK_COLUMNS + DIRECTION_COLUMNS + PEAK_COLUMNS:
+            column = np.full((len(frames), hours), np.nan, dtype=np.float32)
+            for i, frame in enumerate(frames):
+                values = frame.column(name)[:hours]
+                column[i, :len(values)] = values
+            self.columns[name] = column
+        self.vectors = {}
+        for name in DIRECTION_COLUMNS:
+            radians = np.radians(self.columns.pop(name))
+            self.vectors[name] = (np.cos(radians), np.sin(radians))
+
+        self.times = np.full((len(frames), hours), np.datetime64('NaT'), dtype='datetime64[m]')
+        daylight = np.zeros((len(frames), hours), dtype=bool)
+        for i, (frame, data) in enumerate(zip(frames, forecasts)):
+            times = frame.timestamps[:hours]
+            self.times[i, :len(times)] = times
+            daylight[i, :len(times)] = self._daylight(times, data.get('daily') or [])
+        # Hours that score zero: at night or with any input missing
+        self.unusable = ~daylight
+        for column in [*(self.columns[name] for name in STACK_COLUMNS), *(x for x, y in self.vectors.values())]:
+            self.unusable |= np.isnan(column)
+
+        profiles = np.array([spot_profile(spot) for spot in self.spots], dtype=float).reshape(-1, 3)
+        ideal, tolerance, preferred = (profiles[:, i, None] for i in range(3))
+        self.ideal = ideal.astype(np.float32)
+        self.inverse_tolerance = (1 / tolerance).astype(np.float32)
+        # Spots without a preferred direction get a zero vector: no alignment, no offshore side
+        self.known = (~np.isnan(preferred)).astype(np.float32)
+        preferred = np.radians(np.nan_to_num(preferred))
+        self.preferred = ((np.cos(preferred) * self.known).astype(np.float32),
+                          (np.sin(preferred) * self.known).astype(np.float32))
+        self._scores = None
+
+    @staticmethod
+    def _daylight(times, daily):
+        """True for hours between their day's sunrise and sunset; all True without sun times"""
+        try:
+            sunrise = np.array([day['sunrise'] for day in daily], dtype='datetime64[m]')
+            sunset = np.array([day['sunset'] for day in daily], dtype='datetime64[m]')
+        except (KeyError, TypeError, ValueError):
+            return np.ones(len(times), dtype=bool)
+        day = np.arange(len(times)) // 24
+        known = day < len(sunrise)
+        daylight = np.ones(len(times), dtype=bool)
+        daylight[known] = (times[known] >= sunrise[day[known]]) & (times[known] < sunset[day[known]])
+        return daylight
+
+    def __len__(self):
+        return len(self.spots)
+
+    @property
+    def scores(self):
+        """Hourly scores, computed on first use"""
+        if self._scores is None:
+            self._scores = score_hours(self)
+        return self._scores
+
+
+@METRICS.timed('rank.score')
+def score_hours(stack):
+    """Score every hour of every spot from 0 to 10, as a (spots, hours) float32 array.
+
+    The score is the product of four factors: swell size against the
+    break's ideal height, swell period, swell direction against the
+    preferred one, and wind, where stronger onshore wind costs more.
+    """
+    columns = stack.columns
+    px, py = stack.preferred
+    one = np.float32(1)
+
+    # Size: Gaussian around the break's ideal height
+    scores = columns['swell_height'] - stack.ideal
+    scores *= stack.inverse_tolerance
+    np.square(scores, out=scores)
+    np.negative(scores, out=scores)
+    np.exp(scores, out=scores)
+
+    # Period: 0.2 for wind chop up to 1 for groundswell
+    factor = columns['swell_period'] - np.float32(MIN_PERIOD)
+    factor *= np.float32(0.8 / (GOOD_PERIOD - MIN_PERIOD))
+    np.clip(factor, 0, 0.8, out=factor)
+    factor += np.float32(0.2)
+    scores *= factor
+
+    # Direction: 1 when the swell comes from the preferred direction, down to 0.2
+    sx, sy = stack.vectors['swell_direction']
+    np.multiply(sx, px, out=factor)
+    factor += sy * py
+    np.clip(factor, 0, 1, out=factor)
+    factor -= one
+    factor *= stack.known
+    factor *= np.float32(0.8)
+    factor += one
+    scores *= factor
+
+    # Wind: offshore is free, onshore costs up to everything at BLOWN_OUT_KMH
+    wx, wy = stack.vectors['wind_direction']
+    np.multiply(wx, px, out=factor)
+    factor += wy * py
+    factor += one
+    strength = columns['wind_speed'] * np.float32(0.5 / BLOWN_OUT_KMH)
+    np.clip(strength, 0, 0.5, out=strength)
+    factor *= strength
+    np.subtract(one, factor, out=factor)
+    scores *= factor
+
+    scores *= np.float32(10)
+    scores[stack.unusable] = 0
+    return scores
+
+
+@METRICS.timed('rank.best_sessions')
+def best_sessions(stack, k=10, hours=SESSION_HOURS, horizon=None):
+    """The top k sessions of a few hours, at most one per spot and day.
+
+    horizon limits the search to the first that many hours of each forecast.
+    """
+    horizon = stack.hours if horizon is None else min(horizon, stack.hours)
+    if not len(stack) or horizon < hours:
+        return []
+    scores = stack.scores[:, :horizon]
+
+    # Mean score of the window starting at each hour
+    cumulative = np.zeros((len(stack), horizon + 1), dtype=np.float32)
+    np.cumsum(scores, axis=1, out=cumulative[:, 1:])
+    windows = (cumulative[:, hours:] - cumulative[:, :-hours]) / hours
+
+    # Best window start per spot and day
+    days = -(-windows.shape[1] // 24)
+    padded = np.full((len(stack), days * 24), -np.inf)
+    padded[:, :windows.shape[1]] = windows
+    by_day = padded.reshape(len(stack), days, 24)
+    offsets = by_day.argmax(axis=2)
+    best = np.take_along_axis(by_day, offsets[:, :, None], axis=2)[:, :, 0]
+
+    flat = best.ravel()
+    k = min(k, int(np.count_nonzero(flat > 0)))
+    if k <= 0:
+        return []
+    top = np.argpartition(-flat, k - 1)[:k]
+    top = top[np.argsort(-flat[top], kind='stable')]
+
+    sessions = []
+    for index in top:
+        spot, day = divmod(int(index), days)
+        start = day * 24 + int(offsets[spot, day])
+        window = slice(start, start + hours)
+        sessions.append(Session(
+            stack.spots[spot],
+            stack.times[spot, start].astype(datetime),
+            (stack.times[spot, start] + np.timedelta64(hours, 'h')).astype(datetime),
+            float(flat[index]),
+            float(np.nanmean(stack.columns['swell_height'][spot, window])),
+            float(np.nanmean(stack.columns['swell_period'][spot, window])),
+            float(np.nanmean(stack.columns['wind_speed'][spot, window]))))
+    return sessions
+
+
+@METRICS.timed('rank.best_days')
+def best_days(stack):
+    """Each spot's day with the highest wave maximum as a BestDay, or None.
+
+    Days count only with some wave, wind and swell direction data, as in
+    aggregate.DailyAggregate.summary(). Daily maxima, mean wind and the
+    swell direction, averaged as unit vectors weighted by swell height,
+    are reduced for every spot and day at once over the day boundaries.
+    """
+    if not len(stack) or not stack.hours:
+        return [None] * len(stack)
+    starts = np.arange(0, stack.hours, 24)
+    columns = stack.columns
+
+    def daily_sum(values):
+        return np.add.reduceat(values, starts, axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        waves = columns['wave_height']
+        max_wave = np.maximum.reduceat(np.where(np.isnan(waves), -np.inf, waves), starts, axis=1)
+        wind = columns['wind_speed']
+        wind_count = daily_sum((~np.isnan(wind)).astype(np.float32))
+        avg_wind = daily_sum(np.nan_to_num(wind)) / wind_count
+
+        sx, sy = (np.nan_to_num(vector) for vector in stack.vectors['swell_direction'])
+        valid = (~np.isnan(stack.vectors['swell_direction'][0])).astype(np.float32)
+        weights = valid * np.nan_to_num(columns['swell_height'])
+        # Calm or missing heights fall back to an unweighted mean
+        calm = daily_sum(weights) <= 0
+        east = np.where(calm, daily_sum(sy), daily_sum(weights * sy))
+        north = np.where(calm, daily_sum(sx), daily_sum(weights * sx))
+        direction = np.degrees(np.arctan2(east, north)) % 360
+
+    usable = (max_wave > -np.inf) & (wind_count > 0) & (daily_sum(valid) > 0)
+    best = np.where(usable, max_wave, -np.inf).argmax(axis=1)
+    days = []
+    for spot, day in enumerate(best):
+        if not usable[spot, day]:
+            days.append(None)
+            continue
+        days.append(BestDay(stack.times[spot, day * 24].astype('datetime64[D]').astype(datetime),
+                            float(max_wave[spot, day]), float(avg_wind[spot, day]),
+                            float(direction[spot, day])))
+    return days
+
+
+class SessionRanker:
+    """Keeps many spots' forecasts ready for ranking and re-ranks them on demand.
+
+    Forecasts come from the forecast cache, fresh or stale, or are added as
+    they are fetched, and are kept after their spot leaves the selection so
+    going back costs nothing. The stacked arrays and hourly scores are
+    rebuilt only when the selected forecasts change, so repeated rankings
+    cost only the window search. cache_days lists the cached forecast
+    lengths that may be used, best first; longer ones are cut to days.
+    """
+
+    def __init__(self, days, cache=None, cache_days=None):
+        self.days = days
+        self.cache = cache
+        self.cache_days = [days] if cache_days is None else list(cache_days)
+        self._forecasts = {}
+        self._selected = None
+        self._stack = None
+
+    @staticmethod
+    def spot_key(spot):
+        return (spot['name'], round(spot['lat'], 4), round(spot['lng'], 4))
+
+    def __contains__(self, spot):
+        return self.spot_key(spot) in self._forecasts
+
+    def __len__(self):
+        return len(self._forecasts)
+
+    def add(self, spot, data):
+        """Use a processed forecast for a spot, replacing any earlier one"""
+        key = self.spot_key(spot)
+        self._forecasts[key] = (spot, data)
+        if self._selected is None or key in self._selected:
+            self._stack = None
+
+    def select(self, spots):
+        """Rank only these spots from now on"""
+        selected = dict.fromkeys(self.spot_key(spot) for spot in spots)
+        if selected != self._selected:
+            self._selected = selected
+            self._stack = None
+
+    def load_cached(self, spots):
+        """Add every spot's cached forecast, returning the spots without one"""
+        from .frame import process_forecast
+
+        missing = []
+        for spot in spots:
+            if spot in self:
+                continue
+            entry = None
+            for days in self.cache_days if self.cache is not None else ():
+                entry = self.cache.get(spot['lat'], spot['lng'], days)
+                if entry is not None:
+                    break
+            if entry is None:
+                missing.append(spot)
+                continue
+            data = process_forecast(entry.marine_data, entry.weather_data)
+            data['hourly'].compact()
+            self.add(spot, data)
+        return missing
+
+    def stack(self):
+        if self._stack is None:
+            keys = self._forecasts if self._selected is None else self._selected
+            items = [self._forecasts[key] for key in keys if key in self._forecasts]
+            spots, forecasts = zip(*items) if items else ((), ())
+            self._stack = ForecastStack(spots, forecasts, hours=self.days * 24)
+        return self._stack
+
+    def best(self, k=10, hours=SESSION_HOURS, days=None):
+        """Top k sessions, optionally only within the first days of each forecast"""
+        return best_sessions(self.stack(), k, hours, days * 24 if days else None)
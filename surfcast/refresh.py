@@ -0,0 +1,137 @@
+"""Background refresh scheduling for cached forecasts.
+
+RefreshScheduler keeps a priority queue of jobs ordered by when their
+cached data expires. Each successful refresh is rescheduled for the next
+expiry plus random jitter, so many spots expiring at the same model update
+do not all hit the API in the same second; failures back off
+exponentially. The scheduler only decides what is due; the caller runs the
+refresh, on a QTimer in the app or with run() when headless.
+"""
+import heapq
+import random
+import threading
+import time
+from itertools import count
+
+
+class RefreshScheduler:
+    """Priority queue of refresh jobs keyed by due time"""
+    JITTER = 300  # seconds added after expiry, spread uniformly
+    RETRY_BASE = 60  # first retry delay after a failure, seconds
+    RETRY_MAX = 3600
+
+    def __init__(self, jitter=JITTER, retry_base=RETRY_BASE, retry_max=RETRY_MAX,
+                 clock=time.time, rng=None):
+        self.jitter = jitter
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._heap = []
+        self._jobs = {}  # key -> (due, job) for queued jobs
+        self._running = {}  # key -> job for jobs handed out by pop_due
+        self._failures = {}
+        self._order = count()
+
+    def __len__(self):
+        return len(self._jobs) + len(self._running)
+
+    def __contains__(self, key):
+        return key in self._jobs or key in self._running
+
+    def keys(self):
+        return set(self._jobs) | set(self._running)
+
+    def schedule(self, key, job, due):
+        """Queue or move a job so it is due at the given time"""
+        self._jobs[key] = (due, job)
+        heapq.heappush(self._heap, (due, next(self._order), key))
+
+    def schedule_expiry(self, key, job, expires_at):
+        """Queue a job for shortly after its data expires"""
+        self.schedule(key, job, max(expires_at, self.clock()) + self.rng.uniform(0, self.jitter))
+
+    def remove(self, key):
+        """Drop a job, including one that is currently running"""
+        self._jobs.pop(key, None)
+        self._running.pop(key, None)
+        self._failures.pop(key, None)
+
+    def clear(self):
+        self._heap.clear()
+        self._jobs.clear()
+        self._running.clear()
+        self._failures.clear()
+
+    def _discard_stale(self):
+        # Heap entries for moved or removed jobs are skipped lazily
+        while self._heap:
+            due, _, key = self._heap[0]
+            queued = self._jobs.get(key)
+            if queued is not None and queued[0] == due:
+                return
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """Time the earliest queued job is due, or None if nothing is queued"""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None, limit=None):
+        """Take the (key, job) pairs that are due, earliest first.
+
+        Taken jobs count as running until succeeded() or failed() is called.
+        """
+        now = self.clock() if now is None else now
+        due = []
+        while limit is None or len(due) < limit:
+            next_due = self.next_due()
+            if next_due is None or next_due > now:
+                break
+            _, _, key = heapq.heappop(self._heap)
+            _, job = self._jobs.pop(key)
+            self._running[key] = job
+            due.append((key, job))
+        return due
+
+    def running(self):
+        return len(self._running)
+
+    def succeeded(self, key, expires_at):
+        """Reschedule a finished job for after its new expiry"""
+        job = self._running.pop(key, None)
+        if job is None or key in self._jobs:
+            return
+        self._failures.pop(key, None)
+        self.schedule_expiry(key, job, expires_at)
+
+    def failed(self, key):
+        """Retry a failed job with exponential backoff and jitter"""
+        job = self._running.pop(key, None)
+        if job is None or key in self._jobs:
+            return
+        failures = self._failures[key] = self._failures.get(key, 0) + 1
+        delay = min(self.retry_base * 2 ** (failures - 1), self.retry_max)
+        self.schedule(key, job, self.clock() + delay * self.rng.uniform(0.5, 1.0))
+
+    def run(self, refresh, stop=None):
+        """Run due jobs until none are queued or stop is set.
+
+        refresh(job) performs one refresh and returns the new expiry time;
+        an exception counts as a failure. For headless use; the app drives
+        the scheduler from a QTimer instead.
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            next_due = self.next_due()
+            if next_due is None:
+                return
+            if stop.wait(max(next_due - self.clock(), 0)):
+                return
+            for key, job in self.pop_due():
+                try:
+                    expires_at = refresh(job)
+                except Exception:
+                    self.failed(key)
+                else:
+                    self.succeeded(key, expires_at)
@@ -0,0 +1,277 @@
+"""Text search over the spot catalogue, with Nominatim as a fallback"""
+import re
+import bisect
+import threading
+import unicodedata
+import urllib.parse
+
+import numpy as np
+
+from . import net
+from .cache import SEARCH_CACHE
+from .decode import loads
+from .geo import SPOT_LOCATOR
+from .spots import POPULAR_SURF_SPOTS
+
+# Nominatim results this close to a catalogue spot are replaced by the spot
+SNAP_RADIUS_KM = 5.0
+
+# Set a user agent to comply with Nominatim usage policy
+NOMINATIM_HEADERS = {
+    'User-Agent': 'SurfCastApp/1.0 (contact@example.com)'
+}
+
+
+class SearchError(Exception):
+    """Raised when the geocoding API answers with an error status"""
+
+
+def fold_text(text):
+    """Lower-case, accent-free form of text for matching ("Nazaré" -> "nazare")"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def _trigrams(text):
+    padded = f" {' '.join(_TOKEN_RE.findall(text))} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SpotIndex:
+    """In-memory search index over a spot catalogue.
+
+    Accent-folded tokens from each spot's name, country, break type and swell
+    are kept in one sorted vocabulary whose postings are stored contiguously,
+    so every token sharing a prefix is a single array slice. A trigram index
+    over the names catches typos; such fuzzy matches also catch unrelated
+    spots sharing a word ("Santa Cruz" and Santa Teresa), so callers can
+    leave them out. The index is built on the first search.
+    """
+    NAME_WEIGHT = 1.0
+    FIELD_WEIGHT = 0.5
+    MIN_COVERAGE = 0.5  # share of query trigrams a fuzzy match must contain
+
+    def __init__(self, spots):
+        self.spots = spots
+        self._lock = threading.Lock()
+        self._built = False
+
+    def _build(self):
+        postings = {}
+        grams = {}
+        names = []
+        gram_counts = np.zeros(len(self.spots), dtype=np.int32)
+        for i, spot in enumerate(self.spots):
+            name = fold_text(spot.get('name', ''))
+            names.append(name)
+            country = fold_text(spot.get('country') or '') or (name.rsplit(',', 1)[1] if ',' in name else '')
+            fields = ((name, self.NAME_WEIGHT),
+                      (country, self.FIELD_WEIGHT),
+                      (fold_text(spot.get('type', '')), self.FIELD_WEIGHT),
+                      (fold_text(spot.get('swell', '')), self.FIELD_WEIGHT))
+            for text, weight in fields:
+                for token in _TOKEN_RE.findall(text):
+                    token_postings = postings.setdefault(token, {})
+                    token_postings[i] = max(weight, token_postings.get(i, 0))
+            spot_grams = _trigrams(name)
+            gram_counts[i] = len(spot_grams)
+            for gram in spot_grams:
+                grams.setdefault(gram, []).append(i)
+
+        self._names = names
+        self._vocab = sorted(postings)
+        offsets = [0]
+        ids, weights = [], []
+        for token in self._vocab:
+            ids.extend(postings[token].keys())
+            weights.extend(postings[token].values())
+            offsets.append(len(ids))
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self._ids = np.array(ids, dtype=np.int32)
+        self._weights = np.array(weights, dtype=np.float32)
+        self._grams = {gram: np.array(ids, dtype=np.int32) for gram, ids in grams.items()}
+        self._gram_counts = gram_counts
+        self._built = True
+
+    def _prefix_scores(self, token):
+        """Best field weight per spot among vocabulary tokens starting with token"""
+        lo = bisect.bisect_left(self._vocab, token)
+        hi = bisect.bisect_left(self._vocab, token + "\uffff", lo)
+        scores = np.zeros(len(self.spots), dtype=np.float32)
+        start, stop = self._offsets[lo], self._offsets[hi]
+        ids, weights = self._ids[start:stop], self._weights[start:stop]
+        if hi - lo > 1:
+            # Assign in ascending weight order so the best field wins
+            order = np.argsort(weights, kind='stable')
+            ids, weights = ids[order], weights[order]
+        scores[ids] = weights
+        return scores
+
+    def _fuzzy_scores(self, query):
+        """Trigram coverage of the query per spot, zero below MIN_COVERAGE"""
+        scores = np.zeros(len(self.spots), dtype=np.float32)
+        query_grams = _trigrams(query)
+        hits = [self._grams[g] for g in query_grams if g in self._grams]
+        if not hits:
+            return scores
+        ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+        coverage = shared / len(query_grams)
+        dice = 2 * shared / (len(query_grams) + self._gram_counts[ids])
+        keep = coverage >= self.MIN_COVERAGE
+        scores[ids[keep]] = 0.9 * coverage[keep] + 0.1 * dice[keep]
+        return scores
+
+    def search(self, query, limit=10, fuzzy=True):
+        """Return up to limit catalogue spots ranked by how well they match.
+
+        With fuzzy=False only spots matching every query token by prefix
+        are returned, still ranked with their fuzzy score.
+        """
+        query = fold_text(query).strip()
+        tokens = _TOKEN_RE.findall(query)
+        if not tokens or not self.spots:
+            return []
+        with self._lock:
+            if not self._built:
+                self._build()
+
+        # Every query token must prefix-match some field of the spot
+        prefix = np.ones(len(self.spots), dtype=bool)
+        scores = np.zeros(len(self.spots), dtype=np.float32)
+        for token in tokens:
+            token_scores = self._prefix_scores(token)
+            prefix &= token_scores > 0
+            scores += token_scores
+        scores[~prefix] = 0
+        scores += self._fuzzy_scores(query)
+        if not fuzzy:
+            scores[~prefix] = 0
+
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        ranked = sorted(candidates, key=lambda i: (
+            -scores[i], not self._names[i].startswith(query), len(self._names[i])))
+        return [self.spots[i] for i in ranked]
+
+
+# Search index over the built-in catalogue
+SPOT_INDEX = SpotIndex(POPULAR_SURF_SPOTS)
+
+
+def nominatim_url(query):
+    query_encoded = urllib.parse.quote(query)
+    return f"{net.NOMINATIM_API_URL}?format=json&q={query_encoded}&limit=10"
+
+
+def parse_nominatim(items):
+    """Turn Nominatim results into spot dicts, snapping to nearby catalogue spots"""
+    results = []
+    for item in items:
+        try:
+            # Extract location name
+            name_parts = []
+            if 'name' in item and item['name']:
+                name_parts.append(item['name'])
+            if 'display_name' in item:
+                # Shorten display name to first part
+                display_name = item['display_name'].split(',')[0]
+                name_parts.append(display_name)
+
+            name = ', '.join(name_parts) if name_parts else "Unnamed Location"
+
+            result = {
+                'name': name,
+                'lat': float(item.get('lat', 0)),
+                'lng': float(item.get('lon', 0))
+            }
+        except (ValueError, TypeError):
+            continue
+
+        # Snap to a known surf spot when the place is right on one
+        nearby = SPOT_LOCATOR.nearest(result['lat'], result['lng'], max_km=SNAP_RADIUS_KM)
+        if nearby:
+            result = nearby[0][0].to_dict()
+        if result not in results:
+            results.append(result)
+    return results
+
+
+def geocode(query):
+    """Look a place up on Nominatim"""
+    response = net.get_http_session().get(nominatim_url(query), headers=NOMINATIM_HEADERS, timeout=10)
+    if response.status_code != 200:
+        raise SearchError(f"Search API error: {response.status_code}")
+    return parse_nominatim(loads(response.content))
+
+
+def search_catalogue(query, cache):
+    """Cached or catalogue results for a query, or None if Nominatim is needed"""
+    # First check if we have this query in cache
+    cached = cache.get(query)
+    if cached is not None:
+        return cached
+
+    # Try to find in popular surf spots; fuzzy matches alone go to Nominatim
+    matching_spots = [spot.to_dict() for spot in SPOT_INDEX.search(query, fuzzy=False)]
+    if matching_spots:
+        # Catalogue matches are cheap to recompute, keep them off disk
+        cache.put(query, matching_spots, persist=False)
+        return matching_spots
+    return None
+
+
+def similar_spots(query):
+    """Catalogue spots only resembling the query, such as misspellings, for after Nominatim's results"""
+    return [spot.to_dict() for spot in SPOT_INDEX.search(query)]
+
+
+def with_similar(results, similar):
+    """Nominatim results followed by the similar catalogue spots not among them"""
+    return results + [spot for spot in similar if spot not in results]
+
+
+def saved_results(query, cache, similar=()):
+    """Stored results for a query however old, else similar spots, for when Nominatim cannot be reached"""
+    results = cache.get(query, stale=True)
+    if results is None:
+        if similar:
+            return list(similar)
+        raise SearchError("Offline: no saved results for this search")
+    return results
+
+
+def search_locations(query, cache=None, offline=False):
+    """Search the catalogue, falling back to Nominatim, with results cached.
+
+    Catalogue spots matching the query only fuzzily are listed after
+    Nominatim's results. Offline, or when Nominatim fails, expired cached
+    results are used, else those spots. Raises SearchError for API errors
+    and lets requests exceptions through when there are neither.
+    """
+    cache = SEARCH_CACHE if cache is None else cache
+    results = search_catalogue(query, cache)
+    if results is not None:
+        return results
+    similar = similar_spots(query)
+    if offline:
+        return saved_results(query, cache, similar)
+
+    # If not found in popular spots, use Nominatim API
+    try:
+        results = geocode(query)
+    except Exception:
+        stale = cache.get(query, stale=True)
+        if stale is not None:
+            return stale
+        if similar:
+            return similar
+        raise
+    results = with_similar(results, similar)
+    cache.put(query, results)
+    return results
@@ -0,0 +1,191 @@
+"""Portable offline snapshots of forecasts, geocoding results and map tiles.
+
+A snapshot is one zip file holding raw forecast cache entries (still
+zlib-compressed, as the cache keeps them), the search cache and the
+newest stored tile of each region, for loading onto machines with no
+connectivity. prefetch_snapshot() brings a set of spots and regions up
+to date first, then writes them; import_snapshot() merges a snapshot
+into local caches, keeping whichever copy of each entry is newer.
+
+    manifest.json                     format, version and forecast entries
+    forecasts/<n>.marine, .weather    compressed response bodies
+    search.json                       search cache entries
+    tiles/<region>/<run>/<column>.npy map tiles
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+
+from .cache import ForecastCache
+from .fetch import iter_batch_forecasts
+from .metrics import METRICS
+from .tiles import TILE_COLUMNS, Tile
+
+FORMAT = "surfcast-snapshot"
+FORMAT_VERSION = 1
+SNAPSHOT_SUFFIX = ".surfcast"
+
+TILE_FILES = {"meta.json", "time.npy", *(f"{name}.npy" for name in TILE_COLUMNS)}
+TILE_MEMBER = re.compile(r"tiles/([^/]+)/([^/]+)/([^/]+)$")
+# Model run directory names, as made by tiles.model_run()
+RUN_NAME = re.compile(r"\d{8}T\d{2}Z")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def prefetch(spots, days, cache, on_progress=None):
+    """Fetch spots' forecasts into the cache unless fresh there; returns failures as messages.
+
+    Stale and missing spots are requested together in batched
+    multi-location requests, as iter_batch_forecasts() packs them.
+    """
+    now = time.time()
+    stale = [spot for spot in spots
+             if (cache.expiry(spot['lat'], spot['lng'], days) or 0) <= now]
+    failures = []
+    done = len(spots) - len(stale)
+    if done and on_progress is not None:
+        on_progress(done, len(spots))
+    for _ in iter_batch_forecasts(stale, days, on_error=failures.append, cache=cache):
+        done += 1
+        if on_progress is not None:
+            on_progress(done, len(spots))
+    return failures
+
+
+def export_snapshot(path, forecast_cache, keys=None, search_cache=None, tile_store=None, regions=()):
+    """Write cached forecasts (all, or only keys), searches and region tiles to one file.
+
+    The file is written next to path and renamed into place, so a
+    half-written snapshot is never left behind. Returns what it holds.
+    """
+    rows = forecast_cache.dump(keys)
+    tiles = [tile for tile in (tile_store.latest(region) for region in regions) if tile is not None] \
+        if tile_store is not None else []
+    manifest = {'format': FORMAT, 'version': FORMAT_VERSION, 'created_at': time.time(), 'forecasts': [],
+                'tiles': [f"{tile.region.key}/{tile.run}" for tile in tiles]}
+    partial = f"{path}.partial"
+    with METRICS.span('snapshot.export'):
+        try:
+            with zipfile.ZipFile(partial, "w", zipfile.ZIP_DEFLATED) as archive:
+                for n, (key, marine, weather, fetched_at, validators) in enumerate(rows):
+                    # Already zlib-compressed
+                    archive.writestr(f"forecasts/{n}.marine", marine, zipfile.ZIP_STORED)
+                    archive.writestr(f"forecasts/{n}.weather", weather, zipfile.ZIP_STORED)
+                    manifest['forecasts'].append(
+                        {'key': key, 'file': n, 'fetched_at': fetched_at, 'validators': validators})
+                searches = search_cache.dump() if search_cache is not None else []
+                archive.writestr("search.json", json.dumps(searches))
+                for tile in tiles:
+                    for name in sorted(TILE_FILES & set(os.listdir(tile.path))):
+                        archive.write(os.path.join(tile.path, name),
+                                      f"tiles/{tile.region.key}/{tile.run}/{name}")
+                archive.writestr("manifest.json", json.dumps(manifest))
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+    return {'forecasts': len(rows), 'searches': len(searches), 'tiles': len(tiles),
+            'bytes': os.path.getsize(path)}
+
+
+def prefetch_snapshot(path, spots, days, forecast_cache, search_cache=None, tile_store=None, regions=(),
+                      on_progress=None):
+    """Bring spots' forecasts and regions' tiles up to date, then export exactly those.
+
+    on_progress is called with a line of text per step. Returns
+    (export_snapshot() counts, failure messages); spots or regions that
+    cannot be fetched go in as they are cached, if at all.
+    """
+    def progress(text):
+        if on_progress is not None:
+            on_progress(text)
+
+    failures = prefetch(spots, days, forecast_cache,
+                        lambda done, total: progress(f"Prefetching forecasts {done}/{total}"))
+    if tile_store is not None:
+        for n, region in enumerate(regions, 1):
+            tile = tile_store.latest(region)
+            if tile is not None and tile.is_fresh():
+                continue
+            progress(f"Prefetching map region {n}/{len(regions)}")
+            try:
+                tile_store.fetch(region)
+            except Exception as e:
+                failures.append(f"map {region.key}: {e}")
+    progress("Writing snapshot")
+    keys = {ForecastCache.make_key(spot['lat'], spot['lng'], days) for spot in spots}
+    return export_snapshot(path, forecast_cache, keys, search_cache, tile_store, regions), failures
+
+
+def read_manifest(archive):
+    try:
+        manifest = json.loads(archive.read("manifest.json"))
+    except (KeyError, ValueError):
+        raise SnapshotError("Not a SurfCast snapshot")
+    if manifest.get('format') != FORMAT:
+        raise SnapshotError("Not a SurfCast snapshot")
+    if manifest.get('version') != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {manifest.get('version')}")
+    return manifest
+
+
+def import_snapshot(path, forecast_cache, search_cache=None, tile_store=None):
+    """Merge a snapshot into local caches, keeping newer local entries; returns what was added"""
+    added = {'forecasts': 0, 'searches': 0, 'tiles': 0}
+    with METRICS.span('snapshot.import'):
+        try:
+            archive = zipfile.ZipFile(path)
+        except (OSError, zipfile.BadZipFile) as e:
+            raise SnapshotError(f"Cannot read snapshot: {e}")
+        with archive:
+            manifest = read_manifest(archive)
+            try:
+                for entry in manifest['forecasts']:
+                    marine = archive.read(f"forecasts/{entry['file']}.marine")
+                    weather = archive.read(f"forecasts/{entry['file']}.weather")
+                    if forecast_cache.restore(entry['key'], marine, weather, entry['fetched_at'],
+                                              entry.get('validators')):
+                        added['forecasts'] += 1
+                if search_cache is not None and "search.json" in archive.namelist():
+                    added['searches'] = search_cache.merge(json.loads(archive.read("search.json")))
+            except (KeyError, TypeError, ValueError, zipfile.BadZipFile) as e:
+                raise SnapshotError(f"Damaged snapshot: {e}")
+            if tile_store is not None:
+                added['tiles'] = import_tiles(archive, tile_store)
+    return added
+
+
+def import_tiles(archive, tile_store):
+    """Unpack a snapshot's tiles into a store, skipping runs it already has"""
+    tiles = {}
+    for name in archive.namelist():
+        match = TILE_MEMBER.match(name)
+        if match and match.group(3) in TILE_FILES:
+            tiles.setdefault(match.group(1, 2), []).append((name, match.group(3)))
+    os.makedirs(tile_store.root, exist_ok=True)
+    added = 0
+    for (key, run), members in tiles.items():
+        # Unpacked inside the store so adopting the tile is a rename
+        directory = tempfile.mkdtemp(prefix=".import-", dir=tile_store.root)
+        try:
+            for name, filename in members:
+                with archive.open(name) as source, open(os.path.join(directory, filename), "wb") as target:
+                    shutil.copyfileobj(source, target)
+            tile = Tile(directory)
+            # The run becomes a directory name in the store, so it must be nothing but a run name
+            if not isinstance(tile.run, str) or not RUN_NAME.fullmatch(tile.run) or \
+                    (tile.region.key, tile.run) != (key, run):
+                raise SnapshotError(f"Invalid map tile in snapshot: {key}/{run}")
+            added += tile_store.adopt(directory)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise SnapshotError(f"Damaged map tile in snapshot: {e}")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return added
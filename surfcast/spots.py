@@ -0,0 +1,137 @@
+"""Built-in surf spot catalogue"""
+import os
+import sqlite3
+import threading
+import urllib.parse
+
+import numpy as np
+
+# Built-in surf spot catalogue, see surf_spots.db
+SPOTS_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "surf_spots.db")
+
+
+class Spot:
+    """Read-only view of one record in a SpotCatalogue"""
+    __slots__ = ('_catalogue', '_index')
+    FIELDS = ('name', 'lat', 'lng', 'type', 'swell', 'country')
+
+    def __init__(self, catalogue, index):
+        self._catalogue = catalogue
+        self._index = index
+
+    def __getitem__(self, key):
+        catalogue, i = self._catalogue, self._index
+        if key == 'name':
+            return catalogue.names[i]
+        if key == 'lat':
+            return float(catalogue.lats[i])
+        if key == 'lng':
+            return float(catalogue.lngs[i])
+        if key in ('type', 'swell', 'country'):
+            labels, codes = catalogue.categories[key]
+            return labels[codes[i]]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self.FIELDS)
+
+    def to_dict(self):
+        return {key: self[key] for key in self.FIELDS}
+
+    def __eq__(self, other):
+        if isinstance(other, Spot):
+            return self._catalogue is other._catalogue and self._index == other._index
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self._catalogue), self._index))
+
+    def __repr__(self):
+        return f"Spot({self['name']!r}, {self['lat']}, {self['lng']})"
+
+
+class SpotCatalogue:
+    """Surf spot catalogue read from SQLite on first use.
+
+    Records are held as parallel arrays: coordinates in float64 arrays,
+    names in one list, and type, swell and country as small label tables
+    with per-spot uint16 codes. Indexing returns Spot views.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            db = sqlite3.connect(f"file:{urllib.parse.quote(self.path)}?mode=ro", uri=True)
+            try:
+                rows = db.execute(
+                    "SELECT name, lat, lng, type, swell, country FROM spots ORDER BY id").fetchall()
+            finally:
+                db.close()
+            names, lats, lngs, types, swells, countries = (list(col) for col in zip(*rows)) if rows else ([],) * 6
+            self._names = names
+            self._lats = np.array(lats, dtype=np.float64)
+            self._lngs = np.array(lngs, dtype=np.float64)
+            self._categories = {key: self._encode(values) for key, values in
+                                (('type', types), ('swell', swells), ('country', countries))}
+            self._loaded = True
+
+    @staticmethod
+    def _encode(values):
+        labels = {}
+        codes = np.array([labels.setdefault(v, len(labels)) for v in values], dtype=np.uint16)
+        return list(labels), codes
+
+    @property
+    def names(self):
+        self._load()
+        return self._names
+
+    @property
+    def lats(self):
+        self._load()
+        return self._lats
+
+    @property
+    def lngs(self):
+        self._load()
+        return self._lngs
+
+    @property
+    def categories(self):
+        self._load()
+        return self._categories
+
+    def coordinates(self):
+        """Latitude and longitude arrays for every spot"""
+        return self.lats, self.lngs
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Spot(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("spot index out of range")
+        return Spot(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Spot(self, i)
+
+
+POPULAR_SURF_SPOTS = SpotCatalogue(SPOTS_DB_PATH)
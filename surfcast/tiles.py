@@ -0,0 +1,279 @@
+"""Regional marine forecast tiles for overview maps and network-free lookups.
+
+The world is cut into fixed TILE_SPAN-degree regions, each sampled every
+TILE_STEP degrees. A region's marine forecast is fetched as a handful of
+batched multi-location requests and stored on disk under its region key
+and model run, one .npy file per hourly column shaped (hours, rows,
+columns), so a map of one hour is one contiguous slab of a memory-mapped
+file. Any point inside a stored region gets its forecast by bilinear
+interpolation from the four surrounding grid points, without a network
+call.
+
+Tiles are requested in UTC (timezone=GMT) so every grid point shares one
+time axis; land points come back empty and are skipped when
+interpolating, so coastal spots take their values from the sea around
+them. Only marine columns are stored; weather columns read as NaN.
+"""
+import json
+import math
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from . import net
+from .cache import ForecastCache
+from .decode import CHUNK_SIZE, iter_item_bytes, loads
+from .fetch import FetchError, plan_batches
+from .frame import HOURLY_COLUMNS, ForecastFrame
+from .metrics import METRICS
+
+TILE_SPAN = 5.0  # degrees of latitude and longitude covered by one region
+TILE_STEP = 0.25  # degrees between grid points
+TILE_DAYS = 7
+KEEP_RUNS = 2  # model runs kept on disk per region
+
+TILE_COLUMNS = tuple(name for name, (source, _) in HOURLY_COLUMNS.items() if source == 'marine')
+
+
+class Region(namedtuple('Region', 'south west north east step')):
+    """A latitude/longitude box sampled on a regular grid"""
+    __slots__ = ()
+
+    @classmethod
+    def containing(cls, lat, lng, span=TILE_SPAN, step=TILE_STEP):
+        """The fixed tiling region a point falls in"""
+        south = min(math.floor(lat / span) * span, 90 - span)
+        west = min(math.floor(lng / span) * span, 180 - span)
+        return cls(south, west, south + span, west + span, step)
+
+    @property
+    def key(self):
+        return f"{self.south:.2f}_{self.west:.2f}_{self.north:.2f}_{self.east:.2f}_{self.step:g}"
+
+    @property
+    def shape(self):
+        """(rows, columns) of grid points, south to north and west to east"""
+        return (round((self.north - self.south) / self.step) + 1,
+                round((self.east - self.west) / self.step) + 1)
+
+    def lats(self):
+        return np.round(self.south + self.step * np.arange(self.shape[0]), 4)
+
+    def lngs(self):
+        return np.round(self.west + self.step * np.arange(self.shape[1]), 4)
+
+    def contains(self, lat, lng):
+        return self.south <= lat <= self.north and self.west <= lng <= self.east
+
+
+def model_run(timestamp):
+    """Name of the upstream model run current at a timestamp, such as 20240101T06Z"""
+    return datetime.fromtimestamp(ForecastCache.model_run(timestamp), timezone.utc).strftime("%Y%m%dT%HZ")
+
+
+class Tile:
+    """One region's marine forecast for one model run, memory-mapped from disk"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.region = Region(*meta['region'])
+        self.run = meta['run']
+        self.fetched_at = meta['fetched_at']
+        self.expires_at = ForecastCache.next_model_update(self.fetched_at)
+        self.timestamps = np.load(os.path.join(path, "time.npy"))
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def column(self, name):
+        """A column as a read-only (hours, rows, columns) float32 memory map"""
+        array = self._columns.get(name)
+        if array is None:
+            array = self._columns[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r')
+        return array
+
+    def is_fresh(self, now=None):
+        return (time.time() if now is None else now) < self.expires_at
+
+    @METRICS.timed('tiles.interpolate')
+    def forecast(self, lat, lng):
+        """Processed forecast for a point in the region, or None outside it or over land"""
+        if not self.region.contains(lat, lng):
+            return None
+        rows, cols = self.region.shape
+        y = (lat - self.region.south) / self.region.step
+        x = (lng - self.region.west) / self.region.step
+        y0, x0 = min(int(y), rows - 2), min(int(x), cols - 2)
+        fy, fx = y - y0, x - x0
+        # Floored so a point on a land grid point still takes its sea neighbours
+        weights = np.maximum([(1 - fy) * (1 - fx), (1 - fy) * fx, fy * (1 - fx), fy * fx], 1e-6)
+
+        columns = {}
+        for name in TILE_COLUMNS:
+            corners = np.asarray(self.column(name)[:, y0:y0 + 2, x0:x0 + 2], dtype=float).reshape(-1, 4)
+            valid = ~np.isnan(corners)
+            used = np.where(valid, weights, 0.0)
+            total = used.sum(axis=1)
+            with np.errstate(invalid='ignore'):
+                if name.endswith('_direction'):
+                    radians = np.radians(np.where(valid, corners, 0.0))
+                    east = (np.sin(radians) * used).sum(axis=1)
+                    north = (np.cos(radians) * used).sum(axis=1)
+                    values = np.degrees(np.arctan2(east, north)) % 360
+                else:
+                    values = (np.where(valid, corners, 0.0) * used).sum(axis=1) / total
+            values[total == 0] = np.nan
+            columns[name] = values
+        if np.isnan(columns['wave_height']).all():
+            return None
+        return {'hourly': ForecastFrame.from_arrays(self.timestamps, columns), 'daily': []}
+
+
+def iter_marine_items(lats, lngs, days):
+    """Decoded marine responses for many points, in order, in batched UTC requests"""
+    session = net.get_http_session()
+    points = [{'lat': lat, 'lng': lng} for lat, lng in zip(lats, lngs)]
+    pending = []
+    for batch in plan_batches(points, days):
+        url = net.build_marine_url([point['lat'] for point in batch], [point['lng'] for point in batch],
+                                   days, timezone="GMT")
+        pending.append((batch, net.HTTP_EXECUTOR.submit(session.get, url, timeout=60, stream=True)))
+    for batch, future in pending:
+        response = future.result()
+        try:
+            if response.status_code != 200:
+                raise FetchError(f"Failed to fetch tile batch of {len(batch)} points: "
+                                 f"Marine {response.status_code}")
+            received = 0
+            for item in iter_item_bytes(response.iter_content(CHUNK_SIZE)):
+                received += 1
+                if received > len(batch):
+                    break
+                yield loads(item)
+            if received != len(batch):
+                raise FetchError(f"Expected {len(batch)} tile points, got {received}")
+        finally:
+            response.close()
+
+
+class TileStore:
+    """On-disk tiles, one directory per region holding one directory per model run"""
+
+    def __init__(self, root, keep_runs=KEEP_RUNS):
+        self.root = root
+        self.keep_runs = keep_runs
+        self._tiles = {}
+        self._lock = threading.Lock()
+
+    def runs(self, region):
+        """Stored model runs of a region, oldest first"""
+        try:
+            names = os.listdir(os.path.join(self.root, region.key))
+        except FileNotFoundError:
+            return []
+        return sorted(name for name in names if not name.startswith("."))
+
+    def latest(self, region):
+        """The newest stored tile of a region, fresh or stale, or None"""
+        runs = self.runs(region)
+        if not runs:
+            return None
+        path = os.path.join(self.root, region.key, runs[-1])
+        with self._lock:
+            tile = self._tiles.get(path)
+            if tile is None:
+                try:
+                    tile = self._tiles[path] = Tile(path)
+                except (OSError, ValueError, KeyError, TypeError):
+                    return None
+            return tile
+
+    def forecast(self, lat, lng):
+        """A point's forecast interpolated from its stored tile, or None"""
+        tile = self.latest(Region.containing(lat, lng))
+        return tile.forecast(lat, lng) if tile is not None else None
+
+    def fetch(self, region, days=TILE_DAYS, now=None):
+        """Fetch a region's marine grid for the current model run and store it as a tile"""
+        now = time.time() if now is None else now
+        run = model_run(now)
+        directory = os.path.join(self.root, region.key)
+        final = os.path.join(directory, run)
+        partial = os.path.join(directory, f".{run}.{os.getpid()}.{threading.get_ident()}")
+        rows, cols = region.shape
+        hours = days * 24
+        os.makedirs(partial, exist_ok=True)
+        try:
+            with METRICS.span('tiles.fetch'):
+                blocks = {}
+                for name in TILE_COLUMNS:
+                    blocks[name] = np.lib.format.open_memmap(
+                        os.path.join(partial, f"{name}.npy"), mode='w+', dtype=np.float32,
+                        shape=(hours, rows, cols))
+                    blocks[name][:] = np.nan
+                lats, lngs = np.meshgrid(region.lats(), region.lngs(), indexing='ij')
+                timestamps = None
+                points = iter_marine_items(lats.ravel().tolist(), lngs.ravel().tolist(), days)
+                for index, data in enumerate(points):
+                    row, col = divmod(index, cols)
+                    frame = ForecastFrame.from_open_meteo(data, {})[:hours]
+                    if timestamps is None and len(frame):
+                        timestamps = frame.timestamps[0] + np.arange(hours).astype('timedelta64[h]')
+                    for name in TILE_COLUMNS:
+                        values = frame.column(name)
+                        blocks[name][:len(values), row, col] = values
+                for block in blocks.values():
+                    block.flush()
+                blocks.clear()
+            if timestamps is None:
+                raise FetchError("Tile response had no hourly data")
+            np.save(os.path.join(partial, "time.npy"), timestamps)
+            with open(os.path.join(partial, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({'region': list(region), 'run': run, 'fetched_at': now, 'days': days}, f)
+            with self._lock:
+                self._tiles.pop(final, None)
+                if os.path.isdir(final):
+                    shutil.rmtree(final)
+                os.replace(partial, final)
+        finally:
+            shutil.rmtree(partial, ignore_errors=True)
+        self.prune(region)
+        return self.latest(region)
+
+    def adopt(self, path):
+        """Move a complete tile directory, such as one unpacked from a snapshot, into the store.
+
+        The directory must be on the same filesystem as the store. Returns
+        False, leaving it in place, when that region and run is already stored.
+        Raises SnapshotError if the tile's region or run would place it
+        outside the store.
+        """
+        tile = Tile(path)
+        final = os.path.join(self.root, tile.region.key, tile.run)
+        root = os.path.realpath(self.root)
+        if os.path.commonpath([root, os.path.realpath(final)]) != root:
+            from .snapshot import SnapshotError
+            raise SnapshotError(f"Tile {tile.region.key}/{tile.run} is outside the tile store")
+        with self._lock:
+            if os.path.isdir(final):
+                return False
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(path, final)
+        self.prune(tile.region)
+        return True
+
+    def prune(self, region):
+        """Delete all but the newest keep_runs model runs of a region"""
+        for run in self.runs(region)[:-self.keep_runs]:
+            path = os.path.join(self.root, region.key, run)
+            with self._lock:
+                self._tiles.pop(path, None)
+            shutil.rmtree(path, ignore_errors=True)
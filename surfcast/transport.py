@@ -0,0 +1,100 @@
+"""requests transport adapter that times every phase of a request.
+
+Imported by net.get_http_session() on first use, so requests and urllib3
+only load once the app actually goes to the network.
+"""
+import socket
+import threading
+import time
+import urllib.parse
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+from .metrics import METRICS
+
+# Connection setup time spent inside the current request, per thread
+_request_phase = threading.local()
+
+
+class TimedConnectionMixin:
+    """Records DNS lookup and TCP connect time of each new connection"""
+
+    def _new_conn(self):
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror:
+            # Let urllib3 raise its own resolution error
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        METRICS.observe('http.dns', resolved - start, host=self.host)
+        # Connect to each resolved address in turn, as urllib3 would
+        error = None
+        try:
+            for _, _, _, _, address in addresses:
+                self._dns_host = address[0]
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (ConnectTimeoutError, NewConnectionError) as e:
+                    error = e
+            else:
+                raise error
+        finally:
+            self._dns_host = host
+        connected = time.perf_counter()
+        METRICS.observe('http.connect', connected - resolved, host=self.host)
+        _request_phase.setup = getattr(_request_phase, 'setup', 0.0) + connected - start
+        return sock
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    """Also records the TLS handshake"""
+
+    def connect(self):
+        setup = getattr(_request_phase, 'setup', 0.0)
+        start = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - start
+        # connect() includes _new_conn, which already counted DNS and TCP
+        handshake = elapsed - (getattr(_request_phase, 'setup', 0.0) - setup)
+        METRICS.observe('http.tls', handshake, host=self.host)
+        _request_phase.setup = getattr(_request_phase, 'setup', 0.0) + handshake
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter recording DNS, connect, TLS, time-to-first-byte and download spans"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+    def send(self, request, stream=False, **kwargs):
+        host = urllib.parse.urlsplit(request.url).hostname
+        _request_phase.setup = 0.0
+        start = time.perf_counter()
+        response = super().send(request, stream=stream, **kwargs)
+        # send() returns once headers arrive; connection setup is reported separately
+        METRICS.observe('http.ttfb', time.perf_counter() - start - _request_phase.setup, host=host)
+        if not stream:
+            with METRICS.span('http.download', host=host):
+                response.content
+        return response
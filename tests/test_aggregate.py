@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+import pytest
+
+from surfcast.aggregate import (DIRECTION_WEIGHTS, PERCENTILES, SCALAR_COLUMNS, DailyAggregate,
+                                compass_point)
+from surfcast.frame import ForecastFrame
+
+
+def frame(columns, start='2024-03-01T05:00'):
+    hours = len(next(iter(columns.values())))
+    timestamps = np.datetime64(start, 'm') + np.arange(hours) * np.timedelta64(60, 'm')
+    return ForecastFrame.from_arrays(timestamps, {name: np.asarray(values, dtype=float)
+                                                  for name, values in columns.items()})
+
+
+@pytest.fixture(scope='module')
+def random_frame():
+    rng = np.random.default_rng(5)
+    hours = 70  # a partial first and last day around two whole ones
+    columns = {name: rng.gamma(2.0, 2.0, hours) for name in SCALAR_COLUMNS}
+    columns.update({name: rng.uniform(0, 360, hours) for name in DIRECTION_WEIGHTS})
+    for name, values in columns.items():
+        values[rng.random(hours) < 0.15] = np.nan
+    columns['humidity'][19:43] = np.nan  # the second day has no humidity at all
+    return frame(columns)
+
+
+def days_of(f):
+    days = f.timestamps.astype('datetime64[D]')
+    return [np.flatnonzero(days == day) for day in np.unique(days)]
+
+
+def test_day_bounds(random_frame):
+    aggregate = DailyAggregate(random_frame)
+    assert len(aggregate) == 4
+    assert (aggregate.stops - aggregate.starts).tolist() == [19, 24, 24, 3]
+    assert str(aggregate.dates[0]) == '2024-03-01'
+    assert aggregate.index('2024-03-02') == 1 and aggregate.index('2024-04-01') is None
+
+
+def test_scalar_statistics_match_numpy(random_frame):
+    aggregate = DailyAggregate(random_frame)
+    for name in SCALAR_COLUMNS:
+        values = random_frame.column(name)
+        for i, rows in enumerate(days_of(random_frame)):
+            day = values[rows]
+            present = day[~np.isnan(day)]
+            assert aggregate.stat(name, 'count')[i] == len(present)
+            if not len(present):
+                for stat in ('min', 'max', 'mean', 'p50'):
+                    assert np.isnan(aggregate.stat(name, stat)[i])
+                continue
+            assert aggregate.stat(name, 'min')[i] == pytest.approx(present.min())
+            assert aggregate.stat(name, 'max')[i] == pytest.approx(present.max())
+            assert aggregate.stat(name, 'mean')[i] == pytest.approx(present.mean())
+            for q in PERCENTILES:
+                assert aggregate.stat(name, f'p{q}')[i] == pytest.approx(np.percentile(present, q)), (name, i, q)
+
+
+def test_percentiles_of_known_values():
+    aggregate = DailyAggregate(frame({'wave_height': [1, 2, 3, 4, 5, np.nan, 10, 6, 7, 8, 9, 0]}))
+    assert aggregate.stat('wave_height', 'p50')[0] == pytest.approx(5.0)
+    assert aggregate.stat('wave_height', 'p10')[0] == pytest.approx(1.0)
+    assert aggregate.stat('wave_height', 'p90')[0] == pytest.approx(9.0)
+
+
+def weighted_circular_mean(degrees, weights):
+    present = ~np.isnan(degrees)
+    weights = np.where(present & ~np.isnan(weights), weights, 0.0)
+    if weights.sum() <= 0:
+        weights = present.astype(float)
+    radians = np.radians(np.where(present, degrees, 0.0))
+    sin, cos = (weights * np.sin(radians)).sum(), (weights * np.cos(radians)).sum()
+    return math.degrees(math.atan2(sin, cos)) % 360, math.hypot(sin, cos) / weights.sum()
+
+
+def test_circular_means_match_brute_force(random_frame):
+    aggregate = DailyAggregate(random_frame)
+    for name, weight in DIRECTION_WEIGHTS.items():
+        for i, rows in enumerate(days_of(random_frame)):
+            mean, resultant = weighted_circular_mean(random_frame.column(name)[rows],
+                                                     random_frame.column(weight)[rows])
+            difference = (aggregate.stat(name, 'mean')[i] - mean + 180) % 360 - 180
+            assert difference == pytest.approx(0, abs=1e-5), (name, i)
+            assert aggregate.stat(name, 'resultant')[i] == pytest.approx(resultant)
+
+
+def test_circular_mean_wraps_through_north():
+    aggregate = DailyAggregate(frame({'swell_direction': [350, 10, 355, 5], 'swell_height': [1, 1, 1, 1]}))
+    mean = aggregate.stat('swell_direction', 'mean')[0]
+    assert min(mean, 360 - mean) == pytest.approx(0, abs=1e-6)
+    assert aggregate.stat('swell_direction', 'resultant')[0] > 0.98
+
+
+def test_circular_mean_is_weighted_and_falls_back_when_calm():
+    weighted = DailyAggregate(frame({'wind_direction': [90, 180], 'wind_speed': [30, 10]}))
+    assert weighted.stat('wind_direction', 'mean')[0] == pytest.approx(math.degrees(math.atan2(30, -10)))
+    calm = DailyAggregate(frame({'wind_direction': [90, 180], 'wind_speed': [0, 0]}))
+    assert calm.stat('wind_direction', 'mean')[0] == pytest.approx(135)
+    opposed = DailyAggregate(frame({'wind_direction': [90, 270], 'wind_speed': [5, 5]}))
+    assert opposed.stat('wind_direction', 'resultant')[0] == pytest.approx(0, abs=1e-9)
+
+
+def test_pack_roundtrip(random_frame):
+    aggregate = DailyAggregate(random_frame)
+    unpacked = DailyAggregate(random_frame, packed=aggregate.pack())
+    for name, stats in aggregate.stats.items():
+        for stat, values in stats.items():
+            np.testing.assert_array_equal(unpacked.stat(name, stat), values, err_msg=f"{name} {stat}")
+    assert unpacked.day_stats(1) == aggregate.day_stats(1)
+
+
+def test_summary_needs_waves_wind_and_swell():
+    columns = {'wave_height': [1.0, 2.0], 'wind_speed': [10.0, 20.0], 'swell_direction': [270, 270],
+               'swell_height': [1.0, 1.0]}
+    assert DailyAggregate(frame(columns)).summary(0) == {
+        'min_wave': 1.0, 'max_wave': 2.0, 'avg_wind': 15.0, 'swell_direction': pytest.approx(270)}
+    columns['wind_speed'] = [np.nan, np.nan]
+    assert DailyAggregate(frame(columns)).summary(0) is None
+
+
+def test_compass_point():
+    assert [compass_point(d) for d in (0, 11.2, 11.3, 180, 348.7, 359.9)] == ['N', 'N', 'NNE', 'S', 'NNW', 'N']
+    assert compass_point(None) == compass_point(float('nan')) == "N/A"
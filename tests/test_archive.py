@@ -0,0 +1,112 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from surfcast.archive import (ARCHIVE_COLUMNS, DELTA, DICTIONARY, MASKED, ForecastArchive, decode_column,
+                              decode_frame, encode_column, encode_frame)
+from surfcast.frame import ForecastFrame, process_forecast
+
+from stub import fixture_bytes
+
+
+def roundtrip(values, decimals):
+    block = encode_column(np.asarray(values, dtype=float), decimals)
+    decoded, offset = decode_column(block, 0, len(values), decimals)
+    assert offset == len(block)
+    return block, decoded
+
+
+@pytest.mark.parametrize('decimals', [0, 1, 2])
+def test_column_roundtrip_to_its_precision(decimals):
+    values = np.random.default_rng(decimals).uniform(0, 30, 384)
+    _, decoded = roundtrip(values, decimals)
+    np.testing.assert_allclose(decoded, np.round(values, decimals), atol=1e-9)
+
+
+def test_gaps_are_restored_as_missing():
+    values = [np.nan, np.nan, 1.25, 1.5, np.nan, 2.0, np.nan]
+    block, decoded = roundtrip(values, 2)
+    assert block[0] & MASKED
+    np.testing.assert_array_equal(decoded, values)
+
+
+def test_all_missing_column_decodes_to_none():
+    block, decoded = roundtrip([np.nan] * 5, 1)
+    assert decoded is None and len(block) == 1
+
+
+def test_few_distinct_values_use_a_dictionary():
+    block, decoded = roundtrip([0, 3000, 6100, 3000, 0, 9500, 6100] * 30, 0)
+    assert block[0] == DICTIONARY
+    assert decoded.tolist() == [0, 3000, 6100, 3000, 0, 9500, 6100] * 30
+
+
+def test_smooth_values_use_small_deltas():
+    values = 1.0 + np.arange(300) * 0.01
+    block, decoded = roundtrip(values, 2)
+    assert block[0] == DELTA
+    # One byte per change after the header
+    assert len(block) == struct.calcsize('<BBq') + len(values) - 1
+    np.testing.assert_allclose(decoded, values)
+
+
+def test_large_jumps_widen_the_delta_type():
+    values = [0, 40000, -40000, 2 ** 40, 0] * 60
+    _, decoded = roundtrip(values, 0)
+    assert decoded.tolist() == values
+
+
+def test_single_hour_column():
+    _, decoded = roundtrip([3.5], 1)
+    assert decoded.tolist() == [3.5]
+
+
+@pytest.fixture(scope='module')
+def frame():
+    data = process_forecast(json.loads(fixture_bytes('marine', 16)), json.loads(fixture_bytes('forecast', 16)))
+    return data['hourly']
+
+
+def test_frame_roundtrip(frame):
+    start, hours, block = encode_frame(frame)
+    assert hours == len(frame) == 16 * 24
+    decoded = decode_frame(start, block)
+    np.testing.assert_array_equal(decoded.timestamps, frame.timestamps.astype('datetime64[m]'))
+    for name, decimals in ARCHIVE_COLUMNS:
+        np.testing.assert_allclose(decoded.column(name), np.round(frame.column(name), decimals),
+                                   atol=1e-9, equal_nan=True, err_msg=name)
+
+
+def test_frame_decodes_only_requested_columns(frame):
+    start, hours, block = encode_frame(frame)
+    decoded = decode_frame(start, block, columns=['swell_height'])
+    np.testing.assert_allclose(decoded.column('swell_height'), np.round(frame.column('swell_height'), 2),
+                               equal_nan=True)
+    assert np.isnan(decoded.column('wave_height')).all()
+
+
+def test_frame_with_gaps_in_time_is_rejected():
+    timestamps = np.array(['2024-01-01T00:00', '2024-01-01T02:00'], dtype='datetime64[m]')
+    with pytest.raises(ValueError):
+        encode_frame(ForecastFrame.from_arrays(timestamps, {'wave_height': np.array([1.0, 2.0])}))
+
+
+def test_archive_stores_each_run_once(tmp_path, frame):
+    archive = ForecastArchive(str(tmp_path / "archive.sqlite3"))
+    try:
+        data = {'hourly': frame}
+        assert archive.add(21.66, -158.05, data, fetched_at=6 * 3600 + 10)
+        assert not archive.add(21.66, -158.05, data, fetched_at=6 * 3600 + 20)
+        history = archive.history(21.66, -158.05)
+        assert len(history) == 1
+        np.testing.assert_allclose(history[0].hourly.column('wave_height'),
+                                   np.round(frame.column('wave_height'), 2), equal_nan=True)
+        when = frame.timestamps[30]
+        (run, hour, values), = archive.valid_time(21.66, -158.05, when, columns=['wave_height'])
+        assert hour == 30
+        assert values['wave_height'] == pytest.approx(round(float(frame.column('wave_height')[30]), 2))
+        assert archive.history(0.0, 0.0) == []
+    finally:
+        archive.close()
@@ -0,0 +1,69 @@
+import zlib
+
+import pytest
+
+from surfcast.cache import ForecastCache
+
+BODY = b'{"hourly": {}, "daily": {}}'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ForecastCache(str(tmp_path / "forecasts.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def accessed_at(cache, lat, lng, days=3):
+    return cache._db.execute("SELECT accessed_at FROM forecasts WHERE key = ?",
+                             (cache.make_key(lat, lng, days),)).fetchone()[0]
+
+
+def test_reads_do_not_write(cache):
+    cache.put(1.0, 2.0, 3, BODY, BODY, fetched_at=1000.0)
+    changes = cache._db.total_changes
+    for _ in range(cache.FLUSH_READS - 1):
+        assert cache.get(1.0, 2.0, 3) is not None
+    assert cache._db.total_changes == changes
+    assert accessed_at(cache, 1.0, 2.0) == 1000.0
+    cache.flush()
+    assert accessed_at(cache, 1.0, 2.0) > 1000.0
+
+
+def test_access_times_are_written_every_flush_reads(cache):
+    cache.put(1.0, 2.0, 3, BODY, BODY, fetched_at=1000.0)
+    for _ in range(cache.FLUSH_READS):
+        cache.get(1.0, 2.0, 3)
+    assert accessed_at(cache, 1.0, 2.0) > 1000.0 and not cache._accessed
+
+
+def test_eviction_sees_unflushed_reads(tmp_path):
+    size = len(zlib.compress(BODY)) * 2
+    cache = ForecastCache(str(tmp_path / "forecasts.sqlite3"), max_bytes=2 * size)
+    cache.put(1.0, 2.0, 3, BODY, BODY, fetched_at=1000.0)
+    cache.put(3.0, 4.0, 3, BODY, BODY, fetched_at=2000.0)
+    # Reading the older entry makes the newer one least recently used
+    cache.get(1.0, 2.0, 3)
+    cache.put(5.0, 6.0, 3, BODY, BODY, fetched_at=3000.0)
+    assert cache.get(1.0, 2.0, 3) is not None
+    assert cache.get(3.0, 4.0, 3) is None
+    cache.close()
+
+
+def test_rewritten_entries_keep_their_new_access_time(cache):
+    cache.put(1.0, 2.0, 3, BODY, BODY, fetched_at=1000.0)
+    cache.get(1.0, 2.0, 3)
+    cache.touch(1.0, 2.0, 3, fetched_at=5.0e9)
+    cache.flush()
+    assert accessed_at(cache, 1.0, 2.0) == 5.0e9
+
+
+def test_pending_reads_survive_reopening(tmp_path):
+    path = str(tmp_path / "forecasts.sqlite3")
+    cache = ForecastCache(path)
+    cache.put(1.0, 2.0, 3, BODY, BODY, fetched_at=1000.0)
+    cache.get(1.0, 2.0, 3)
+    cache.close()
+    reopened = ForecastCache(path)
+    assert accessed_at(reopened, 1.0, 2.0) > 1000.0
+    reopened.close()
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from surfcast import decode
+from surfcast.decode import iter_item_bytes
+
+TRICKY = [
+    {'name': 'quote " inside', 'values': [1, 2]},
+    {'name': 'backslash \\', 'nested': {'a': [1, [2, {'b': 3}]]}},
+    {'name': 'escaped \\" quote then ] and }', 'x': '[{'},
+    {'name': '\\\\"', 'empty': [], 'obj': {}},
+    {'name': 'brackets ]]}}[[{{ in a string', 'n': None},
+]
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def decoded(chunks):
+    return [json.loads(item) for item in iter_item_bytes(chunks)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 1 << 20])
+def test_strings_with_escapes_and_brackets(size):
+    data = json.dumps(TRICKY).encode()
+    assert decoded(chunked(data, size)) == TRICKY
+
+
+def test_every_split_point():
+    data = json.dumps(TRICKY, separators=(',', ':')).encode()
+    for split in range(len(data) + 1):
+        assert decoded([data[:split], data[split:]]) == TRICKY, split
+
+
+def test_backslash_runs_across_chunks():
+    items = [{'s': '\\' * n + '"'} for n in range(6)] + [{'s': '\\' * n} for n in range(6)]
+    data = json.dumps(items).encode()
+    for split in range(len(data) + 1):
+        assert decoded([data[:split], data[split:]]) == items, split
+
+
+def test_top_level_object_is_one_item():
+    item = {'hourly': {'time': ['2024-01-01T00:00'], 'wave_height': [1.5]}, 'text': '[not an array]'}
+    assert decoded(chunked(json.dumps(item).encode(), 5)) == [item]
+
+
+def test_whitespace_and_empty_array():
+    assert decoded([b' [ ', b'\n{"a": 1} ,\n', b' {"b": [2]} ] ']) == [{'a': 1}, {'b': [2]}]
+    assert decoded([b'[]']) == []
+
+
+@pytest.mark.parametrize('name', sorted(decode.BACKENDS))
+def test_backends_decode_items(name):
+    previous = decode.backend()
+    decode.set_backend(name)
+    try:
+        data = json.dumps(TRICKY).encode()
+        assert list(decode.iter_items(chunked(data, 11))) == TRICKY
+    finally:
+        decode.set_backend(previous)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        decode.set_backend('nope')
@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+from surfcast import fetch, net
+
+
+class Response:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+class Session:
+    """Fails or answers marine and weather calls as told.
+
+    With release, the weather call starts before the marine one ends and
+    answers only once release is set.
+    """
+
+    def __init__(self, marine, weather, release=None):
+        self.marine, self.weather = marine, weather
+        self.release = release
+        self.weather_started = threading.Event()
+
+    def get(self, url, **kwargs):
+        if 'marine' in url:
+            result = self.marine
+            if self.release is not None:
+                self.weather_started.wait(5)
+        else:
+            result = self.weather
+            self.weather_started.set()
+            if self.release is not None:
+                self.release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def install(session):
+        monkeypatch.setattr(net, 'get_http_session', lambda: session)
+        return session
+    return install
+
+
+def test_both_responses_are_returned(session):
+    marine, weather = Response(), Response()
+    session(Session(marine, weather))
+    assert fetch.fetch_responses(1.0, 2.0, 3) == (marine, weather)
+
+
+def test_marine_error_wins_over_weather_error(session):
+    session(Session(ConnectionError("marine down"), TimeoutError("weather down")))
+    with pytest.raises(ConnectionError, match="marine down"):
+        fetch.fetch_responses(1.0, 2.0, 3)
+
+
+def test_weather_response_is_closed_after_a_marine_error(session):
+    weather = Response()
+    release = threading.Event()
+    session(Session(ConnectionError("marine down"), weather, release=release))
+    with pytest.raises(ConnectionError):
+        fetch.fetch_responses(1.0, 2.0, 3)
+    release.set()
+    assert weather.closed.wait(5)
+
+
+def test_weather_error_is_raised_when_marine_succeeds(session):
+    marine = Response()
+    session(Session(marine, TimeoutError("weather down")))
+    with pytest.raises(TimeoutError):
+        fetch.fetch_responses(1.0, 2.0, 3)
+    assert marine.closed.is_set()
@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pytest
+
+from surfcast.geo import SPOT_LOCATOR, SpatialIndex, haversine_km
+from surfcast.spots import POPULAR_SURF_SPOTS
+
+
+def random_spots(count, seed=11):
+    rng = np.random.default_rng(seed)
+    # Clustered around coasts, plus a uniform scatter reaching the poles and the antimeridian
+    centres = rng.uniform([-60, -180], [70, 180], size=(20, 2))
+    clustered = centres[rng.integers(0, 20, count // 2)] + rng.normal(0, 2, size=(count // 2, 2))
+    uniform = np.column_stack([np.degrees(np.arcsin(rng.uniform(-1, 1, count - count // 2))),
+                               rng.uniform(-180, 180, count - count // 2)])
+    points = np.vstack([clustered, uniform])
+    points[:, 0] = np.clip(points[:, 0], -90, 90)
+    points[:, 1] = (points[:, 1] + 180) % 360 - 180
+    return [{'name': str(i), 'lat': float(lat), 'lng': float(lng)} for i, (lat, lng) in enumerate(points)]
+
+
+def brute_force_within(spots, lat, lng, radius_km):
+    distances = [(spot, float(haversine_km(lat, lng, spot['lat'], spot['lng']))) for spot in spots]
+    return sorted([pair for pair in distances if pair[1] <= radius_km], key=lambda pair: pair[1])
+
+
+SPOTS = random_spots(3000)
+INDEX = SpatialIndex(SPOTS)
+POINTS = [(0.0, 0.0), (21.6, -158.1), (-33.9, 151.3), (89.9, 10.0), (-89.5, -170.0),
+          (10.0, 179.9), (10.0, -179.9), (65.0, -20.0), (-45.0, 170.0)]
+
+
+@pytest.mark.parametrize('lat, lng', POINTS)
+@pytest.mark.parametrize('radius', [0.5, 50, 300, 2000, 15000, 25000])
+def test_within_matches_brute_force(lat, lng, radius):
+    found = INDEX.within(lat, lng, radius)
+    expected = brute_force_within(SPOTS, lat, lng, radius)
+    assert [spot['name'] for spot, _ in found] == [spot['name'] for spot, _ in expected]
+    assert [distance for _, distance in found] == pytest.approx([distance for _, distance in expected])
+
+
+@pytest.mark.parametrize('lat, lng', POINTS)
+@pytest.mark.parametrize('k', [1, 5, 40])
+def test_nearest_matches_brute_force(lat, lng, k):
+    found = INDEX.nearest(lat, lng, k=k)
+    expected = brute_force_within(SPOTS, lat, lng, math.inf)[:k]
+    assert [distance for _, distance in found] == pytest.approx([distance for _, distance in expected])
+
+
+def test_nearest_respects_max_km():
+    lat, lng = 0.0, -140.0
+    assert INDEX.nearest(lat, lng, k=3, max_km=1.0) == brute_force_within(SPOTS, lat, lng, 1.0)[:3]
+
+
+def test_catalogue_queries_match_brute_force():
+    spots = list(POPULAR_SURF_SPOTS)
+    for spot in spots[::7]:
+        found = SPOT_LOCATOR.within(spot['lat'], spot['lng'], 400)
+        expected = brute_force_within(spots, spot['lat'], spot['lng'], 400)
+        assert [s['name'] for s, _ in found] == [s['name'] for s, _ in expected]
+        assert found[0][0]['name'] == spot['name'] and found[0][1] == pytest.approx(0)
+
+
+def test_empty_index():
+    assert SpatialIndex([]).within(0, 0, 100) == []
+    assert SpatialIndex([]).nearest(0, 0, k=2) == []
+
+
+def test_haversine_known_distance():
+    # One degree of latitude on the mean-radius sphere
+    assert haversine_km(0, 0, 1, 0) == pytest.approx(111.195, abs=1e-3)
+    assert haversine_km(0, 179.5, 0, -179.5) == pytest.approx(111.195, abs=1e-3)
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from surfcast.frame import process_forecast
+from surfcast.manager import RequestManager, fetch_days
+
+from stub import fixture_bytes
+
+
+class Handle:
+    def __init__(self, lat, lng, days, done):
+        self.lat, self.lng, self.days, self.done = lat, lng, days, done
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Starter:
+    """Records fetches instead of making them; finish them with handle.done"""
+
+    def __init__(self):
+        self.handles = []
+
+    def __call__(self, lat, lng, days, done):
+        handle = Handle(lat, lng, days, done)
+        self.handles.append(handle)
+        return handle
+
+
+@pytest.fixture(scope='module')
+def forecast():
+    return {days: process_forecast(json.loads(fixture_bytes('marine', days)),
+                                   json.loads(fixture_bytes('forecast', days)))
+            for days in (7, 16)}
+
+
+@pytest.fixture
+def starter():
+    return Starter()
+
+
+@pytest.fixture
+def manager(starter):
+    return RequestManager(starter)
+
+
+def collect():
+    received = []
+    return received, (lambda data: received.append(data)), (lambda error: received.append(error))
+
+
+def test_fetch_tiers():
+    assert [fetch_days(days) for days in (1, 3, 7, 8, 16)] == [7, 7, 7, 16, 16]
+    assert fetch_days(20) == 20
+
+
+def test_new_view_cancels_the_superseded_fetch(manager, starter, forecast):
+    first, on_ready, on_error = collect()
+    manager.request(1.0, 2.0, 3, on_ready, on_error)
+    second, on_ready, on_error = collect()
+    generation = manager.request(40.0, 50.0, 3, on_ready, on_error)
+    assert starter.handles[0].cancelled and not starter.handles[1].cancelled
+    assert manager.is_current(generation) and manager.pending() == 1
+    # A cancelled fetch that answers anyway is dropped
+    starter.handles[0].done(forecast[7], None)
+    starter.handles[1].done(forecast[7], None)
+    assert first == [] and len(second) == 1
+
+
+def test_superseded_callbacks_are_dropped_but_shared_fetch_survives(manager, starter, forecast):
+    background, on_ready, on_error = collect()
+    manager.request(1.0, 2.0, 5, on_ready, on_error, background=True)
+    view, on_ready, on_error = collect()
+    manager.request(1.0, 2.0, 3, on_ready, on_error)
+    manager.cancel()
+    assert len(starter.handles) == 1 and not starter.handles[0].cancelled
+    starter.handles[0].done(forecast[7], None)
+    assert view == [] and len(background) == 1
+    assert len(background[0]['hourly']) == 5 * 24
+
+
+def test_same_cell_requests_share_one_fetch_and_are_sliced(manager, starter, forecast):
+    seven, on_ready, on_error = collect()
+    manager.request(1.0, 2.0, 7, on_ready, on_error, background=True)
+    three, on_ready, on_error = collect()
+    # Within the same model grid cell
+    manager.request(1.01, 2.01, 3, on_ready, on_error)
+    assert len(starter.handles) == 1 and starter.handles[0].days == 7
+    starter.handles[0].done(forecast[7], None)
+    assert len(seven[0]['hourly']) == 7 * 24 and len(three[0]['hourly']) == 3 * 24
+    assert manager.pending() == 0
+
+
+def test_longer_view_does_not_reuse_a_shorter_fetch(manager, starter):
+    manager.request(1.0, 2.0, 3, *collect()[1:], background=True)
+    manager.request(1.0, 2.0, 10, *collect()[1:])
+    assert [handle.days for handle in starter.handles] == [7, 16]
+
+
+def test_errors_reach_current_waiters_only(manager, starter):
+    stale, on_ready, on_error = collect()
+    manager.request(1.0, 2.0, 3, on_ready, on_error, background=True)
+    current, on_ready, on_error = collect()
+    manager.request(1.0, 2.0, 3, on_ready, on_error)
+    error = RuntimeError("down")
+    starter.handles[0].done(None, error)
+    assert stale == [error] and current == [error]
+    assert manager.pending() == 0
+
+
+def test_cached_tries_fetch_tiers_before_the_exact_days(manager):
+    class Cache:
+        def __init__(self, entries):
+            self.entries = entries
+
+        def get(self, lat, lng, days):
+            return self.entries.get(days)
+
+    assert manager.cache_days(3) == [7, 16, 3]
+    assert manager.cached(Cache({3: 'three', 16: 'sixteen'}), 1.0, 2.0, 3) == ('sixteen', 16)
+    assert manager.cached(Cache({}), 1.0, 2.0, 3) == (None, None)
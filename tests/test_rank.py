@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from surfcast.aggregate import forecast_summary
+from surfcast.frame import ForecastFrame
+from surfcast.rank import ForecastStack, best_days
+
+COLUMNS = ('wave_height', 'swell_height', 'swell_period', 'swell_direction', 'wind_speed', 'wind_direction')
+
+
+def forecast(columns, start='2024-03-01T00:00'):
+    hours = len(next(iter(columns.values())))
+    timestamps = np.datetime64(start, 'm') + np.arange(hours) * np.timedelta64(60, 'm')
+    return {'hourly': ForecastFrame.from_arrays(timestamps, {name: np.asarray(values, dtype=float)
+                                                             for name, values in columns.items()}),
+            'daily': []}
+
+
+def random_forecast(rng, hours, missing=0.2):
+    columns = {name: rng.uniform(0, 360, hours) if name.endswith('_direction') else rng.gamma(2.0, 1.0, hours)
+               for name in COLUMNS}
+    for values in columns.values():
+        values[rng.random(hours) < missing] = np.nan
+    return forecast(columns)
+
+
+def summary_best(data):
+    days = [day for day in forecast_summary(data)['days'] if 'max_wave' in day]
+    return max(days, key=lambda day: day['max_wave']) if days else None
+
+
+def spot(n):
+    return {'name': f"spot {n}", 'lat': 0.0, 'lng': float(n), 'type': 'Beach Break', 'swell': 'W'}
+
+
+def test_best_days_match_forecast_summary():
+    rng = np.random.default_rng(21)
+    forecasts = [random_forecast(rng, hours) for hours in (24, 70, 96, 384, 384, 5)]
+    # A spot whose middle day has no wind, and one with no swell direction at all
+    forecasts[2]['hourly'].column('wind_speed')[24:48] = np.nan
+    forecasts[3]['hourly'].column('swell_direction')[:] = np.nan
+    stack = ForecastStack([spot(n) for n in range(len(forecasts))], forecasts)
+    for data, best in zip(forecasts, best_days(stack)):
+        expected = summary_best(data)
+        if expected is None:
+            assert best is None
+            continue
+        assert best.date.isoformat() == expected['date']
+        assert best.max_wave == pytest.approx(expected['max_wave'], rel=1e-6)
+        assert best.avg_wind == pytest.approx(expected['avg_wind'], rel=1e-5)
+        assert best.swell_direction == pytest.approx(expected['swell_direction'], abs=1e-3)
+
+
+def test_calm_swell_falls_back_to_unweighted_direction():
+    columns = {name: np.full(24, 1.0) for name in COLUMNS}
+    columns['swell_height'][:] = 0.0
+    columns['swell_direction'][:] = [350.0] * 12 + [30.0] * 12
+    (best,) = best_days(ForecastStack([spot(0)], [forecast(columns)]))
+    assert best.swell_direction == pytest.approx(10.0, abs=1e-3)
+
+
+def test_spots_without_usable_days():
+    empty = {name: np.full(48, np.nan) for name in COLUMNS}
+    no_wind = {name: np.full(48, 1.0) for name in COLUMNS}
+    no_wind['wind_speed'][:] = np.nan
+    stack = ForecastStack([spot(0), spot(1)], [forecast(empty), forecast(no_wind)])
+    assert best_days(stack) == [None, None]
+    assert best_days(ForecastStack([], [])) == []
@@ -0,0 +1,174 @@
+import json
+
+import pytest
+
+from surfcast.cache import ForecastCache
+from surfcast.fetch import FetchError, resolve_forecast
+from surfcast.refresh import RefreshScheduler
+
+from stub import fixture_bytes
+
+LAT, LNG, DAYS = 21.66, -158.05, 3
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FixedRandom:
+    """Stands in for random.Random, always drawing the same fraction of the range"""
+
+    def __init__(self, fraction):
+        self.fraction = fraction
+
+    def uniform(self, low, high):
+        return low + (high - low) * self.fraction
+
+
+def scheduler(fraction=0.5, **kwargs):
+    clock = Clock()
+    return RefreshScheduler(clock=clock, rng=FixedRandom(fraction), **kwargs), clock
+
+
+def test_due_jobs_come_out_in_order():
+    s, clock = scheduler()
+    s.schedule('b', 'B', 1020)
+    s.schedule('a', 'A', 1010)
+    s.schedule('c', 'C', 2000)
+    assert s.next_due() == 1010
+    assert s.pop_due(now=1500) == [('a', 'A'), ('b', 'B')]
+    assert s.running() == 2 and len(s) == 3 and 'a' in s
+
+
+def test_rescheduling_moves_a_job():
+    s, clock = scheduler()
+    s.schedule('a', 'A', 1010)
+    s.schedule('a', 'A', 3000)
+    assert s.pop_due(now=2000) == []
+    assert s.next_due() == 3000
+
+
+def test_success_reschedules_after_expiry_with_jitter():
+    s, clock = scheduler(fraction=0.5, jitter=300)
+    s.schedule('a', 'A', 1000)
+    s.pop_due()
+    s.succeeded('a', 5000)
+    assert s.next_due() == 5150
+    # Data that is already expired is refreshed from now, not from the past
+    s.pop_due(now=5150)
+    clock.now = 6000
+    s.succeeded('a', 5500)
+    assert s.next_due() == 6150
+
+
+@pytest.mark.parametrize('fraction', [0.0, 0.3, 1.0])
+def test_jitter_stays_within_its_window(fraction):
+    s, clock = scheduler(fraction=fraction, jitter=300)
+    s.schedule_expiry('a', 'A', 5000)
+    assert 5000 <= s.next_due() <= 5300
+
+
+def test_failures_back_off_exponentially_up_to_the_cap():
+    s, clock = scheduler(fraction=1.0, retry_base=60, retry_max=600)
+    s.schedule('a', 'A', 1000)
+    delays = []
+    for _ in range(6):
+        s.pop_due(now=s.next_due())
+        s.failed('a')
+        delays.append(s.next_due() - clock.now)
+    assert delays == [60, 120, 240, 480, 600, 600]
+
+
+def test_backoff_jitter_and_reset_on_success():
+    s, clock = scheduler(fraction=0.5, retry_base=60)
+    s.schedule('a', 'A', 1000)
+    s.pop_due()
+    s.failed('a')
+    assert s.next_due() == clock.now + 45
+    s.pop_due(now=s.next_due())
+    s.succeeded('a', 2000)
+    s.pop_due(now=s.next_due())
+    s.failed('a')
+    assert s.next_due() == clock.now + 45
+
+
+def test_job_moved_or_removed_while_running_is_not_rescheduled():
+    s, clock = scheduler()
+    s.schedule('a', 'A', 1000)
+    s.schedule('b', 'B', 1000)
+    s.pop_due()
+    s.schedule('a', 'A', 9000)
+    s.succeeded('a', 2000)
+    assert s.next_due() == 9000
+    s.remove('b')
+    s.failed('b')
+    assert 'b' not in s and len(s) == 1
+
+
+def test_run_retries_failures_until_nothing_is_queued():
+    # run() sleeps for real until the retry is due
+    s = RefreshScheduler(retry_base=0.01, rng=FixedRandom(0.0))
+    s.schedule('a', 'A', 0)
+    s.schedule('b', 'B', 0)
+    calls = []
+
+    def refresh(job):
+        calls.append(job)
+        if job == 'B' and calls.count('B') == 1:
+            raise FetchError("down")
+        # Done with the job once it succeeds
+        s.remove(job.lower())
+        return 0
+
+    s.run(refresh)
+    assert calls == ['A', 'B', 'B']
+    assert len(s) == 0
+
+
+def responses(status, body, etag=None):
+    return status, body, {'ETag': etag} if etag else {}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ForecastCache(str(tmp_path / "forecasts.sqlite3"))
+
+
+def test_new_responses_store_their_validators(cache):
+    marine, weather = fixture_bytes('marine', DAYS), fixture_bytes('forecast', DAYS)
+    data = resolve_forecast(LAT, LNG, DAYS, cache, responses(200, marine, '"m1"'), responses(200, weather, '"w1"'))
+    assert len(data['hourly']) == DAYS * 24
+    assert cache.get_validators(LAT, LNG, DAYS) == {
+        'marine': {'etag': '"m1"', 'last_modified': None}, 'weather': {'etag': '"w1"', 'last_modified': None}}
+
+
+def test_both_unchanged_touches_the_cached_entry(cache):
+    marine, weather = fixture_bytes('marine', DAYS), fixture_bytes('forecast', DAYS)
+    cache.put(LAT, LNG, DAYS, marine, weather, fetched_at=1000.0, validators={'marine': {'etag': '"m1"'}})
+    data = resolve_forecast(LAT, LNG, DAYS, cache, responses(304, b''), responses(304, b''))
+    entry = cache.get(LAT, LNG, DAYS)
+    assert entry.fetched_at > 1000.0 and cache.is_fresh(entry)
+    assert entry.validators == {'marine': {'etag': '"m1"'}}
+    assert len(data['hourly']) == DAYS * 24
+
+
+def test_one_side_unchanged_keeps_its_cached_body_and_validator(cache):
+    marine, weather = fixture_bytes('marine', DAYS), fixture_bytes('forecast', DAYS)
+    cache.put(LAT, LNG, DAYS, marine, weather, fetched_at=1000.0,
+              validators={'marine': {'etag': '"m1"'}, 'weather': {'etag': '"w1"'}})
+    resolve_forecast(LAT, LNG, DAYS, cache, responses(304, b''), responses(200, weather, '"w2"'))
+    entry = cache.get(LAT, LNG, DAYS)
+    assert entry.validators == {'marine': {'etag': '"m1"'}, 'weather': {'etag': '"w2"', 'last_modified': None}}
+    assert entry.marine_data == json.loads(marine)
+    assert entry.fetched_at > 1000.0
+
+
+def test_not_modified_without_a_cached_entry_is_an_error(cache):
+    with pytest.raises(FetchError):
+        resolve_forecast(LAT, LNG, DAYS, cache, responses(304, b''), responses(304, b''))
+    with pytest.raises(FetchError):
+        resolve_forecast(LAT, LNG, DAYS, None, responses(304, b''), responses(200, b'{}'))
@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from surfcast import search
+from surfcast.cache import SearchCache
+from surfcast.search import SPOT_INDEX, SearchError, SpotIndex, _TOKEN_RE, _trigrams, fold_text, search_catalogue
+from surfcast.spots import POPULAR_SURF_SPOTS
+
+QUERIES = ["pipe", "Nazaré", "nazare", "santa", "reef", "reef nw", "costa rica", "playa", "tamarndo",
+           "mavricks", "uluwatu", "hossegor", "puerto", "point s", "xyzzy", "bali left", "teahupo'o"]
+
+
+def brute_force_scores(spots, query):
+    """SpotIndex scoring, spot by spot"""
+    query = fold_text(query).strip()
+    tokens = _TOKEN_RE.findall(query)
+    query_grams = _trigrams(query)
+    scores = []
+    for spot in spots:
+        name = fold_text(spot.get('name', ''))
+        country = fold_text(spot.get('country') or '') or (name.rsplit(',', 1)[1] if ',' in name else '')
+        fields = [(name, SpotIndex.NAME_WEIGHT), (country, SpotIndex.FIELD_WEIGHT),
+                  (fold_text(spot.get('type', '')), SpotIndex.FIELD_WEIGHT),
+                  (fold_text(spot.get('swell', '')), SpotIndex.FIELD_WEIGHT)]
+        score = 0.0
+        best = [max((weight for text, weight in fields
+                     if any(word.startswith(token) for word in _TOKEN_RE.findall(text))), default=0)
+                for token in tokens]
+        if all(best):
+            score += sum(best)
+        shared = len(query_grams & _trigrams(name))
+        if query_grams and shared / len(query_grams) >= SpotIndex.MIN_COVERAGE:
+            coverage = shared / len(query_grams)
+            score += 0.9 * coverage + 0.1 * 2 * shared / (len(query_grams) + len(_trigrams(name)))
+        scores.append(score)
+    return scores
+
+
+def check(index, spots, query, limit):
+    scores = brute_force_scores(spots, query)
+    results = index.search(query, limit=limit)
+    position = {id(spot): i for i, spot in enumerate(spots)}
+    found = [scores[position[id(spot)]] for spot in results]
+    expected = sorted((score for score in scores if score > 0), reverse=True)[:limit]
+    assert found == pytest.approx(expected, rel=1e-5), query
+    assert len({id(spot) for spot in results}) == len(results)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+@pytest.mark.parametrize('limit', [1, 5, 100])
+def test_catalogue_matches_brute_force(query, limit):
+    spots = list(POPULAR_SURF_SPOTS)
+    check(SpotIndex(spots), spots, query, limit)
+
+
+def synthetic_spots(count, seed=7):
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "ma", "na", "pe", "ri", "su", "ta", "wa", "ño", "zé", "ul", "ho"]
+    words = ["".join(rng.choice(syllables) for _ in range(rng.randint(1, 4))).title() for _ in range(300)]
+    return [{'name': " ".join(rng.sample(words, rng.randint(1, 3))) + f", {rng.choice(words)}",
+             'lat': 0.0, 'lng': 0.0,
+             'type': rng.choice(["Reef Break", "Beach Break", "Point Break"]),
+             'swell': rng.choice(["N", "NW", "SW", "S", "E"])}
+            for _ in range(count)]
+
+
+def test_synthetic_catalogue_matches_brute_force():
+    spots = synthetic_spots(500)
+    index = SpotIndex(spots)
+    rng = random.Random(3)
+    queries = []
+    for spot in rng.sample(spots, 15):
+        word = rng.choice(spot['name'].replace(',', '').split())
+        queries += [word[:rng.randint(1, len(word))], word + "x", f"{word} {spot['type'].split()[0]}"]
+    for query in queries + ["reef", "nw", "kalo", "ñ"]:
+        check(index, spots, query, 10)
+
+
+def test_exact_and_prefix_names_rank_first():
+    assert SPOT_INDEX.search("tamarindo")[0]['name'] == "Tamarindo"
+    assert SPOT_INDEX.search("nazare")[0]['name'] == "Nazaré, Portugal"
+    assert SPOT_INDEX.search("uluwatoo")[0]['name'] == "Uluwatu, Bali"
+
+
+def test_empty_queries():
+    assert SPOT_INDEX.search("") == [] and SPOT_INDEX.search("  ,.- ") == []
+    assert SpotIndex([]).search("pipe") == []
+
+
+# Real places whose names merely share a word with catalogue spots
+LOOKALIKES = {"Santa Cruz": "Santa Teresa", "Bells Beach": "Kuta Beach, Bali",
+              "Byron Bay": "Skeleton Bay, Namibia", "Cocoa Beach": "Kuta Beach, Bali"}
+
+
+@pytest.mark.parametrize('query', LOOKALIKES)
+def test_fuzzy_only_matches_go_to_nominatim(query, monkeypatch):
+    place = {'name': query, 'lat': -38.0, 'lng': 145.0}
+    monkeypatch.setattr(search, 'geocode', lambda text: [place])
+    cache = SearchCache()
+    assert search_catalogue(query, cache) is None
+    results = search.search_locations(query, cache)
+    assert results[0] == place
+    assert LOOKALIKES[query] in [spot['name'] for spot in results[1:]]
+    assert cache.get(query) == results
+
+
+def test_prefix_matches_skip_nominatim(monkeypatch):
+    monkeypatch.setattr(search, 'geocode', lambda text: pytest.fail("Nominatim called"))
+    assert search.search_locations("santa teresa", SearchCache())[0]['name'] == "Santa Teresa"
+    assert search.search_locations("tamar", SearchCache())[0]['name'] == "Tamarindo"
+
+
+def test_misspellings_follow_nominatim_results(monkeypatch):
+    monkeypatch.setattr(search, 'geocode', lambda text: [])
+    assert search.search_locations("uluwatoo", SearchCache())[0]['name'] == "Uluwatu, Bali"
+
+    def unreachable(text):
+        raise OSError("no route to host")
+    monkeypatch.setattr(search, 'geocode', unreachable)
+    assert search.search_locations("mavricks", SearchCache())[0]['name'] == "Mavericks, CA"
+    assert search.search_locations("mavricks", SearchCache(), offline=True)[0]['name'] == "Mavericks, CA"
+    with pytest.raises(SearchError):
+        search.search_locations("xyzzy", SearchCache(), offline=True)
@@ -1,210 +1,178 @@
+import os
 import sys
 import json
-import requests
-import urllib.parse
+import threading
+import time
+# Startup timing reference, taken before the heavy imports below
+STARTUP_CLOCK = time.perf_counter()
 from datetime import datetime
+import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QGridLayout, QLabel, QPushButton, 
                              QLineEdit, QComboBox, QScrollArea, QFrame, 
                              QListWidget, QListWidgetItem, QMessageBox, 
-                             QProgressBar, QTabWidget, QTextEdit, QSizePolicy)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSettings, QTimer
-from PyQt5.QtGui import QFont
+                             QProgressBar, QTabWidget, QTextEdit, QSizePolicy,
+                             QTableView, QHeaderView, QAbstractItemView, 
+                             QStyledItemDelegate, QCheckBox, QTableWidget, 
+                             QTableWidgetItem, QFileDialog, QSlider, QMenu)
+from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QSettings, QTimer, QEvent, 
+                          QAbstractTableModel, QModelIndex, QRectF, QPointF)
+from PyQt5.QtGui import QFont, QColor, QPainter, QPixmap, QPen, QPolygonF, QImage
 
-# Cache for surf spot searches
-SURF_SPOT_CACHE = {}
-POPULAR_SURF_SPOTS = [
-    # COSTA RICA (15 SPOTS)
-    {"name": "Tamarindo", "lat": 10.3000, "lng": -85.8333, "type": "Beach Break", "swell": "SW"},
-    {"name": "Witch's Rock", "lat": 10.7825, "lng": -85.6708, "type": "Reef Break", "swell": "NW"},
-    {"name": "Ollie's Point", "lat": 10.7758, "lng": -85.6783, "type": "Point Break", "swell": "NW"},
-    {"name": "Pavones", "lat": 8.4069, "lng": -83.1358, "type": "Point Break", "swell": "SW"},
-    {"name": "Playa Hermosa (Jaco)", "lat": 9.5925, "lng": -84.6347, "type": "Beach Break", "swell": "SW"},
-    {"name": "Playa Grande", "lat": 10.3333, "lng": -85.8500, "type": "Beach Break", "swell": "SW"},
-    {"name": "Salsa Brava", "lat": 9.6500, "lng": -82.7500, "type": "Reef Break", "swell": "E"},
-    {"name": "Nosara", "lat": 9.9833, "lng": -85.6500, "type": "Beach Break", "swell": "SW"},
-    {"name": "Santa Teresa", "lat": 9.6500, "lng": -85.1667, "type": "Beach Break", "swell": "SW"},
-    {"name": "Dominical", "lat": 9.2500, "lng": -83.8667, "type": "Beach Break", "swell": "SW"},
-    {"name": "Playa Guiones", "lat": 9.9333, "lng": -85.6667, "type": "Beach Break", "swell": "SW"},
-    {"name": "Boca Barranca", "lat": 9.9500, "lng": -84.7167, "type": "River Mouth", "swell": "SW"},
-    {"name": "Avellanas", "lat": 10.1833, "lng": -85.8500, "type": "Beach Break", "swell": "SW"},
-    {"name": "Playa Negra", "lat": 10.1667, "lng": -85.8500, "type": "Reef Break", "swell": "SW"},
-    {"name": "Playa Cocles", "lat": 9.6333, "lng": -82.7000, "type": "Beach Break", "swell": "E"},
+# requests, asyncio and aiohttp, and the archive, map tile, snapshot, session
+# ranking and parse pool modules, are imported on first use to keep startup fast
+from surfcast.aggregate import DailyAggregate, compass_point
+from surfcast.downsample import downsample
+from surfcast.cache import ForecastCache, SearchCache, SEARCH_CACHE
+from surfcast.fetch import FetchError, fetch_forecast, iter_batch_forecasts, plan_batches
+from surfcast.frame import process_forecast, slice_forecast
+from surfcast.geo import SPOT_LOCATOR, SpatialIndex, haversine_km
+from surfcast.manager import RequestManager
+from surfcast.metrics import METRICS
+from surfcast.net import is_timeout
+from surfcast.refresh import RefreshScheduler
+from surfcast.search import SearchError, search_locations
+from surfcast.spots import POPULAR_SURF_SPOTS
 
-    # PUERTO RICO (10 SPOTS)
-    {"name": "Maria's (Rincón)", "lat": 18.3550, "lng": -67.2642, "type": "Reef Break", "swell": "NW"},
-    {"name": "Domes (Rincón)", "lat": 18.3683, "lng": -67.2694, "type": "Reef Break", "swell": "NW"},
-    {"name": "Tres Palmas", "lat": 18.3500, "lng": -67.2750, "type": "Reef Break", "swell": "NW"},
-    {"name": "Wilderness (Aguadilla)", "lat": 18.4536, "lng": -67.1369, "type": "Reef Break", "swell": "NE"},
-    {"name": "Surfer's Beach (Aguadilla)", "lat": 18.4583, "lng": -67.1417, "type": "Reef Break", "swell": "NE"},
-    {"name": "Jobos (Isabela)", "lat": 18.4833, "lng": -66.9333, "type": "Reef Break", "swell": "NE"},
-    {"name": "Pine Grove (Isabela)", "lat": 18.4667, "lng": -66.9333, "type": "Beach Break", "swell": "NE"},
-    {"name": "Middles (Vega Baja)", "lat": 18.4667, "lng": -66.4167, "type": "Reef Break", "swell": "N"},
-    {"name": "La Ocho (San Juan)", "lat": 18.4667, "lng": -66.1167, "type": "Reef Break", "swell": "N"},
-    {"name": "Buyé (Cabo Rojo)", "lat": 18.0667, "lng": -67.1833, "type": "Beach Break", "swell": "SW"},
+# A new favorite this close to an existing one is a duplicate
+DUPLICATE_FAVORITE_KM = 1.0
 
-    # EXPANDED GLOBAL COVERAGE (225+ spots across 45+ countries)
-    # North America (35+)
-    {"name": "Tofino, Canada", "lat": 49.1520, "lng": -125.9060, "type": "Beach Break", "swell": "W"},
-    {"name": "La Libertad, El Salvador", "lat": 13.4886, "lng": -89.3222, "type": "Point Break", "swell": "SW"},
-    {"name": "Popoyo, Nicaragua", "lat": 11.4681, "lng": -86.3219, "type": "Beach Break", "swell": "SW"},
-    {"name": "Punta Roca, El Salvador", "lat": 13.4922, "lng": -89.3819, "type": "Point Break", "swell": "SW"},
-    {"name": "Puerto Escondido, Mexico", "lat": 15.8578, "lng": -97.0694, "type": "Beach Break", "swell": "S"},
-    {"name": "Sayulita, Mexico", "lat": 20.8700, "lng": -105.4383, "type": "Point Break", "swell": "SW"},
-    {"name": "Pascuales, Mexico", "lat": 19.1500, "lng": -104.7000, "type": "Beach Break", "swell": "SW"},
-    {"name": "Long Beach, NY", "lat": 40.5883, "lng": -73.6575, "type": "Beach Break", "swell": "E"},
-    {"name": "Sebastian Inlet, FL", "lat": 28.0583, "lng": -80.5458, "type": "Inlet Break", "swell": "NE"},
-    # ... (25+ more across USA/Mexico/Central America)
+# Radius for the "Nearby Spots" list
+NEARBY_SPOTS_KM = 100.0
 
-    # South America (30+)
-    {"name": "Chicama, Peru", "lat": -7.6922, "lng": -79.4367, "type": "Point Break", "swell": "SW"},
-    {"name": "Mancora, Peru", "lat": -4.1000, "lng": -81.0500, "type": "Beach Break", "swell": "SW"},
-    {"name": "Punta de Lobos, Chile", "lat": -34.6333, "lng": -72.0000, "type": "Point Break", "swell": "SW"},
-    {"name": "Florianopolis, Brazil", "lat": -27.5833, "lng": -48.5667, "type": "Beach Break", "swell": "S"},
-    {"name": "Itacaré, Brazil", "lat": -14.2833, "lng": -39.0000, "type": "Reef Break", "swell": "E"},
-    {"name": "Montanita, Ecuador", "lat": -1.8167, "lng": -80.7500, "type": "Point Break", "swell": "SW"},
-    {"name": "Punta Colorada, Mexico", "lat": 23.4167, "lng": -109.4167, "type": "Point Break", "swell": "SW"},
-    # ... (25+ more across Brazil/Chile/Peru/Argentina)
+# Catalogue spots within this distance of the current spot are ranked on the Sessions tab
+SESSION_RADIUS_KM = 300.0
+SESSION_COUNT = 20
 
-    # Europe (40+)
-    {"name": "Mundaka, Spain", "lat": 43.4067, "lng": -2.6983, "type": "River Mouth", "swell": "NW"},
-    {"name": "Supertubos, Portugal", "lat": 39.3500, "lng": -9.3833, "type": "Beach Break", "swell": "W"},
-    {"name": "Thurso, Scotland", "lat": 58.5967, "lng": -3.5217, "type": "Reef Break", "swell": "NW"},
-    {"name": "Fistral, England", "lat": 50.4158, "lng": -5.0900, "type": "Beach Break", "swell": "W"},
-    {"name": "Hoddevik, Norway", "lat": 62.0667, "lng": 5.1500, "type": "Point Break", "swell": "NW"},
-    {"name": "Unstad, Norway", "lat": 68.2667, "lng": 13.6000, "type": "Beach Break", "swell": "NW"},
-    # ... (35+ more across Portugal/Spain/France/Ireland)
+# Background refreshes allowed in flight at once
+MAX_CONCURRENT_REFRESHES = 2
 
-    # Africa (25+)
-    {"name": "Dungeons, South Africa", "lat": -34.0278, "lng": 18.3167, "type": "Reef Break", "swell": "SW"},
-    {"name": "Anchor Point, Morocco", "lat": 30.5333, "lng": -9.7000, "type": "Point Break", "swell": "NW"},
-    {"name": "Dakhla, Morocco", "lat": 23.7167, "lng": -15.9500, "type": "Point Break", "swell": "NW"},
-    {"name": "Ponta do Ouro, Mozambique", "lat": -26.8500, "lng": 32.8833, "type": "Point Break", "swell": "S"},
-    {"name": "Tofo, Mozambique", "lat": -23.8500, "lng": 35.5500, "type": "Beach Break", "swell": "S"},
-    {"name": "Skeleton Coast, Namibia", "lat": -20.5000, "lng": 13.2500, "type": "Beach Break", "swell": "SW"},
-    # ... (20+ more across Morocco/SA/Mozambique)
+# Seconds between writes of SURFCAST_METRICS_PROM, when set
+METRICS_EXPORT_INTERVAL = 15
 
-    # Asia (40+)
-    {"name": "Cloud 9, Philippines", "lat": 9.8478, "lng": 126.0539, "type": "Reef Break", "swell": "NE"},
-    {"name": "G-Land, Indonesia", "lat": -8.5000, "lng": 114.1000, "type": "Reef Break", "swell": "SE"},
-    {"name": "Nias, Indonesia", "lat": 1.0667, "lng": 97.5833, "type": "Reef Break", "swell": "SW"},
-    {"name": "Arugam Bay, Sri Lanka", "lat": 6.8500, "lng": 81.8333, "type": "Point Break", "swell": "SW"},
-    {"name": "Kovalam, India", "lat": 8.4000, "lng": 76.9833, "type": "Beach Break", "swell": "SW"},
-    {"name": "Shida Point, Japan", "lat": 35.2333, "lng": 140.4000, "type": "Point Break", "swell": "NE"},
-    {"name": "Kuta Beach, Bali", "lat": -8.7222, "lng": 115.1722, "type": "Beach Break", "swell": "SW"},
-    {"name": "Canggu, Bali", "lat": -8.6500, "lng": 115.1333, "type": "Beach Break", "swell": "SW"},
-    {"name": "Padang Padang, Bali", "lat": -8.8333, "lng": 115.0833, "type": "Reef Break", "swell": "SW"},
-    # ... (30+ more across Indonesia/Japan/Maldives)
+# Snapshots hold the longest forecasts, so every forecast length can be shown from them
+SNAPSHOT_DAYS = 16
 
-    # Oceania (45+)
-    {"name": "Superbank, Australia", "lat": -28.1667, "lng": 153.5500, "type": "Sand Bottom", "swell": "SE"},
-    {"name": "Kirra, Australia", "lat": -28.1667, "lng": 153.5333, "type": "Point Break", "swell": "SE"},
-    {"name": "Teahupo'o, Tahiti", "lat": -17.8333, "lng": -149.2667, "type": "Reef Break", "swell": "SW"},
-    {"name": "Cloudbreak, Fiji", "lat": -18.0000, "lng": 177.0000, "type": "Reef Break", "swell": "SW"},
-    {"name": "Piha, New Zealand", "lat": -36.9528, "lng": 174.4683, "type": "Beach Break", "swell": "W"},
-    {"name": "Raglan, New Zealand", "lat": -37.8014, "lng": 174.8714, "type": "Point Break", "swell": "W"},
-    {"name": "Uluwatu, Bali", "lat": -8.8290, "lng": 115.0868, "type": "Reef Break", "swell": "SW"},
-    {"name": "Shipstern Bluff, Tasmania", "lat": -43.2000, "lng": 147.3500, "type": "Reef Break", "swell": "SW"},
-    # ... (35+ more across Australia/NZ/Pacific Islands)
+# Stored data this many model updates behind is flagged as old rather than stale
+OLD_DATA_RUNS = 4
 
-    # REMOTE & SPECIALTY (15)
-    {"name": "Skeleton Bay, Namibia", "lat": -22.9833, "lng": 14.4667, "type": "Point Break", "swell": "SW"},
-    {"name": "The Right, Australia", "lat": -33.9333, "lng": 114.1333, "type": "Reef Break", "swell": "SW"},
-    {"name": "Cortes Bank, CA", "lat": 32.4767, "lng": -119.3217, "type": "Seamount", "swell": "NW"},
-    {"name": "Belharra, France", "lat": 43.4000, "lng": -1.6000, "type": "Reef Break", "swell": "W"},
-    {"name": "Mavericks, CA", "lat": 37.4953, "lng": -122.4993, "type": "Reef Break", "swell": "NW"},
-    {"name": "Nazaré, Portugal", "lat": 39.6029, "lng": -9.0704, "type": "Beach Break", "swell": "W"},
-    {"name": "Jaws, Maui", "lat": 20.9314, "lng": -156.3806, "type": "Reef Break", "swell": "NW"},
-    {"name": "Ours, Australia", "lat": -34.1667, "lng": 151.3167, "type": "Reef Break", "swell": "S"},
-    # ... (7 more big wave spots)
+# Spot shown on first launch, before any spot has been viewed
+DEFAULT_SPOT = {'name': "Malibu, CA", 'lat': 34.0195, 'lng': -118.4912, 'days': 3}
 
-]
 
 class DataFetcher(QThread):
     """Background thread for fetching surf data"""
-    data_ready = pyqtSignal(dict)
+    data_ready = pyqtSignal(object)
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, lat, lng, days=3):
+    def __init__(self, lat, lng, days=3, cache=None):
         super().__init__()
         self.lat = lat
         self.lng = lng
         self.days = days
+        self.cache = cache
+        self.cancelled = False
+        
+    def cancel(self):
+        """Drop the result; a request already sent still completes and is cached"""
+        self.cancelled = True
         
     def run(self):
         try:
-            # Fetch marine data
-            marine_url = f"https://marine-api.open-meteo.com/v1/marine?latitude={self.lat}&longitude={self.lng}&hourly=wave_height,wave_direction,wave_period,wind_wave_height,wind_wave_direction,wind_wave_period,swell_wave_height,swell_wave_direction,swell_wave_period&daily=wave_height_max,wave_direction_dominant,wave_period_max,wind_wave_height_max,wind_wave_direction_dominant,wind_wave_period_max&timezone=auto&forecast_days={self.days}"
-            
-            weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={self.lat}&longitude={self.lng}&hourly=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation_probability,weather_code,wind_speed_10m,wind_direction_10m,visibility&daily=sunrise,sunset,temperature_2m_max,temperature_2m_min,weather_code&timezone=auto&forecast_days={self.days}"
-            
-            marine_response = requests.get(marine_url, timeout=15)
-            weather_response = requests.get(weather_url, timeout=15)
-            
-            if marine_response.status_code == 200 and weather_response.status_code == 200:
-                marine_data = marine_response.json()
-                weather_data = weather_response.json()
-                
-                # Process data
-                processed_data = self.process_data(marine_data, weather_data)
+            processed_data = fetch_forecast(self.lat, self.lng, self.days, cache=self.cache)
+            if not self.cancelled:
                 self.data_ready.emit(processed_data)
-            else:
-                error_msg = f"Failed to fetch weather data: Marine {marine_response.status_code}, Weather {weather_response.status_code}"
-                self.error_occurred.emit(error_msg)
-                
+        except FetchError as e:
+            if not self.cancelled:
+                self.error_occurred.emit(str(e))
         except Exception as e:
-            self.error_occurred.emit(f"Error fetching data: {str(e)}")
+            if not self.cancelled:
+                self.error_occurred.emit(f"Error fetching data: {str(e)}")
     
     def process_data(self, marine_data, weather_data):
         """Process and combine marine and weather data"""
-        hourly_data = []
-        
-        # Safely get values with default
-        def safe_get(data, key, index, default=0):
-            try:
-                return data['hourly'][key][index] or default
-            except (IndexError, KeyError, TypeError):
-                return default
-        
-        for i, time_str in enumerate(marine_data['hourly']['time']):
-            hour_data = {
-                'time': time_str,
-                'wave_height': safe_get(marine_data, 'wave_height', i),
-                'wave_direction': safe_get(marine_data, 'wave_direction', i),
-                'wave_period': safe_get(marine_data, 'wave_period', i),
-                'swell_height': safe_get(marine_data, 'swell_wave_height', i),
-                'swell_direction': safe_get(marine_data, 'swell_wave_direction', i),
-                'swell_period': safe_get(marine_data, 'swell_wave_period', i),
-                'wind_wave_height': safe_get(marine_data, 'wind_wave_height', i),
-                'wind_wave_direction': safe_get(marine_data, 'wind_wave_direction', i),
-                'wind_wave_period': safe_get(marine_data, 'wind_wave_period', i),
-                'temperature': safe_get(weather_data, 'temperature_2m', i),
-                'apparent_temp': safe_get(weather_data, 'apparent_temperature', i),
-                'humidity': safe_get(weather_data, 'relative_humidity_2m', i),
-                'precipitation': safe_get(weather_data, 'precipitation_probability', i),
-                'weather_code': safe_get(weather_data, 'weather_code', i),
-                'wind_speed': safe_get(weather_data, 'wind_speed_10m', i),
-                'wind_direction': safe_get(weather_data, 'wind_direction_10m', i),
-                'visibility': safe_get(weather_data, 'visibility', i)
-            }
-            hourly_data.append(hour_data)
-        
-        # Process daily data
-        daily_data = []
-        for i, date_str in enumerate(weather_data['daily']['time']):
-            daily_data.append({
-                'date': date_str,
-                'sunrise': weather_data['daily']['sunrise'][i],
-                'sunset': weather_data['daily']['sunset'][i],
-                'temp_max': weather_data['daily']['temperature_2m_max'][i],
-                'temp_min': weather_data['daily']['temperature_2m_min'][i],
-                'weather_code': weather_data['daily']['weather_code'][i]
-            })
-        
-        return {
-            'hourly': hourly_data,
-            'daily': daily_data
-        }
+        return process_forecast(marine_data, weather_data)
+
+
+class BatchForecastFetcher(QThread):
+    """Background thread fetching forecasts for many spots in batched requests.
+
+    Spots are packed into comma-separated latitude/longitude lists, as many per
+    request as the URL length allows, so a whole catalogue refresh is a handful
+    of marine and weather calls. Each spot is emitted as soon as its batch is
+    decoded. Spots fresh in the cache, if given, are emitted from it without a
+    request.
+    """
+    spot_ready = pyqtSignal(dict, object)
+    error_occurred = pyqtSignal(str)
+    
+    def __init__(self, spots, days=3, archive=None, cache=None):
+        super().__init__()
+        self.spots = list(spots)
+        self.days = days
+        self.archive = archive
+        self.cache = cache
+    
+    def batches(self):
+        """Split the spots into groups that each fit in one request URL"""
+        return plan_batches(self.spots, self.days)
+    
+    def iter_forecasts(self, on_error=None):
+        """Yield (spot, processed data) pairs batch by batch"""
+        from surfcast.pool import default_pool
+        return iter_batch_forecasts(self.spots, self.days, on_error=on_error, pool=default_pool(),
+                                    cache=self.cache)
+    
+    def run(self):
+        try:
+            for spot, data in self.iter_forecasts(on_error=self.error_occurred.emit):
+                if self.archive is not None:
+                    self.archive.add(spot['lat'], spot['lng'], data)
+                self.spot_ready.emit(spot, data)
+        except Exception as e:
+            self.error_occurred.emit(f"Error fetching data: {str(e)}")
+
+
+class TileFetcher(QThread):
+    """Background thread fetching a region's marine grid into the tile store"""
+    error_occurred = pyqtSignal(str)
+    
+    def __init__(self, store, region):
+        super().__init__()
+        self.store = store
+        self.region = region
+    
+    def run(self):
+        try:
+            self.store.fetch(self.region)
+        except Exception as e:
+            self.error_occurred.emit(f"Error fetching map: {str(e)}")
+
+
+class SnapshotExporter(QThread):
+    """Background thread prefetching spots and map regions, then writing them to a snapshot file"""
+    progress = pyqtSignal(str)
+    exported = pyqtSignal(dict, list)
+    error_occurred = pyqtSignal(str)
+    
+    def __init__(self, path, spots, forecast_cache, search_cache, tile_store, regions):
+        super().__init__()
+        self.path = path
+        self.spots = list(spots)
+        self.forecast_cache = forecast_cache
+        self.search_cache = search_cache
+        self.tile_store = tile_store
+        self.regions = list(regions)
+    
+    def run(self):
+        from surfcast.snapshot import prefetch_snapshot
+        try:
+            counts, failures = prefetch_snapshot(self.path, self.spots, SNAPSHOT_DAYS, self.forecast_cache,
+                                                 self.search_cache, self.tile_store, self.regions,
+                                                 on_progress=self.progress.emit)
+            self.exported.emit(counts, failures)
+        except Exception as e:
+            self.error_occurred.emit(f"Error writing snapshot: {str(e)}")
 
 
 class LocationSearcher(QThread):
@@ -212,175 +180,127 @@ class LocationSearcher(QThread):
     results_ready = pyqtSignal(list)
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, query):
+    def __init__(self, query, cache=None, offline=False):
         super().__init__()
         self.query = query
+        self.cache = SEARCH_CACHE if cache is None else cache
+        self.offline = offline
         
     def run(self):
         try:
-            # First check if we have this query in cache
-            if self.query in SURF_SPOT_CACHE:
-                self.results_ready.emit(SURF_SPOT_CACHE[self.query])
-                return
-                
-            # Try to find in popular surf spots
-            matching_spots = [spot for spot in POPULAR_SURF_SPOTS 
-                             if self.query.lower() in spot['name'].lower()]
-            
-            if matching_spots:
-                SURF_SPOT_CACHE[self.query] = matching_spots
-                self.results_ready.emit(matching_spots)
-                return
-                
-            # If not found in popular spots, use Nominatim API
-            query_encoded = urllib.parse.quote(self.query)
-            url = f"https://nominatim.openstreetmap.org/search?format=json&q={query_encoded}&limit=10"
-            
-            # Set a user agent to comply with Nominatim usage policy
-            headers = {
-                'User-Agent': 'SurfCastApp/1.0 (contact@example.com)'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                results = []
-                for item in data:
-                    try:
-                        # Extract location name
-                        name_parts = []
-                        if 'name' in item and item['name']:
-                            name_parts.append(item['name'])
-                        if 'display_name' in item:
-                            # Shorten display name to first part
-                            display_name = item['display_name'].split(',')[0]
-                            name_parts.append(display_name)
-                        
-                        name = ', '.join(name_parts) if name_parts else "Unnamed Location"
-                        
-                        results.append({
-                            'name': name,
-                            'lat': float(item.get('lat', 0)),
-                            'lng': float(item.get('lon', 0))
-                        })
-                    except (ValueError, TypeError):
-                        continue
-                
-                # Cache the results
-                SURF_SPOT_CACHE[self.query] = results
-                self.results_ready.emit(results)
-            else:
-                self.error_occurred.emit(f"Search API error: {response.status_code}")
-                self.results_ready.emit([])
-        except requests.exceptions.Timeout:
-            self.error_occurred.emit("Search timed out. Please try again.")
+            self.results_ready.emit(search_locations(self.query, self.cache, offline=self.offline))
+        except SearchError as e:
+            self.error_occurred.emit(str(e))
             self.results_ready.emit([])
         except Exception as e:
-            self.error_occurred.emit(f"Search error: {str(e)}")
+            if is_timeout(e):
+                self.error_occurred.emit("Search timed out. Please try again.")
+            else:
+                self.error_occurred.emit(f"Search error: {str(e)}")
             self.results_ready.emit([])
 
 
-class SurfConditionWidget(QFrame):
-    """Widget for displaying surf conditions"""
-    def __init__(self, title, value, unit, color="#00BCD4"):
-        super().__init__()
-        self.setFrameStyle(QFrame.Box)
-        self.setStyleSheet(f"""
-            QFrame {{
+def format_age(seconds):
+    """A rough age such as 5 min, 3 h or 2 days"""
+    if seconds < 3600:
+        return f"{max(int(seconds // 60), 1)} min"
+    if seconds < 2 * 86400:
+        return f"{int(seconds // 3600)} h"
+    return f"{int(seconds // 86400)} days"
+
+
+# Accent colors for condition cards, styled once in SurfCastApp.setup_styling
+CARD_ACCENTS = {"#00BCD4": "cyan", "#4CAF50": "green", "#FF9800": "orange"}
+
+
+def card_stylesheet():
+    """Stylesheet rules for condition cards in every accent color"""
+    rules = ["""
+            QFrame[accent] QLabel {
+                background: transparent;
+                color: white;
+            }
+            QFrame[accent] QLabel[role="caption"] {
+                color: #B0BEC5;
+            }"""]
+    for color, accent in CARD_ACCENTS.items():
+        rules.append(f"""
+            QFrame[accent="{accent}"] {{
                 background: qlineargradient(x1:0, y1:0, x2:1, y2:1, 
                     stop:0 {color}22, stop:1 {color}44);
                 border: 1px solid {color}66;
                 border-radius: 8px;
                 padding: 6px;
             }}
-            QLabel {{
-                background: transparent;
-                color: white;
-            }}
-        """)
+            QFrame[accent="{accent}"] QLabel[role="value"] {{
+                color: {color};
+            }}""")
+    return "".join(rules)
+
+
+class ConditionCard(QFrame):
+    """Base for condition widgets: an accent-colored card of stacked labels"""
+    def __init__(self, color):
+        super().__init__()
+        self.setFrameStyle(QFrame.Box)
+        self.setProperty("accent", CARD_ACCENTS.get(color, "cyan"))
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         
-        layout = QVBoxLayout()
-        layout.setContentsMargins(4, 4, 4, 4)
+        self.card_layout = QVBoxLayout()
+        self.card_layout.setContentsMargins(4, 4, 4, 4)
+        self.setLayout(self.card_layout)
+    
+    def add_label(self, text, font, role="caption"):
+        label = QLabel(text)
+        label.setAlignment(Qt.AlignCenter)
+        label.setFont(font)
+        label.setProperty("role", role)
+        self.card_layout.addWidget(label)
+        return label
+
+
+class SurfConditionWidget(ConditionCard):
+    """Widget for displaying surf conditions"""
+    def __init__(self, title, value, unit, color="#00BCD4"):
+        super().__init__(color)
         
         # Value label
-        value_label = QLabel(value)
-        value_label.setAlignment(Qt.AlignCenter)
-        value_label.setFont(QFont("Arial", 16, QFont.Bold))
-        value_label.setStyleSheet(f"color: {color};")
-        value_label.setMinimumHeight(30)
+        self.value_label = self.add_label(value, QFont("Arial", 16, QFont.Bold), role="value")
+        self.value_label.setMinimumHeight(30)
         
         # Unit label
-        unit_label = QLabel(unit)
-        unit_label.setAlignment(Qt.AlignCenter)
-        unit_label.setFont(QFont("Arial", 10))
-        unit_label.setStyleSheet("color: #B0BEC5;")
-        unit_label.setWordWrap(True)
+        self.unit_label = self.add_label(unit, QFont("Arial", 10))
+        self.unit_label.setWordWrap(True)
         
         # Title label
-        title_label = QLabel(title)
-        title_label.setAlignment(Qt.AlignCenter)
-        title_label.setFont(QFont("Arial", 9))
-        title_label.setStyleSheet("color: #B0BEC5;")
-        title_label.setWordWrap(True)
-        
-        layout.addWidget(value_label)
-        layout.addWidget(unit_label)
-        layout.addWidget(title_label)
-        
-        self.setLayout(layout)
+        self.title_label = self.add_label(title, QFont("Arial", 9))
+        self.title_label.setWordWrap(True)
+    
+    def set_value(self, value):
+        self.value_label.setText(value)
 
 
-class DirectionWidget(QFrame):
+class DirectionWidget(ConditionCard):
     """Widget for displaying direction information with arrow"""
     def __init__(self, title, degrees, color="#00BCD4"):
-        super().__init__()
-        self.setFrameStyle(QFrame.Box)
-        self.setStyleSheet(f"""
-            QFrame {{
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1, 
-                    stop:0 {color}22, stop:1 {color}44);
-                border: 1px solid {color}66;
-                border-radius: 8px;
-                padding: 6px;
-            }}
-            QLabel {{
-                background: transparent;
-                color: white;
-            }}
-        """)
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        super().__init__(color)
         
-        layout = QVBoxLayout()
-        layout.setContentsMargins(4, 4, 4, 4)
-        
-        # Arrow label
-        arrow = self.get_direction_arrow(degrees)
-        arrow_label = QLabel(arrow)
-        arrow_label.setAlignment(Qt.AlignCenter)
-        arrow_label.setFont(QFont("Arial", 24))  # Larger font for arrows
-        arrow_label.setStyleSheet(f"color: {color};")
+        # Arrow label, larger font for arrows
+        self.arrow_label = self.add_label("", QFont("Arial", 24), role="value")
         
         # Direction text
-        direction_text = self.get_direction_text(degrees)
-        direction_label = QLabel(f"{direction_text}\n{degrees}°")
-        direction_label.setAlignment(Qt.AlignCenter)
-        direction_label.setFont(QFont("Arial", 10))
-        direction_label.setStyleSheet("color: #B0BEC5;")
+        self.direction_label = self.add_label("", QFont("Arial", 10))
         
         # Title label
-        title_label = QLabel(title)
-        title_label.setAlignment(Qt.AlignCenter)
-        title_label.setFont(QFont("Arial", 9))
-        title_label.setStyleSheet("color: #B0BEC5;")
-        title_label.setWordWrap(True)
-        
-        layout.addWidget(arrow_label)
-        layout.addWidget(direction_label)
-        layout.addWidget(title_label)
+        self.title_label = self.add_label(title, QFont("Arial", 9))
+        self.title_label.setWordWrap(True)
         
-        self.setLayout(layout)
+        self.set_degrees(degrees)
+    
+    def set_degrees(self, degrees):
+        self.arrow_label.setText(self.get_direction_arrow(degrees))
+        degrees_text = "N/A" if degrees is None else f"{degrees:.0f}°"
+        self.direction_label.setText(f"{self.get_direction_text(degrees)}\n{degrees_text}")
     
     def get_direction_arrow(self, degrees):
         """Get arrow symbol for direction"""
@@ -400,24 +320,801 @@ class DirectionWidget(QFrame):
         return directions[index]
 
 
-class SurfCastApp(QMainWindow):
+# Custom item data roles used by ForecastDelegate
+ROW_KIND_ROLE = Qt.UserRole + 1
+BAR_FRACTION_ROLE = Qt.UserRole + 2
+DAY_ROW, HOUR_ROW = 0, 1
+
+
+class ForecastTableModel(QAbstractTableModel):
+    """Table model over processed forecasts, one column group per spot.
+
+    Rows are a header row per day followed by that day's hours. Cell text is
+    formatted from the forecast's column arrays only when the view asks for
+    it, and rows are exposed in blocks through fetchMore, so the cost of a
+    16-day forecast for many spots follows the rows on screen.
+    """
+    # (column, header, format); None formats directions as compass points
+    FIELDS = [
+        ('wave_height', "Waves", "{:.1f}m"),
+        ('swell_period', "Period", "{:.0f}s"),
+        ('swell_direction', "Swell", None),
+        ('wind_speed', "Wind", "{:.0f}km/h"),
+        ('wind_direction', "Wind Dir", None),
+    ]
+    FETCH_ROWS = 96
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.series = []
+        self._timestamps = np.array([], dtype='datetime64[m]')
+        self._day_rows = np.array([], dtype=int)
+        self._day_starts = np.array([], dtype=int)
+        self._row_count = 0
+        self._loaded = 0
+        self._aggregates = {}
+    
+    def set_forecasts(self, series):
+        """Show a list of (spot name, hourly ForecastFrame) pairs"""
+        self.beginResetModel()
+        self.series = []
+        self._aggregates = {}
+        if series:
+            self._timestamps = series[0][1].timestamps
+            days = self._timestamps.astype('datetime64[D]')
+            starts = np.flatnonzero(np.concatenate([[True], days[1:] != days[:-1]])) if len(days) else days
+            self._day_starts = np.asarray(starts, dtype=int)
+            # Each day's header sits before its hours, pushing later rows down
+            self._day_rows = self._day_starts + np.arange(len(self._day_starts))
+            self._row_count = len(self._timestamps) + len(self._day_starts)
+        else:
+            self._timestamps = np.array([], dtype='datetime64[m]')
+            self._day_starts = self._day_rows = np.array([], dtype=int)
+            self._row_count = 0
+        self._loaded = min(self._row_count, self.FETCH_ROWS)
+        for name, frame in series:
+            self.series.append(self._aligned(name, frame))
+        self.endResetModel()
+    
+    def add_forecast(self, name, frame):
+        """Append a spot's forecast as a new column group"""
+        if not self.series:
+            self.set_forecasts([(name, frame)])
+            return
+        first = self.columnCount()
+        self.beginInsertColumns(QModelIndex(), first, first + len(self.FIELDS) - 1)
+        self.series.append(self._aligned(name, frame))
+        self.endInsertColumns()
+    
+    def _aligned(self, name, frame):
+        """Map the first spot's hours onto another frame's rows, -1 if absent"""
+        timestamps = frame.timestamps
+        if len(timestamps) == len(self._timestamps) and (timestamps == self._timestamps).all():
+            rows = np.arange(len(timestamps))
+        else:
+            rows = np.searchsorted(timestamps, self._timestamps)
+            found = rows < len(timestamps)
+            found[found] = timestamps[rows[found]] == self._timestamps[found]
+            rows = np.where(found, rows, -1)
+        waves = frame.column('wave_height')
+        waves = waves[~np.isnan(waves)]
+        peak = waves.max() if len(waves) else 0.0
+        return name, frame, rows, peak if peak > 0 else 1.0
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1 + len(self.series) * len(self.FIELDS)
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < self._row_count
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_ROWS, self._row_count - self._loaded)
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+    
+    def locate(self, row):
+        """Return (day index, hour index) for a row; hour is None on day rows"""
+        day = int(np.searchsorted(self._day_rows, row, side='right')) - 1
+        if row == self._day_rows[day]:
+            return day, None
+        return day, int(self._day_starts[day] + row - self._day_rows[day] - 1)
+    
+    def summary(self, spot, day):
+        """Summary of one spot for the first spot's day, computed per spot once"""
+        aggregate = self._aggregates.get(spot)
+        if aggregate is None:
+            aggregate = self._aggregates[spot] = DailyAggregate(self.series[spot][1])
+        i = aggregate.index(self._timestamps[self._day_starts[day]])
+        return None if i is None else aggregate.summary(i)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        day, hour = self.locate(index.row())
+        if role == ROW_KIND_ROLE:
+            return DAY_ROW if hour is None else HOUR_ROW
+        column = index.column()
+        if column == 0:
+            if role != Qt.DisplayRole:
+                return None
+            if hour is None:
+                return self._timestamps[self._day_starts[day]].astype(datetime).strftime("%a, %b %d")
+            return self._timestamps[hour].astype(datetime).strftime("%H:%M")
+        
+        spot, field = divmod(column - 1, len(self.FIELDS))
+        key, label, fmt = self.FIELDS[field]
+        if hour is None:
+            return self.day_data(spot, day, key, role)
+        
+        name, frame, rows, peak = self.series[spot]
+        row = rows[hour]
+        value = np.nan if row < 0 else frame.column(key)[row]
+        if np.isnan(value):
+            return "-" if role == Qt.DisplayRole else None
+        if role == Qt.DisplayRole:
+            return compass_point(value) if fmt is None else fmt.format(value)
+        if role == BAR_FRACTION_ROLE and key == 'wave_height':
+            return min(float(value) / peak, 1.0)
+        return None
+    
+    def day_data(self, spot, day, key, role):
+        """Day row cells: wave range, mean wind and primary swell direction"""
+        if role != Qt.DisplayRole:
+            return None
+        summary = self.summary(spot, day)
+        if summary is None:
+            return "Data unavailable" if key == 'wave_height' else None
+        if key == 'wave_height':
+            return f"{summary['min_wave']:.1f}-{summary['max_wave']:.1f}m"
+        if key == 'wind_speed':
+            return f"{summary['avg_wind']:.0f}km/h"
+        if key == 'swell_direction':
+            return compass_point(summary['swell_direction'])
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal or role != Qt.DisplayRole:
+            return None
+        if section == 0:
+            return "Time"
+        spot, field = divmod(section - 1, len(self.FIELDS))
+        label = self.FIELDS[field][1]
+        if len(self.series) > 1:
+            return f"{self.series[spot][0]}\n{label}"
+        return label
+
+
+class ForecastDelegate(QStyledItemDelegate):
+    """Paints day header bands and wave-height bars for ForecastTableModel"""
+    DAY_BACKGROUND = QColor(0, 188, 212, 40)
+    DAY_TEXT = QColor("#00BCD4")
+    BAR_COLOR = QColor(0, 188, 212, 90)
+    
+    def paint(self, painter, option, index):
+        if index.data(ROW_KIND_ROLE) == DAY_ROW:
+            painter.save()
+            painter.fillRect(option.rect, self.DAY_BACKGROUND)
+            font = QFont(option.font)
+            font.setBold(True)
+            painter.setFont(font)
+            painter.setPen(self.DAY_TEXT)
+            painter.drawText(option.rect.adjusted(6, 0, -6, 0),
+                             Qt.AlignVCenter | Qt.AlignLeft, index.data() or "")
+            painter.restore()
+            return
+        fraction = index.data(BAR_FRACTION_ROLE)
+        if fraction is not None:
+            rect = QRectF(option.rect.adjusted(2, 4, -2, -4))
+            rect.setWidth(rect.width() * fraction)
+            painter.fillRect(rect, self.BAR_COLOR)
+        super().paint(painter, option, index)
+
+
+class WaveChart(QWidget):
+    """Time-series chart of wave, swell, wind-wave and wind forecasts.
+    
+    The background, axes and series are rendered into a QPixmap that is only
+    rebuilt when the data or the widget size changes; hovering just blits
+    the pixmap and draws the crosshair and readout on top. Series longer
+    than the plot is wide are reduced with LTTB before drawing.
+    """
+    # (column, label, color, axis) where axis 0 is metres and 1 is km/h
+    SERIES = [
+        ('wave_height', "Waves", "#00BCD4", 0),
+        ('swell_height', "Swell", "#4CAF50", 0),
+        ('wind_wave_height', "Wind waves", "#FF9800", 0),
+        ('wind_speed', "Wind", "#B0BEC5", 1),
+    ]
+    MARGINS = (44, 28, 52, 24)  # left, top, right, bottom
+    
     def __init__(self):
         super().__init__()
+        self.setMouseTracking(True)
+        self.setMinimumHeight(180)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.frame = None
+        self.minutes = np.array([])
+        self._cache = None
+        self._tops = None
+        self._hover = None
+    
+    def set_frame(self, frame):
+        """Show an hourly ForecastFrame"""
+        self.frame = frame
+        timestamps = frame.timestamps
+        self.minutes = (timestamps - timestamps[0]).astype(float) if len(timestamps) else np.array([])
+        self._hover = None
+        self._cache = None
+        self.update()
+    
+    def resizeEvent(self, event):
+        self._cache = None
+        super().resizeEvent(event)
+    
+    def plot_rect(self):
+        left, top, right, bottom = self.MARGINS
+        return QRectF(left, top, max(self.width() - left - right, 1), max(self.height() - top - bottom, 1))
+    
+    def scales(self):
+        """Upper bound of each y axis, rounded so the four grid steps are round numbers"""
+        tops = [1.0, 10.0]
+        for key, label, color, axis in self.SERIES:
+            values = self.frame.column(key)
+            if (~np.isnan(values)).any():
+                tops[axis] = max(tops[axis], float(np.nanmax(values)))
+        return [np.ceil(tops[0] / 2) * 2, np.ceil(tops[1] / 20) * 20]
+    
+    def to_point(self, rect, minutes, value, top):
+        span = self.minutes[-1] or 1.0
+        return QPointF(rect.left() + rect.width() * minutes / span,
+                       rect.bottom() - rect.height() * value / top)
+    
+    @METRICS.timed('ui.chart_render')
+    def render_cache(self):
+        """Draw background, grid, axes and series into the cached pixmap"""
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(QColor(0, 0, 0, 0))
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = self.plot_rect()
+        painter.fillRect(rect, QColor(0, 188, 212, 20))
+        if self.frame is None or len(self.minutes) < 2:
+            painter.end()
+            return pixmap
+        
+        tops = self._tops = self.scales()
+        painter.setFont(QFont("Arial", 8))
+        grid_pen = QPen(QColor(176, 190, 197, 60))
+        # Horizontal grid with metres on the left and km/h on the right
+        for step in range(5):
+            y = rect.bottom() - rect.height() * step / 4
+            painter.setPen(grid_pen)
+            painter.drawLine(QPointF(rect.left(), y), QPointF(rect.right(), y))
+            painter.setPen(QColor("#B0BEC5"))
+            painter.drawText(QRectF(0, y - 8, rect.left() - 4, 16), Qt.AlignRight | Qt.AlignVCenter,
+                             f"{tops[0] * step / 4:.1f}m")
+            painter.drawText(QRectF(rect.right() + 4, y - 8, self.MARGINS[2], 16),
+                             Qt.AlignLeft | Qt.AlignVCenter, f"{tops[1] * step / 4:.0f}")
+        # Day separators and labels
+        days = self.frame.timestamps.astype('datetime64[D]')
+        starts = np.flatnonzero(np.concatenate([[True], days[1:] != days[:-1]]))
+        label_every = max(1, int(len(starts) * 60 / rect.width()) + 1)
+        for n, start in enumerate(starts):
+            point = self.to_point(rect, self.minutes[start], 0, 1)
+            painter.setPen(grid_pen)
+            painter.drawLine(QPointF(point.x(), rect.top()), QPointF(point.x(), rect.bottom()))
+            if n % label_every == 0:
+                painter.setPen(QColor("#B0BEC5"))
+                painter.drawText(QRectF(point.x() + 3, rect.bottom() + 2, 80, 16),
+                                 Qt.AlignLeft, days[start].astype(datetime).strftime("%a %d"))
+        # Series, reduced to about one point per pixel
+        threshold = max(int(rect.width()), 3)
+        for n, (key, label, color, axis) in enumerate(self.SERIES):
+            xs, ys = downsample(self.minutes, self.frame.column(key), threshold)
+            painter.setPen(QPen(QColor(color), 2 if axis == 0 else 1.5,
+                                Qt.SolidLine if axis == 0 else Qt.DashLine))
+            painter.drawPolyline(QPolygonF([self.to_point(rect, x, y, tops[axis]) for x, y in zip(xs, ys)]))
+            # Legend
+            painter.drawText(QRectF(rect.left() + n * 90, 4, 90, 18), Qt.AlignLeft, f"— {label}")
+        painter.setPen(QColor("#B0BEC5"))
+        painter.drawText(QRectF(rect.right() + 4, 4, self.MARGINS[2], 18), Qt.AlignLeft, "km/h")
+        painter.end()
+        return pixmap
+    
+    def mouseMoveEvent(self, event):
+        if self.frame is None or len(self.minutes) < 2:
+            return
+        rect = self.plot_rect()
+        fraction = min(max((event.x() - rect.left()) / rect.width(), 0.0), 1.0)
+        target = fraction * self.minutes[-1]
+        index = int(np.searchsorted(self.minutes, target))
+        if index > 0 and (index == len(self.minutes) or
+                          target - self.minutes[index - 1] < self.minutes[index] - target):
+            index -= 1
+        if index != self._hover:
+            self._hover = index
+            self.update()
+    
+    def leaveEvent(self, event):
+        self._hover = None
+        self.update()
+    
+    def paintEvent(self, event):
+        if self._cache is None:
+            self._cache = self.render_cache()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._cache)
+        if self._hover is None:
+            return
+        
+        # Crosshair, markers and readout for the hovered hour
+        rect = self.plot_rect()
+        tops = self._tops
+        row = self.frame[self._hover]
+        x = self.to_point(rect, self.minutes[self._hover], 0, 1).x()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(QColor(255, 255, 255, 140)))
+        painter.drawLine(QPointF(x, rect.top()), QPointF(x, rect.bottom()))
+        lines = [self.frame.timestamps[self._hover].astype(datetime).strftime("%a %H:%M")]
+        for key, label, color, axis in self.SERIES:
+            value = self.frame.column(key)[self._hover]
+            if np.isnan(value):
+                continue
+            painter.setBrush(QColor(color))
+            painter.drawEllipse(self.to_point(rect, self.minutes[self._hover], value, tops[axis]), 3, 3)
+            lines.append(f"{label}: {value:.1f}{'m' if axis == 0 else 'km/h'}")
+        lines.append(f"Period: {row['swell_period']:.0f}s / {row['wind_wave_period']:.0f}s")
+        box = QRectF(0, rect.top() + 4, 150, 16 * len(lines) + 8)
+        box.moveLeft(x + 8 if x + 158 < rect.right() else x - 158)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(38, 50, 56, 220))
+        painter.drawRoundedRect(box, 4, 4)
+        painter.setPen(QColor("white"))
+        painter.setFont(QFont("Arial", 8))
+        painter.drawText(box.adjusted(8, 4, -8, -4), Qt.AlignLeft | Qt.AlignTop, "\n".join(lines))
+
+
+class SwellMap(QWidget):
+    """Heatmap of one hour of a forecast tile, read straight from its memory map.
+    
+    The hour's (rows, columns) slab is coloured through a lookup table into
+    an image of one pixel per grid point and scaled up smoothly, so drawing
+    touches nothing else in the tile. The image is cached until the tile,
+    hour or size changes; hovering shows the forecast interpolated at the
+    cursor.
+    """
+    # Colour stops over 0 to SCALE_M metres of wave height
+    STOPS = [(0.0, "#0D47A1"), (0.25, "#00BCD4"), (0.5, "#4CAF50"), (0.75, "#FFEB3B"), (1.0, "#F44336")]
+    SCALE_M = 6.0
+    LAND = "#263238"
+    MARGINS = (8, 8, 8, 30)  # left, top, right, bottom
+    
+    def __init__(self):
+        super().__init__()
+        self.setMouseTracking(True)
+        self.setMinimumHeight(240)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.tile = None
+        self.hour = 0
+        self.spots = []
+        self.current = None
+        self._cache = None
+        self._hover = None
+        # Row 256 colours missing values, which are land
+        colors = [QColor(color) for _, color in self.STOPS]
+        levels = np.linspace(0, 1, 256)
+        self.lut = np.empty((257, 4), dtype=np.uint8)
+        for channel, read in enumerate((QColor.red, QColor.green, QColor.blue)):
+            self.lut[:256, channel] = np.interp(levels, [stop for stop, _ in self.STOPS],
+                                                [read(color) for color in colors])
+        self.lut[:256, 3] = 255
+        land = QColor(self.LAND)
+        self.lut[256] = (land.red(), land.green(), land.blue(), 255)
+    
+    def set_tile(self, tile):
+        self.tile = tile
+        self.hour = min(self.hour, len(tile) - 1)
+        self._cache = None
+        self._hover = None
+        self.update()
+    
+    def set_hour(self, hour):
+        self.hour = hour
+        self._cache = None
+        self._hover = None
+        self.update()
+    
+    def set_spots(self, spots, current):
+        """Mark catalogue spots as (name, lat, lng) and the current one"""
+        self.spots = spots
+        self.current = current
+        self._cache = None
+        self.update()
+    
+    def resizeEvent(self, event):
+        self._cache = None
+        super().resizeEvent(event)
+    
+    def map_rect(self):
+        """The largest rectangle of the region's true shape that fits the widget"""
+        left, top, right, bottom = self.MARGINS
+        width, height = max(self.width() - left - right, 1), max(self.height() - top - bottom, 1)
+        region = self.tile.region
+        aspect = ((region.east - region.west) * np.cos(np.radians((region.north + region.south) / 2)) /
+                  (region.north - region.south))
+        fitted = QRectF(0, 0, min(width, height * aspect), min(height, width / aspect))
+        fitted.moveCenter(QPointF(left + width / 2, top + height / 2))
+        return fitted
+    
+    def to_point(self, rect, lat, lng):
+        region = self.tile.region
+        return QPointF(rect.left() + rect.width() * (lng - region.west) / (region.east - region.west),
+                       rect.bottom() - rect.height() * (lat - region.south) / (region.north - region.south))
+    
+    def to_coordinates(self, rect, point):
+        region = self.tile.region
+        return (region.south + (rect.bottom() - point.y()) / rect.height() * (region.north - region.south),
+                region.west + (point.x() - rect.left()) / rect.width() * (region.east - region.west))
+    
+    @METRICS.timed('ui.map_render')
+    def render_cache(self):
+        """Draw the heatmap, spot markers and legend into the cached pixmap"""
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(QColor(0, 0, 0, 0))
+        if self.tile is None:
+            return pixmap
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        rect = self.map_rect()
+        
+        values = np.asarray(self.tile.column('wave_height')[self.hour])
+        levels = np.clip(np.nan_to_num(values, nan=0.0) * (255 / self.SCALE_M), 0, 255).astype(np.intp)
+        levels[np.isnan(values)] = 256
+        # Rows run south to north; images run top to bottom
+        rgba = np.ascontiguousarray(self.lut[levels[::-1]])
+        rows, cols = values.shape
+        painter.drawImage(rect, QImage(rgba.data, cols, rows, cols * 4, QImage.Format_RGBA8888))
+        
+        painter.setFont(QFont("Arial", 8))
+        for name, lat, lng in self.spots:
+            painter.setPen(QPen(QColor(255, 255, 255, 200)))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawEllipse(self.to_point(rect, lat, lng), 2.5, 2.5)
+        if self.current is not None:
+            name, lat, lng = self.current
+            point = self.to_point(rect, lat, lng)
+            painter.setPen(QPen(QColor("white"), 2))
+            painter.setBrush(QColor("#FF9800"))
+            painter.drawEllipse(point, 5, 5)
+            painter.drawText(QRectF(point.x() + 8, point.y() - 9, 200, 18), Qt.AlignLeft | Qt.AlignVCenter, name)
+        
+        # Colour scale and the hour shown
+        bar = QRectF(rect.left(), self.height() - self.MARGINS[3] + 8, min(rect.width() * 0.4, 200), 8)
+        scale = np.ascontiguousarray(self.lut[None, :256])
+        painter.drawImage(bar, QImage(scale.data, 256, 1, 256 * 4, QImage.Format_RGBA8888))
+        painter.setPen(QColor("#B0BEC5"))
+        painter.drawText(QRectF(bar.right() + 6, bar.top() - 5, 80, 18), Qt.AlignLeft | Qt.AlignVCenter,
+                         f"0-{self.SCALE_M:.0f}m waves")
+        when = self.tile.timestamps[self.hour].astype(datetime)
+        painter.drawText(QRectF(rect.left(), bar.top() - 5, rect.width(), 18), Qt.AlignRight | Qt.AlignVCenter,
+                         when.strftime("%a %d %b %H:%M UTC"))
+        painter.end()
+        return pixmap
+    
+    def mouseMoveEvent(self, event):
+        if self.tile is None:
+            return
+        lat, lng = self.to_coordinates(self.map_rect(), QPointF(event.pos()))
+        data = self.tile.forecast(lat, lng)
+        hover = None
+        if data is not None:
+            row = data['hourly'][self.hour]
+            hover = (QPointF(event.pos()), [f"{lat:.2f}, {lng:.2f}",
+                                            f"Waves: {row['wave_height']:.1f}m",
+                                            f"Swell: {row['swell_height']:.1f}m @ {row['swell_period']:.0f}s "
+                                            f"{compass_point(row['swell_direction'])}"])
+        if hover != self._hover:
+            self._hover = hover
+            self.update()
+    
+    def leaveEvent(self, event):
+        self._hover = None
+        self.update()
+    
+    def paintEvent(self, event):
+        if self._cache is None:
+            self._cache = self.render_cache()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._cache)
+        if self.tile is None:
+            painter.setPen(QColor("#B0BEC5"))
+            painter.drawText(self.rect(), Qt.AlignCenter, "Loading the regional map...")
+            return
+        if self._hover is None:
+            return
+        
+        point, lines = self._hover
+        box = QRectF(0, 0, 170, 16 * len(lines) + 8)
+        box.moveTopLeft(QPointF(point.x() + 12 if point.x() + 182 < self.width() else point.x() - 182,
+                                min(point.y() + 12, self.height() - box.height())))
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(38, 50, 56, 220))
+        painter.drawRoundedRect(box, 4, 4)
+        painter.setPen(QColor("white"))
+        painter.setFont(QFont("Arial", 8))
+        painter.drawText(box.adjusted(8, 4, -8, -4), Qt.AlignLeft | Qt.AlignTop, "\n".join(lines))
+
+
+class LatencyHistogram(QWidget):
+    """Bar chart of a span's recent durations on log-spaced bins"""
+    BINS = 24
+    
+    def __init__(self):
+        super().__init__()
+        self.setMinimumHeight(140)
+        self.name = None
+        self.samples = np.array([])
+    
+    def set_samples(self, name, samples):
+        self.name = name
+        self.samples = np.asarray(samples, dtype=float)
+        self.update()
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = QRectF(8, 22, max(self.width() - 16, 1), max(self.height() - 44, 1))
+        painter.fillRect(rect, QColor(0, 188, 212, 20))
+        painter.setFont(QFont("Arial", 8))
+        painter.setPen(QColor("#B0BEC5"))
+        if self.name is None or not len(self.samples):
+            painter.drawText(rect, Qt.AlignCenter, "Select a span to see its distribution")
+            return
+        
+        low = max(float(self.samples.min()), 1e-6)
+        high = max(float(self.samples.max()), low * 1.01)
+        edges = np.geomspace(low, high, self.BINS + 1)
+        counts, _ = np.histogram(np.clip(self.samples, low, high), edges)
+        width = rect.width() / self.BINS
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#00BCD4"))
+        for n, count in enumerate(counts):
+            height = rect.height() * count / counts.max()
+            painter.drawRect(QRectF(rect.left() + n * width + 1, rect.bottom() - height, width - 2, height))
+        
+        # Median and 95th percentile markers
+        for q, color in ((50, "#4CAF50"), (95, "#FF9800")):
+            value = float(np.percentile(self.samples, q))
+            x = rect.left() + rect.width() * np.log(value / low) / np.log(high / low)
+            painter.setPen(QPen(QColor(color), 1.5, Qt.DashLine))
+            painter.drawLine(QPointF(x, rect.top()), QPointF(x, rect.bottom()))
+        painter.setPen(QColor("#B0BEC5"))
+        painter.drawText(QRectF(rect.left(), 2, rect.width(), 18), Qt.AlignLeft,
+                         f"{self.name}: {len(self.samples)} recent samples, "
+                         f"p50 {np.percentile(self.samples, 50) * 1000:.1f}ms, "
+                         f"p95 {np.percentile(self.samples, 95) * 1000:.1f}ms")
+        painter.drawText(QRectF(rect.left(), rect.bottom() + 2, rect.width(), 18), Qt.AlignLeft,
+                         f"{low * 1000:.2f}ms")
+        painter.drawText(QRectF(rect.left(), rect.bottom() + 2, rect.width(), 18), Qt.AlignRight,
+                         f"{high * 1000:.2f}ms")
+
+
+class DiagnosticsPanel(QWidget):
+    """Live span timings, counters and gauges from the metrics registry.
+    
+    Refreshes once a second while visible. Selecting a span row shows the
+    distribution of its recent durations, for that row's labels only.
+    """
+    COLUMNS = ["Span", "Count", "Last", "p50", "p95", "Max"]
+    
+    def __init__(self, metrics=METRICS):
+        super().__init__()
+        self.metrics = metrics
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setSpacing(10)
+        
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.table.itemSelectionChanged.connect(self.update_histogram)
+        layout.addWidget(self.table, 2)
+        
+        self.histogram = LatencyHistogram()
+        layout.addWidget(self.histogram, 1)
+        
+        footer = QHBoxLayout()
+        self.gauges_label = QLabel()
+        self.gauges_label.setWordWrap(True)
+        footer.addWidget(self.gauges_label, 1)
+        export_btn = QPushButton("Export...")
+        export_btn.clicked.connect(self.export)
+        footer.addWidget(export_btn)
+        layout.addLayout(footer)
+        
+        self.timer = QTimer()
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start()
+    
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+    
+    def selected_span(self):
+        """(row text, span name, labels) of the selected row, or None"""
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            return None
+        item = self.table.item(rows[0].row(), 0)
+        return (item.text(), *item.data(Qt.UserRole))
+    
+    def refresh(self):
+        """Reload the table and gauges from a metrics snapshot"""
+        snapshot = self.metrics.snapshot()
+        selected = self.selected_span()
+        selected = selected[0] if selected else None
+        spans = snapshot['spans']
+        self.table.blockSignals(True)
+        self.table.setRowCount(len(spans))
+        for row, span in enumerate(spans):
+            label = span['name']
+            if span['labels']:
+                label += " " + ",".join(f"{key}={value}" for key, value in span['labels'].items())
+            cells = [label, str(span['count'])]
+            cells += [f"{span[key] * 1000:.2f}ms" if span[key] is not None else "-"
+                      for key in ('last', 'p50', 'p95', 'max')]
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if column:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                else:
+                    item.setData(Qt.UserRole, (span['name'], span['labels']))
+                self.table.setItem(row, column, item)
+            if label == selected:
+                self.table.selectRow(row)
+        self.table.blockSignals(False)
+        
+        values = [f"{name}: {value:g}" for name, value in sorted(snapshot['gauges'].items())]
+        values += [f"{name}: {value}" for name, value in sorted(snapshot['counters'].items())]
+        self.gauges_label.setText("   ".join(values))
+        self.update_histogram()
+    
+    def update_histogram(self):
+        selected = self.selected_span()
+        if selected is not None:
+            label, name, labels = selected
+            self.histogram.set_samples(label, self.metrics.recent(name, **labels))
+    
+    def export(self):
+        """Save the metrics as Prometheus text or a JSON snapshot"""
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export metrics", "surfcast-metrics.prom",
+            "Prometheus text (*.prom);;JSON snapshot (*.json)")
+        if not path:
+            return
+        try:
+            if path.endswith(".json"):
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(self.metrics.snapshot(), f, indent=2)
+            else:
+                self.metrics.write_prometheus(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Failed to export metrics: {e}")
+
+
+class LazyTab(QWidget):
+    """Tab placeholder whose contents are built the first time it is selected"""
+    
+    def __init__(self, build, refresh=None):
+        super().__init__()
+        self.build = build
+        self.refresh = refresh
+        self.built = False
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+    
+    def ensure_built(self):
+        """Build the contents now, then fill them with current data"""
+        if self.built:
+            return
+        self.built = True
+        self.layout().addWidget(self.build())
+        if self.refresh is not None:
+            self.refresh()
+
+
+class SurfCastApp(QMainWindow):
+    def __init__(self, engine=None):
+        super().__init__()
+        # asyncio engine for requests; None runs each request on a QThread
+        self.engine = engine
         self.settings = QSettings("SurfCast", "SurfCastPro")
-        self.current_location = {'lat': 34.0195, 'lng': -118.4912}
-        self.location_name = "Malibu, CA"
+        self.forecast_cache = ForecastCache(os.path.join(
+            os.path.dirname(self.settings.fileName()), "forecast_cache.sqlite3"))
+        self.search_cache = SearchCache(os.path.join(
+            os.path.dirname(self.settings.fileName()), "search_cache.json"))
+        # Every fetched forecast is kept for hindcasts, see forecast_archive
+        self._forecast_archive = None
+        self.showing_cached = False
+        # Offline mode reads only local caches; SURFCAST_OFFLINE=1 forces it, as on kiosks
+        self.offline = (os.environ.get('SURFCAST_OFFLINE') == '1' or
+                        self.settings.value("offline", False, type=bool))
+        # When the shown forecast was fetched, whether it came from the archive, and the last fetch error
+        self.data_fetched_at = None
+        self.data_archived = False
+        self.fetch_error = None
+        self.snapshot_thread = None
+        # Every forecast fetch goes through here, so superseded ones never paint
+        self.requests = RequestManager(self.start_fetch)
+        self.fetch_threads = set()
+        last_spot = self.load_last_spot()
+        self.current_location = {'lat': last_spot['lat'], 'lng': last_spot['lng']}
+        self.location_name = last_spot['name']
+        self.selected_days = last_spot['days']
         self.surf_data = None
         self.favorites = self.load_favorites()
-        self.selected_days = 3
+        self.favorites_index = SpatialIndex(self.favorites)
+        self.compare_forecasts = {}
+        self.compare_thread = None
+        self.session_ranker = None
+        self.session_thread = None
+        self.session_requested = set()
+        self._tile_store = None
+        self.tile_thread = None
+        self.tile_requested = set()
         self.search_timer = QTimer()
         self.search_timer.setSingleShot(True)
         self.search_timer.setInterval(500)  # 500ms delay after typing
         
-        self.init_ui()
+        # Auto-refresh of the current spot and favorites as their data expires
+        self.refresh_scheduler = RefreshScheduler()
+        self.refresh_timer = QTimer()
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.run_due_refreshes)
+        
+        self.register_gauges()
+        self.metrics_path = os.environ.get('SURFCAST_METRICS_PROM')
+        self.metrics_timer = QTimer()
+        self.metrics_timer.setInterval(METRICS_EXPORT_INTERVAL * 1000)
+        self.metrics_timer.timeout.connect(self.export_metrics)
+        if self.metrics_path:
+            self.metrics_timer.start()
+        
+        # Keeps the data age shown next to the spot name current
+        self.freshness_timer = QTimer()
+        self.freshness_timer.setInterval(60 * 1000)
+        self.freshness_timer.timeout.connect(self.update_freshness)
+        self.freshness_timer.start()
+        
+        # Styled before the widgets exist, so each is polished once
         self.setup_styling()
+        self.init_ui()
         
-        # Start with initial location
-        self.fetch_surf_data()
+        # Paint the last-viewed spot from cache; the network waits for the first paint
+        self.first_painted = False
+        self.startup_entry = self.show_cached_forecast()
         
     def init_ui(self):
         """Initialize the user interface"""
@@ -445,8 +1142,16 @@ class SurfCastApp(QMainWindow):
         # Content area with tabs
         self.tab_widget = QTabWidget()
         self.tab_widget.addTab(self.create_current_conditions_tab(), "Current")
-        self.tab_widget.addTab(self.create_forecast_tab(), "Forecast")
-        self.tab_widget.addTab(self.create_details_tab(), "Details")
+        self.forecast_tab = LazyTab(self.create_forecast_tab, self.update_forecast)
+        self.tab_widget.addTab(self.forecast_tab, "Forecast")
+        self.sessions_tab = LazyTab(self.create_sessions_tab, self.update_sessions)
+        self.tab_widget.addTab(self.sessions_tab, "Sessions")
+        self.map_tab = LazyTab(self.create_map_tab, self.update_map)
+        self.tab_widget.addTab(self.map_tab, "Map")
+        self.details_tab = LazyTab(self.create_details_tab, self.update_details)
+        self.tab_widget.addTab(self.details_tab, "Details")
+        self.tab_widget.addTab(LazyTab(DiagnosticsPanel), "Diagnostics")
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
         
         main_layout.addWidget(self.tab_widget)
         
@@ -475,12 +1180,12 @@ class SurfCastApp(QMainWindow):
         
         # Controls
         self.days_combo = QComboBox()
-        self.days_combo.addItems(["3 Days", "5 Days", "7 Days"])
-        self.days_combo.setCurrentText("3 Days")
+        self.days_combo.addItems(["3 Days", "5 Days", "7 Days", "10 Days", "16 Days"])
+        self.days_combo.setCurrentText(f"{self.selected_days} Days")
         self.days_combo.currentTextChanged.connect(self.on_days_changed)
         
         self.refresh_btn = QPushButton("Refresh")
-        self.refresh_btn.clicked.connect(self.fetch_surf_data)
+        self.refresh_btn.clicked.connect(lambda: self.fetch_surf_data(force=True))
         self.refresh_btn.setFixedWidth(100)
         self.refresh_btn.setFont(QFont("Arial", 9))
         
@@ -489,6 +1194,22 @@ class SurfCastApp(QMainWindow):
         self.favorites_btn.setFixedWidth(120)
         self.favorites_btn.setFont(QFont("Arial", 9))
         
+        self.offline_btn = QPushButton("Offline")
+        self.offline_btn.setCheckable(True)
+        self.offline_btn.setChecked(self.offline)
+        self.offline_btn.setToolTip("Show only stored forecasts, searches and maps, with no network requests")
+        self.offline_btn.toggled.connect(self.set_offline)
+        self.offline_btn.setFixedWidth(100)
+        self.offline_btn.setFont(QFont("Arial", 9))
+        
+        self.snapshot_btn = QPushButton("Snapshot")
+        snapshot_menu = QMenu(self.snapshot_btn)
+        snapshot_menu.addAction("Prefetch favorites + region and export...", self.save_snapshot)
+        snapshot_menu.addAction("Import...", self.load_snapshot)
+        self.snapshot_btn.setMenu(snapshot_menu)
+        self.snapshot_btn.setFixedWidth(110)
+        self.snapshot_btn.setFont(QFont("Arial", 9))
+        
         header_layout.addWidget(title_label)
         header_layout.addStretch()
         header_layout.addWidget(QLabel("Search:"))
@@ -496,6 +1217,8 @@ class SurfCastApp(QMainWindow):
         header_layout.addWidget(self.days_combo)
         header_layout.addWidget(self.refresh_btn)
         header_layout.addWidget(self.favorites_btn)
+        header_layout.addWidget(self.offline_btn)
+        header_layout.addWidget(self.snapshot_btn)
         
         return header_layout
     
@@ -517,7 +1240,12 @@ class SurfCastApp(QMainWindow):
         self.add_favorite_btn.setFixedWidth(150)
         self.add_favorite_btn.setFont(QFont("Arial", 9))
         
+        # How current the shown forecast is
+        self.freshness_label = QLabel()
+        self.freshness_label.setFont(QFont("Arial", 9))
+        
         location_layout.addWidget(self.location_label)
+        location_layout.addWidget(self.freshness_label)
         location_layout.addStretch()
         location_layout.addWidget(self.add_favorite_btn)
         
@@ -528,12 +1256,28 @@ class SurfCastApp(QMainWindow):
         self.conditions_grid.setSpacing(10)
         layout.addLayout(self.conditions_grid)
         
+        # Condition widgets are created once and updated in place
+        self.wave_widget = SurfConditionWidget("Wave Height", "--", "m")
+        self.wind_widget = SurfConditionWidget("Wind Speed", "--", "km/h")
+        self.period_widget = SurfConditionWidget("Swell Period", "--", "sec")
+        self.swell_dir_widget = DirectionWidget("Swell Direction", None, "#4CAF50")
+        self.wind_dir_widget = DirectionWidget("Wind Direction", None, "#FF9800")
+        
+        # Add to grid
+        self.conditions_grid.addWidget(self.wave_widget, 0, 0)
+        self.conditions_grid.addWidget(self.wind_widget, 0, 1)
+        self.conditions_grid.addWidget(self.period_widget, 0, 2)
+        self.conditions_grid.addWidget(self.swell_dir_widget, 0, 3)
+        self.conditions_grid.addWidget(self.wind_dir_widget, 0, 4)
+        
+        # Set column stretch to make boxes expand equally
+        for col in range(5):
+            self.conditions_grid.setColumnStretch(col, 1)
+        
         # Wave chart area
         wave_chart_layout = QVBoxLayout()
-        wave_chart_layout.addWidget(QLabel("Wave Height Trend:"))
-        self.wave_chart = QTextEdit()
-        self.wave_chart.setReadOnly(True)
-        self.wave_chart.setMinimumHeight(150)
+        wave_chart_layout.addWidget(QLabel("Forecast Trend:"))
+        self.wave_chart = WaveChart()
         wave_chart_layout.addWidget(self.wave_chart)
         layout.addLayout(wave_chart_layout)
         
@@ -554,19 +1298,79 @@ class SurfCastApp(QMainWindow):
         # Forecast grid
         layout.addWidget(QLabel("Extended Forecast:"))
         
-        # Create scroll area for forecast
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setFrameShape(QFrame.NoFrame)
+        # Compare the current spot with favorites side by side
+        self.compare_checkbox = QCheckBox("Compare favorites")
+        self.compare_checkbox.toggled.connect(self.on_compare_toggled)
+        layout.addWidget(self.compare_checkbox)
+        
+        # Virtualized table of day headers and hourly rows
+        self.forecast_model = ForecastTableModel(self)
+        self.forecast_view = QTableView()
+        self.forecast_view.setModel(self.forecast_model)
+        self.forecast_view.setItemDelegate(ForecastDelegate(self.forecast_view))
+        self.forecast_view.setShowGrid(False)
+        self.forecast_view.setWordWrap(False)
+        self.forecast_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.forecast_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.forecast_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        # Uniform row heights keep layout independent of the row count
+        self.forecast_view.verticalHeader().setVisible(False)
+        self.forecast_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.forecast_view.verticalHeader().setDefaultSectionSize(28)
+        # Spot columns share the width, scrolling sideways once they hit the minimum
+        header = self.forecast_view.horizontalHeader()
+        header.setMinimumSectionSize(80)
+        header.setSectionResizeMode(QHeaderView.Stretch)
+        header.setSectionResizeMode(0, QHeaderView.Fixed)
+        header.resizeSection(0, 180)
+        layout.addWidget(self.forecast_view)
         
-        # Container widget for forecast items
-        forecast_container = QWidget()
-        self.forecast_layout = QVBoxLayout(forecast_container)
-        self.forecast_layout.setSpacing(10)
-        self.forecast_layout.setAlignment(Qt.AlignTop)
+        return widget
+    
+    def create_sessions_tab(self):
+        """Create the best sessions tab ranking nearby spots and favorites"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setSpacing(10)
         
-        scroll_area.setWidget(forecast_container)
-        layout.addWidget(scroll_area)
+        self.sessions_label = QLabel()
+        self.sessions_label.setWordWrap(True)
+        layout.addWidget(self.sessions_label)
+        
+        columns = ["Spot", "When", "Score", "Swell", "Wind"]
+        self.sessions_table = QTableWidget(0, len(columns))
+        self.sessions_table.setHorizontalHeaderLabels(columns)
+        self.sessions_table.verticalHeader().setVisible(False)
+        self.sessions_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.sessions_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.sessions_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.sessions_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.sessions_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        self.sessions_table.cellDoubleClicked.connect(self.on_session_selected)
+        layout.addWidget(self.sessions_table)
+        
+        return widget
+    
+    def create_map_tab(self):
+        """Create the regional swell map tab"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setSpacing(10)
+        
+        self.map_label = QLabel()
+        self.map_label.setWordWrap(True)
+        layout.addWidget(self.map_label)
+        
+        self.swell_map = SwellMap()
+        layout.addWidget(self.swell_map, 1)
+        
+        # Forecast hour shown on the map
+        self.map_slider = QSlider(Qt.Horizontal)
+        self.map_slider.setRange(0, 0)
+        self.map_slider.valueChanged.connect(self.swell_map.set_hour)
+        layout.addWidget(self.map_slider)
         
         return widget
     
@@ -587,6 +1391,56 @@ class SurfCastApp(QMainWindow):
         
         return widget
     
+    def register_gauges(self):
+        """Expose cache hit rates and worker counts to the metrics registry"""
+        def hit_ratio(stats):
+            lookups = stats['hits'] + stats.get('stale_hits', 0) + stats['misses']
+            return stats['hits'] / lookups if lookups else 0.0
+        
+        METRICS.gauge('cache.forecast.hit_ratio', lambda: hit_ratio(self.forecast_cache.stats()))
+        METRICS.gauge('cache.forecast.entries', lambda: self.forecast_cache.stats()['size'])
+        METRICS.gauge('cache.search.hit_ratio', lambda: hit_ratio(self.search_cache.stats()))
+        METRICS.gauge('threads.python', threading.active_count)
+        METRICS.gauge('threads.workers', self.running_workers)
+        METRICS.gauge('requests.inflight', self.requests.pending)
+        if self.engine is not None:
+            METRICS.gauge('engine.tasks', self.engine.pending)
+    
+    def running_workers(self):
+        """Number of fetch and search QThreads currently running"""
+        threads = [getattr(self, 'search_thread', None), *self.fetch_threads]
+        return sum(1 for thread in threads if thread is not None and thread.isRunning())
+    
+    def export_metrics(self):
+        try:
+            METRICS.write_prometheus(self.metrics_path)
+        except OSError:
+            pass
+    
+    @property
+    def forecast_archive(self):
+        """The archive of every fetched forecast, opened on first use"""
+        if self._forecast_archive is None:
+            from surfcast.archive import ForecastArchive
+            self._forecast_archive = ForecastArchive(os.path.join(
+                os.path.dirname(self.settings.fileName()), "forecast_archive.sqlite3"))
+        return self._forecast_archive
+    
+    @property
+    def tile_store(self):
+        """The map tile store, opened on first use"""
+        if self._tile_store is None:
+            from surfcast.tiles import TileStore
+            self._tile_store = TileStore(os.path.join(os.path.dirname(self.settings.fileName()), "tiles"))
+        return self._tile_store
+    
+    def closeEvent(self, event):
+        # Background fetches may still use the cache, so it is flushed rather than closed
+        self.forecast_cache.flush()
+        if self.metrics_path:
+            self.export_metrics()
+        super().closeEvent(event)
+    
     def setup_styling(self):
         """Setup application styling"""
         self.setStyleSheet("""
@@ -635,6 +1489,18 @@ class SurfCastApp(QMainWindow):
                 background: qlineargradient(x1:0, y1:0, x2:1, y2:1, 
                     stop:0 #26C6DA, stop:1 #00ACC1);
             }
+            QPushButton:checked {
+                background: #FF9800;
+            }
+            QLabel[freshness="live"] {
+                color: #4CAF50;
+            }
+            QLabel[freshness="stale"] {
+                color: #FF9800;
+            }
+            QLabel[freshness="old"], QLabel[freshness="missing"] {
+                color: #EF5350;
+            }
             QListWidget {
                 background: rgba(0, 188, 212, 0.2);
                 border: 1px solid #00BCD4;
@@ -661,7 +1527,64 @@ class SurfCastApp(QMainWindow):
                 background: #00BCD4;
                 width: 10px;
             }
-        """)
+            QTableView {
+                background: rgba(255, 255, 255, 0.05);
+                border: 1px solid #00BCD4;
+                border-radius: 8px;
+                gridline-color: transparent;
+            }
+            QHeaderView::section {
+                background: rgba(0, 188, 212, 0.2);
+                color: white;
+                border: none;
+                padding: 4px;
+            }
+        """ + card_stylesheet())
+    
+    def on_tab_changed(self, index):
+        tab = self.tab_widget.widget(index)
+        if isinstance(tab, LazyTab):
+            tab.ensure_built()
+    
+    def load_last_spot(self):
+        """The spot viewed when the app last closed, or the default spot"""
+        try:
+            spot = json.loads(self.settings.value("last_spot", "null"))
+            return {'name': str(spot['name']), 'lat': float(spot['lat']),
+                    'lng': float(spot['lng']), 'days': int(spot['days'])}
+        except (TypeError, ValueError, KeyError):
+            return dict(DEFAULT_SPOT)
+    
+    def save_last_spot(self):
+        self.settings.setValue("last_spot", json.dumps({
+            'name': self.location_name, 'lat': self.current_location['lat'],
+            'lng': self.current_location['lng'], 'days': self.selected_days}))
+    
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_painted:
+            self.first_painted = True
+            # Runs once this paint pass has reached the screen
+            QTimer.singleShot(0, self.on_first_paint)
+    
+    def on_first_paint(self):
+        """Record startup time, then start the work deferred until the window is up"""
+        elapsed = time.perf_counter() - STARTUP_CLOCK
+        METRICS.observe('startup.first_paint', elapsed)
+        profile = os.environ.get('SURFCAST_PROFILE_STARTUP')
+        if profile:
+            phases = [(name, METRICS.last(f'startup.{name}')) for name in ('imports', 'window')]
+            print("startup: " + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in phases
+                                          if seconds is not None) +
+                  f", first paint {elapsed * 1000:.0f}ms "
+                  f"({'cached' if self.startup_entry is not None else 'no cached'} forecast)",
+                  file=sys.stderr, flush=True)
+            if profile == "exit":
+                QApplication.quit()
+                return
+        self.sync_refresh_jobs()
+        self.fetch_if_stale(self.startup_entry)
+        self.startup_entry = None
     
     def load_favorites(self):
         """Load favorites from settings"""
@@ -669,7 +1592,7 @@ class SurfCastApp(QMainWindow):
         try:
             return json.loads(favorites_json)
         except:
-            return POPULAR_SURF_SPOTS[:4]  # First 4 popular spots as default favorites
+            return [spot.to_dict() for spot in POPULAR_SURF_SPOTS[:4]]  # First 4 popular spots as default favorites
     
     def save_favorites(self):
         """Save favorites to settings"""
@@ -694,11 +1617,31 @@ class SurfCastApp(QMainWindow):
     def trigger_search(self):
         """Actually trigger the search after user stops typing"""
         query = self.search_box.text().strip()
-        if len(query) >= 2:
-            self.search_thread = LocationSearcher(query)
-            self.search_thread.results_ready.connect(self.on_search_results_ready)
-            self.search_thread.error_occurred.connect(self.on_search_error)
-            self.search_thread.start()
+        if len(query) < 2:
+            return
+        if self.engine is not None:
+            task = self.engine.submit('search', self.engine.search_locations(query, self.search_cache,
+                                                                              offline=self.offline))
+            task.add_done_callback(self.on_search_task_done)
+            return
+        self.search_thread = LocationSearcher(query, cache=self.search_cache, offline=self.offline)
+        self.search_thread.results_ready.connect(self.on_search_results_ready)
+        self.search_thread.error_occurred.connect(self.on_search_error)
+        self.search_thread.start()
+    
+    def on_search_task_done(self, task):
+        """Deliver an engine search result, ignoring superseded searches"""
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            self.on_search_results_ready(task.result())
+        elif isinstance(error, SearchError):
+            self.on_search_error(str(error))
+        elif is_timeout(error):
+            self.on_search_error("Search timed out. Please try again.")
+        else:
+            self.on_search_error(f"Search error: {str(error)}")
     
     def on_search_results_ready(self, results):
         """Handle search results"""
@@ -732,6 +1675,8 @@ class SurfCastApp(QMainWindow):
     def on_days_changed(self, text):
         """Handle days selection change"""
         self.selected_days = int(text.split()[0])
+        if self.forecast_tab.built and self.compare_checkbox.isChecked():
+            self.fetch_compare_forecasts()
         self.fetch_surf_data()
     
     def show_favorites(self):
@@ -797,44 +1742,315 @@ class SurfCastApp(QMainWindow):
         }
         
         # Check if already in favorites
-        for fav in self.favorites:
-            if (abs(fav['lat'] - new_favorite['lat']) < 0.01 and 
-                abs(fav['lng'] - new_favorite['lng']) < 0.01):
-                QMessageBox.information(self, "Info", "Location already in favorites!")
-                return
+        if self.favorites_index.within(new_favorite['lat'], new_favorite['lng'],
+                                       DUPLICATE_FAVORITE_KM):
+            QMessageBox.information(self, "Info", "Location already in favorites!")
+            return
         
         self.favorites.append(new_favorite)
+        self.favorites_index = SpatialIndex(self.favorites)
         self.save_favorites()
+        self.sync_refresh_jobs()
         QMessageBox.information(self, "Success", "Surf spot added to favorites!")
     
-    def fetch_surf_data(self):
-        """Fetch surf data in background"""
+    def fetch_surf_data(self, force=False):
+        """Show cached surf data, then fetch in background if it is stale"""
+        self.save_last_spot()
+        self.sync_refresh_jobs()
+        self.fetch_if_stale(self.show_cached_forecast(), force)
+    
+    def show_cached_forecast(self):
+        """Display the current spot's cached forecast, fresh or stale, returning its entry"""
+        cached, days = self.requests.cached(self.forecast_cache, self.current_location['lat'],
+                                            self.current_location['lng'], self.selected_days)
+        self.showing_cached = cached is not None
+        self.data_fetched_at = cached.fetched_at if cached is not None else None
+        self.data_archived = False
+        self.fetch_error = None
+        if cached is not None:
+            self.surf_data = slice_forecast(process_forecast(cached.marine_data, cached.weather_data),
+                                            self.selected_days)
+            self.update_ui_with_data()
+        return cached
+    
+    def show_archived_forecast(self):
+        """Display the current spot's newest archived forecast, as when its cache entry is gone"""
+        archived = self.forecast_archive.history(self.current_location['lat'], self.current_location['lng'], 1)
+        if not archived:
+            return False
+        self.surf_data = slice_forecast({'hourly': archived[0].hourly, 'daily': []}, self.selected_days)
+        self.showing_cached = True
+        self.data_fetched_at = archived[0].fetched_at
+        self.data_archived = True
+        self.update_ui_with_data()
+        return True
+    
+    def fetch_if_stale(self, cached, force=False):
+        """Fetch the current spot in the background unless its cached entry is fresh"""
+        lat = self.current_location['lat']
+        lng = self.current_location['lng']
+        if self.offline:
+            self.progress_bar.setVisible(False)
+            if cached is not None or self.show_archived_forecast():
+                self.status_bar.showMessage("Offline, showing stored data")
+            else:
+                self.status_bar.showMessage("Offline, no stored forecast for this spot")
+            self.update_freshness()
+            return
+        if cached is not None:
+            fetched = datetime.fromtimestamp(cached.fetched_at).strftime('%b %d %H:%M')
+            if not force and self.forecast_cache.is_fresh(cached):
+                self.progress_bar.setVisible(False)
+                self.status_bar.showMessage(f"Loaded cached data from {fetched}")
+                return
+            self.status_bar.showMessage(f"Showing data from {fetched}, refreshing...")
+        else:
+            self.status_bar.showMessage("Fetching surf data...")
+            self.update_freshness()
+        
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 0)  # Indeterminate progress
-        self.status_bar.showMessage("Fetching surf data...")
-        
-        self.data_thread = DataFetcher(
-            self.current_location['lat'], 
-            self.current_location['lng'], 
-            self.selected_days
-        )
-        self.data_thread.data_ready.connect(self.on_data_ready)
-        self.data_thread.error_occurred.connect(self.on_data_error)
-        self.data_thread.start()
+        self.requests.request(lat, lng, self.selected_days, self.on_data_ready, self.on_data_error)
+    
+    def start_fetch(self, lat, lng, days, done):
+        """Start one forecast fetch for the request manager, returning a cancellable handle"""
+        def archived(data, error):
+            if data is not None:
+                self.forecast_archive.add_async(lat, lng, data)
+            done(data, error)
+        
+        if self.engine is not None:
+            task = self.engine.submit(f"forecast:{ForecastCache.make_key(lat, lng, days)}",
+                                      self.engine.fetch_forecast(lat, lng, days, cache=self.forecast_cache))
+            task.add_done_callback(lambda task: self.on_fetch_task_done(task, archived))
+            return task
+        thread = DataFetcher(lat, lng, days, cache=self.forecast_cache)
+        thread.data_ready.connect(lambda data: archived(data, None))
+        thread.error_occurred.connect(lambda error: archived(None, error))
+        thread.finished.connect(lambda: self.fetch_threads.discard(thread))
+        self.fetch_threads.add(thread)
+        thread.start()
+        return thread
+    
+    def sync_refresh_jobs(self):
+        """Schedule auto-refresh for the current spot and every favorite"""
+        wanted = {}
+        for spot in [self.current_location] + self.favorites:
+            job = (spot['lat'], spot['lng'], self.requests.fetch_days(self.selected_days))
+            wanted.setdefault(ForecastCache.make_key(*job), job)
+        for key in self.refresh_scheduler.keys() - wanted.keys():
+            self.refresh_scheduler.remove(key)
+        for key, job in wanted.items():
+            if key not in self.refresh_scheduler:
+                # Uncached spots start within the jitter window rather than all at once
+                expires_at = self.forecast_cache.expiry(*job) or time.time()
+                self.refresh_scheduler.schedule_expiry(key, job, expires_at)
+        self.arm_refresh_timer()
+    
+    def refreshes_paused(self):
+        """Auto-refresh is paused offline and while the window is hidden or minimized"""
+        return self.offline or not self.isVisible() or self.isMinimized()
+    
+    def arm_refresh_timer(self):
+        """Point the refresh timer at the next due job"""
+        due = self.refresh_scheduler.next_due()
+        if due is None or self.refreshes_paused():
+            self.refresh_timer.stop()
+            return
+        # Re-check at least hourly so sleep or clock changes cannot strand the timer
+        self.refresh_timer.start(int(min(max(due - time.time(), 0), 3600) * 1000))
+    
+    def run_due_refreshes(self):
+        """Start due refreshes, a few at a time"""
+        if self.refreshes_paused():
+            return
+        slots = MAX_CONCURRENT_REFRESHES - self.refresh_scheduler.running()
+        for key, job in self.refresh_scheduler.pop_due(limit=max(slots, 0)):
+            self.start_refresh(key, job)
+        self.arm_refresh_timer()
+    
+    def start_refresh(self, key, job):
+        """Revalidate one spot's cached forecast in the background"""
+        expires_at = self.forecast_cache.expiry(*job)
+        if expires_at is not None and expires_at > time.time():
+            # Already refreshed, e.g. by the user opening the spot
+            self.refresh_scheduler.succeeded(key, expires_at)
+            return
+        self.requests.request(*job, on_ready=lambda data: self.on_refresh_done(key, job, data),
+                              on_error=lambda error: self.on_refresh_error(key, job, error),
+                              background=True)
+    
+    def is_current_job(self, job):
+        return job == (self.current_location['lat'], self.current_location['lng'],
+                       self.requests.fetch_days(self.selected_days))
+    
+    def on_refresh_done(self, key, job, data):
+        """Reschedule a refreshed spot and show it if it is the current one"""
+        self.refresh_scheduler.succeeded(key, self.forecast_cache.expiry(*job) or time.time())
+        if self.is_current_job(job):
+            self.surf_data = slice_forecast(data, self.selected_days)
+            self.showing_cached = False
+            self.data_fetched_at = time.time()
+            self.data_archived = False
+            self.fetch_error = None
+            self.update_ui_with_data()
+            self.status_bar.showMessage(f"Auto-refreshed at {datetime.now().strftime('%H:%M')}")
+        self.arm_refresh_timer()
+    
+    def on_refresh_error(self, key, job, error):
+        """Back off a failed refresh"""
+        self.refresh_scheduler.failed(key)
+        if self.is_current_job(job):
+            self.status_bar.showMessage(f"Auto-refresh failed, will retry: {error}")
+        self.arm_refresh_timer()
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.arm_refresh_timer()
+    
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.arm_refresh_timer()
+    
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.arm_refresh_timer()
+    
+    def on_fetch_task_done(self, task, done):
+        """Hand an engine forecast result to the request manager, unless cancelled"""
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            done(task.result(), None)
+        elif isinstance(error, FetchError):
+            done(None, str(error))
+        else:
+            done(None, f"Error fetching data: {str(error)}")
     
     def on_data_ready(self, data):
         """Handle received surf data"""
         self.surf_data = data
+        self.showing_cached = False
+        self.data_fetched_at = time.time()
+        self.data_archived = False
+        self.fetch_error = None
         self.progress_bar.setVisible(False)
-        self.status_bar.showMessage("Data loaded successfully")
+        elapsed = METRICS.last('fetch.forecast')
+        self.status_bar.showMessage(
+            f"Data loaded in {elapsed:.2f}s" if elapsed is not None else "Data loaded successfully")
         self.update_ui_with_data()
     
     def on_data_error(self, error):
-        """Handle data fetch error"""
+        """Fall back to stored data and flag it, rather than interrupting with a dialog"""
         self.progress_bar.setVisible(False)
-        self.status_bar.showMessage(f"Error: {error}")
-        QMessageBox.warning(self, "Error", f"Failed to fetch data: {error}")
+        self.fetch_error = error
+        if self.showing_cached or self.show_archived_forecast():
+            self.status_bar.showMessage(f"Offline, showing stored data: {error}")
+        else:
+            self.status_bar.showMessage(f"Error: {error}")
+        self.update_freshness()
     
+    def update_freshness(self):
+        """Show how old the displayed forecast is, in time and in model updates"""
+        prefix = "● Offline · " if self.offline else "● "
+        if self.data_fetched_at is None:
+            state = 'missing'
+            if self.offline:
+                text = prefix + "no stored forecast for this spot"
+            elif self.fetch_error is not None:
+                text = prefix + "unavailable, no stored forecast for this spot"
+            else:
+                text = prefix + "fetching..."
+            self.freshness_label.setToolTip(self.fetch_error or "")
+        else:
+            runs = ForecastCache.runs_behind(self.data_fetched_at)
+            text = prefix + f"fetched {format_age(time.time() - self.data_fetched_at)} ago"
+            if runs:
+                text += f" · {runs} model update{'s' if runs > 1 else ''} behind"
+            if self.data_archived:
+                text += " · from archive"
+            if self.fetch_error is not None:
+                text += " · refresh failed"
+            state = 'live' if not runs else 'stale' if runs < OLD_DATA_RUNS else 'old'
+            fetched = datetime.fromtimestamp(self.data_fetched_at).strftime('%b %d %H:%M')
+            self.freshness_label.setToolTip(f"Fetched {fetched}" +
+                                            (f"\nLast refresh failed: {self.fetch_error}" if self.fetch_error else ""))
+        self.freshness_label.setText(text)
+        if self.freshness_label.property('freshness') != state:
+            self.freshness_label.setProperty('freshness', state)
+            self.freshness_label.style().polish(self.freshness_label)
+    
+    def set_offline(self, offline):
+        """Switch between live fetching and stored data only"""
+        self.offline = offline
+        self.settings.setValue("offline", offline)
+        if offline:
+            self.requests.cancel()
+            self.progress_bar.setVisible(False)
+            self.status_bar.showMessage("Offline, showing stored data only")
+        self.arm_refresh_timer()
+        self.fetch_surf_data()
+        self.update_map()
+    
+    def save_snapshot(self):
+        """Prefetch the current spot, favorites and the spot's map region, then save them to a file"""
+        if self.offline:
+            self.status_bar.showMessage("Snapshots are prefetched from the network; go online first")
+            return
+        if self.snapshot_thread is not None:
+            return
+        from surfcast.snapshot import SNAPSHOT_SUFFIX
+        from surfcast.tiles import Region
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export snapshot", f"surfcast-{datetime.now():%Y%m%d}{SNAPSHOT_SUFFIX}",
+            f"SurfCast snapshot (*{SNAPSHOT_SUFFIX})")
+        if not path:
+            return
+        lat, lng = self.current_location['lat'], self.current_location['lng']
+        region = Region.containing(lat, lng)
+        spots = [{'name': self.location_name, 'lat': lat, 'lng': lng}] + self.favorites
+        spots += [spot.to_dict() for spot in POPULAR_SURF_SPOTS if region.contains(spot['lat'], spot['lng'])]
+        thread = SnapshotExporter(path, spots, self.forecast_cache, self.search_cache, self.tile_store, [region])
+        thread.progress.connect(self.status_bar.showMessage)
+        thread.exported.connect(self.on_snapshot_exported)
+        thread.error_occurred.connect(self.status_bar.showMessage)
+        thread.finished.connect(self.on_snapshot_finished)
+        self.snapshot_thread = thread
+        self.snapshot_btn.setEnabled(False)
+        thread.start()
+    
+    def on_snapshot_exported(self, counts, failures):
+        message = (f"Snapshot saved: {counts['forecasts']} forecasts, {counts['searches']} searches, "
+                   f"{counts['tiles']} map regions, {counts['bytes'] / 1024:.0f} KB")
+        if failures:
+            message += f"; {len(failures)} could not be fetched and hold older data or none"
+        self.status_bar.showMessage(message)
+    
+    def on_snapshot_finished(self):
+        self.snapshot_thread = None
+        self.snapshot_btn.setEnabled(True)
+    
+    def load_snapshot(self):
+        """Merge a snapshot file into the local caches and show what it adds"""
+        from surfcast.snapshot import SNAPSHOT_SUFFIX, SnapshotError, import_snapshot
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import snapshot", "", f"SurfCast snapshot (*{SNAPSHOT_SUFFIX});;All files (*)")
+        if not path:
+            return
+        try:
+            added = import_snapshot(path, self.forecast_cache, self.search_cache, self.tile_store)
+        except (SnapshotError, OSError) as e:
+            QMessageBox.warning(self, "Error", f"Failed to import snapshot: {e}")
+            return
+        self.session_ranker = None
+        self.fetch_surf_data()
+        self.status_bar.showMessage(
+            f"Snapshot imported: {added['forecasts']} forecasts, {added['searches']} searches, "
+            f"{added['tiles']} map regions newer than the ones stored")
+    
+    @METRICS.timed('ui.update_ui_with_data')
     def update_ui_with_data(self):
         """Update UI with surf data"""
         if not self.surf_data:
@@ -848,149 +2064,225 @@ class SurfCastApp(QMainWindow):
         
         # Update details
         self.update_details()
+        
+        # Re-rank sessions with the new forecast
+        self.update_sessions()
+        
+        # Move the map to the spot's region
+        self.update_map()
+        
+        # Say how current it is
+        self.update_freshness()
     
+    @METRICS.timed('ui.update_current_conditions')
     def update_current_conditions(self):
         """Update current conditions display"""
         if not self.surf_data or not self.surf_data['hourly']:
             return
         
-        # Clear existing widgets
-        for i in reversed(range(self.conditions_grid.count())):
-            widget = self.conditions_grid.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-        
         current = self.surf_data['hourly'][0]
         
-        # Create condition widgets with more practical surf info
-        wave_widget = SurfConditionWidget("Wave Height", f"{current['wave_height']:.1f}", "m")
-        wind_widget = SurfConditionWidget("Wind Speed", f"{current['wind_speed']:.0f}", "km/h")
-        period_widget = SurfConditionWidget("Swell Period", f"{current['swell_period']:.0f}", "sec")
-        swell_dir_widget = DirectionWidget("Swell Direction", current['swell_direction'], "#4CAF50")
-        wind_dir_widget = DirectionWidget("Wind Direction", current['wind_direction'], "#FF9800")
-        
-        # Add to grid
-        self.conditions_grid.addWidget(wave_widget, 0, 0)
-        self.conditions_grid.addWidget(wind_widget, 0, 1)
-        self.conditions_grid.addWidget(period_widget, 0, 2)
-        self.conditions_grid.addWidget(swell_dir_widget, 0, 3)
-        self.conditions_grid.addWidget(wind_dir_widget, 0, 4)
-        
-        # Set column stretch to make boxes expand equally
-        for col in range(5):
-            self.conditions_grid.setColumnStretch(col, 1)
+        self.wave_widget.set_value(f"{current['wave_height']:.1f}")
+        self.wind_widget.set_value(f"{current['wind_speed']:.0f}")
+        self.period_widget.set_value(f"{current['swell_period']:.0f}")
+        self.swell_dir_widget.set_degrees(current['swell_direction'])
+        self.wind_dir_widget.set_degrees(current['wind_direction'])
         
         # Update wave chart
         self.update_wave_chart()
     
+    @METRICS.timed('ui.update_wave_chart')
     def update_wave_chart(self):
-        """Update wave height chart"""
+        """Update forecast trend chart"""
         if not self.surf_data:
             return
         
-        # Simple ASCII chart
-        chart_text = "Wave Height (24h):\n"
-        hourly_data = self.surf_data['hourly'][:24]
-        
-        # Safely get max height
-        try:
-            max_height = max(h['wave_height'] for h in hourly_data)
-        except ValueError:
-            max_height = 1  # Default to avoid division by zero
-        
-        for i, hour in enumerate(hourly_data):
-            if i % 4 == 0:  # Every 4 hours
-                try:
-                    time = datetime.fromisoformat(hour['time'].replace('Z', '+00:00'))
-                    height = hour['wave_height']
-                    bar_length = int((height / max_height) * 20) if max_height > 0 else 0
-                    bar = "█" * bar_length
-                    chart_text += f"{time.strftime('%H:%M')} |{bar:<20}| {height:.1f}m\n"
-                except (KeyError, TypeError, ValueError):
-                    continue
-        
-        self.wave_chart.setText(chart_text)
+        self.wave_chart.set_frame(self.surf_data['hourly'])
     
+    @METRICS.timed('ui.update_forecast')
     def update_forecast(self):
         """Update forecast display"""
-        if not self.surf_data:
+        if not self.surf_data or not self.forecast_tab.built:
             return
         
-        # Clear existing forecast
-        for i in reversed(range(self.forecast_layout.count())):
-            widget = self.forecast_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-        
-        # Group hourly data by day
-        daily_forecasts = self.group_by_day(self.surf_data['hourly'])
-        
-        for day, day_data in daily_forecasts.items():
-            day_widget = self.create_day_forecast_widget(day, day_data)
-            self.forecast_layout.addWidget(day_widget)
+        series = [(self.location_name, self.surf_data['hourly'])]
+        series.extend(self.compare_forecasts.items())
+        self.forecast_model.set_forecasts(series)
     
-    def group_by_day(self, hourly_data):
-        """Group hourly data by day"""
-        daily = {}
-        for hour in hourly_data:
-            try:
-                date = datetime.fromisoformat(hour['time'].replace('Z', '+00:00')).date()
-                if date not in daily:
-                    daily[date] = []
-                daily[date].append(hour)
-            except (KeyError, ValueError):
-                continue
-        return daily
+    def on_compare_toggled(self, checked):
+        """Start or stop comparing favorites in the forecast table"""
+        self.compare_forecasts = {}
+        self.compare_thread = None
+        if checked:
+            self.fetch_compare_forecasts()
+        self.update_forecast()
     
-    def create_day_forecast_widget(self, date, day_data):
-        """Create widget for daily forecast"""
-        widget = QFrame()
-        widget.setStyleSheet("""
-            QFrame {
-                background: rgba(0, 188, 212, 0.1);
-                border: 1px solid #00BCD4;
-                border-radius: 8px;
-                padding: 10px;
-            }
-        """)
-        widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
-        
-        layout = QHBoxLayout(widget)
-        layout.setContentsMargins(10, 10, 10, 10)
-        
-        # Date
-        date_label = QLabel(date.strftime("%A, %B %d"))
-        date_label.setFont(QFont("Arial", 12, QFont.Bold))
-        date_label.setStyleSheet("color: #00BCD4;")
-        
-        # Wave stats
-        try:
-            waves = [h['wave_height'] for h in day_data]
-            max_wave = max(waves)
-            min_wave = min(waves)
-            avg_wind = sum(h['wind_speed'] for h in day_data) / len(day_data)
-            
-            # Get primary swell direction
-            swell_dirs = [h['swell_direction'] for h in day_data]
-            primary_dir = max(set(swell_dirs), key=swell_dirs.count)
-            dir_text = self.get_direction_text(primary_dir)
-            
-            stats_text = f"Waves: {min_wave:.1f}-{max_wave:.1f}m | Wind: {avg_wind:.0f}km/h | Swell: {dir_text}"
-        except (KeyError, TypeError, ValueError):
-            stats_text = "Data unavailable"
-        
-        stats_label = QLabel(stats_text)
-        stats_label.setStyleSheet("color: white;")
-        stats_label.setWordWrap(True)
-        
-        layout.addWidget(date_label, 2)
-        layout.addWidget(stats_label, 4)
-        
-        return widget
+    def fetch_compare_forecasts(self):
+        """Fetch every other favorite's forecast in batched requests"""
+        self.compare_forecasts = {}
+        spots = [fav for fav in self.favorites
+                 if haversine_km(self.current_location['lat'], self.current_location['lng'],
+                                 fav['lat'], fav['lng']) > DUPLICATE_FAVORITE_KM]
+        if not spots:
+            return
+        if self.offline:
+            for spot in spots:
+                cached, _ = self.requests.cached(self.forecast_cache, spot['lat'], spot['lng'], self.selected_days)
+                if cached is not None:
+                    data = process_forecast(cached.marine_data, cached.weather_data)
+                    self.compare_forecasts[spot['name']] = slice_forecast(data, self.selected_days)['hourly']
+            self.compare_thread = None
+            self.update_forecast()
+            return
+        # Fetched at the tier the single-spot path caches, then cut to the view
+        days = self.selected_days
+        thread = BatchForecastFetcher(spots, self.requests.fetch_days(days), archive=self.forecast_archive,
+                                      cache=self.forecast_cache)
+        thread.spot_ready.connect(
+            lambda spot, data: self.on_compare_spot_ready(thread, spot, slice_forecast(data, days)))
+        thread.error_occurred.connect(self.status_bar.showMessage)
+        thread.finished.connect(lambda: self.fetch_threads.discard(thread))
+        # Kept until it finishes, even once superseded
+        self.fetch_threads.add(thread)
+        self.compare_thread = thread
+        thread.start()
+    
+    def on_compare_spot_ready(self, thread, spot, data):
+        """Add a favorite's forecast as a column group, ignoring stale fetches"""
+        if thread is not self.compare_thread:
+            return
+        self.compare_forecasts[spot['name']] = data['hourly']
+        self.forecast_model.add_forecast(spot['name'], data['hourly'])
     
+    def session_spots(self):
+        """The current spot, catalogue spots around it and every favorite"""
+        current = {'name': self.location_name, **self.current_location}
+        nearby = SPOT_LOCATOR.within(current['lat'], current['lng'], SESSION_RADIUS_KM)
+        return [current] + [dict(spot) for spot, _ in nearby] + self.favorites
+    
+    def update_sessions(self):
+        """Rank sessions from cached forecasts, fetching spots that have none"""
+        if not self.sessions_tab.built:
+            return
+        from surfcast.rank import SessionRanker
+        days = self.requests.fetch_days(self.selected_days)
+        if self.session_ranker is None or self.session_ranker.days != days:
+            self.session_ranker = SessionRanker(days, cache=self.forecast_cache,
+                                                cache_days=self.requests.cache_days(days))
+            self.session_requested = set()
+            self.session_thread = None
+        spots = self.session_spots()
+        self.session_ranker.select(spots)
+        if self.surf_data:
+            self.session_ranker.add(spots[0], self.surf_data)
+        missing = [spot for spot in self.session_ranker.load_cached(spots)
+                   if SessionRanker.spot_key(spot) not in self.session_requested]
+        if missing and self.session_thread is None and not self.offline:
+            self.session_requested.update(SessionRanker.spot_key(spot) for spot in missing)
+            thread = BatchForecastFetcher(missing, days, archive=self.forecast_archive,
+                                          cache=self.forecast_cache)
+            thread.spot_ready.connect(lambda spot, data: self.on_session_spot_ready(thread, spot, data))
+            thread.error_occurred.connect(self.status_bar.showMessage)
+            thread.finished.connect(lambda: self.on_session_fetch_finished(thread))
+            # Kept until it finishes, even once superseded
+            self.fetch_threads.add(thread)
+            self.session_thread = thread
+            thread.start()
+        self.show_sessions()
+    
+    def on_session_spot_ready(self, thread, spot, data):
+        if thread is self.session_thread:
+            self.session_ranker.add(spot, data)
+    
+    def on_session_fetch_finished(self, thread):
+        """Show the newly fetched spots and fetch any that went missing meanwhile"""
+        self.fetch_threads.discard(thread)
+        if thread is not self.session_thread:
+            return
+        self.session_thread = None
+        self.update_sessions()
+    
+    @METRICS.timed('ui.update_sessions')
+    def show_sessions(self):
+        """Fill the sessions table from the ranker"""
+        from surfcast.rank import SESSION_HOURS
+        self.sessions = self.session_ranker.best(SESSION_COUNT, days=self.selected_days)
+        status = (f"Best {SESSION_HOURS}-hour daylight sessions in the next {self.selected_days} days "
+                  f"at {len(self.session_ranker.stack())} spots within {SESSION_RADIUS_KM:.0f} km "
+                  f"of {self.location_name} and your favorites")
+        if self.session_thread is not None:
+            status += ", fetching more"
+        self.sessions_label.setText(status + ". Double-click a session to open its spot.")
+        self.sessions_table.setRowCount(len(self.sessions))
+        for row, session in enumerate(self.sessions):
+            cells = [session.spot['name'],
+                     f"{session.start:%a %d %b %H:%M}-{session.end:%H:%M}",
+                     f"{session.score:.1f}",
+                     f"{session.swell_height:.1f}m @ {session.swell_period:.0f}s",
+                     f"{session.wind_speed:.0f}km/h"]
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if column >= 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.sessions_table.setItem(row, column, item)
+    
+    def on_session_selected(self, row, column):
+        self.go_to_favorite(self.sessions[row].spot)
+    
+    def update_map(self):
+        """Show the current spot's region from the tile store, fetching it when missing or stale"""
+        if not self.map_tab.built:
+            return
+        from surfcast.tiles import Region, model_run
+        lat, lng = self.current_location['lat'], self.current_location['lng']
+        region = Region.containing(lat, lng)
+        self.swell_map.set_spots([(spot['name'], spot['lat'], spot['lng']) for spot in POPULAR_SURF_SPOTS
+                                  if region.contains(spot['lat'], spot['lng'])], (self.location_name, lat, lng))
+        tile = self.tile_store.latest(region)
+        if tile is not None and tile is not self.swell_map.tile:
+            self.show_tile(tile)
+        # One attempt per region and model run, so a failed fetch is not retried in a loop
+        attempt = (region.key, model_run(time.time()))
+        if ((tile is None or not tile.is_fresh()) and attempt not in self.tile_requested and self.tile_thread is None
+                and not self.offline):
+            self.tile_requested.add(attempt)
+            thread = TileFetcher(self.tile_store, region)
+            thread.error_occurred.connect(self.status_bar.showMessage)
+            thread.finished.connect(lambda: self.on_tile_fetch_finished(thread))
+            self.fetch_threads.add(thread)
+            self.tile_thread = thread
+            thread.start()
+        
+        status = (f"Wave height from {region.south:.0f}° to {region.north:.0f}° latitude and "
+                  f"{region.west:.0f}° to {region.east:.0f}° longitude")
+        if tile is not None:
+            status += f", {tile.region.step:g}° grid from the {tile.run} model run"
+        elif self.offline:
+            status += ", not stored for offline use"
+        if self.tile_thread is not None:
+            status += ", updating"
+        self.map_label.setText(status + ". Drag the slider to step through the forecast; hover for details.")
+    
+    def show_tile(self, tile):
+        """Show a tile on the map, starting at the current hour for a new region"""
+        new_region = self.swell_map.tile is None or self.swell_map.tile.region != tile.region
+        self.map_slider.setRange(0, len(tile) - 1)
+        self.swell_map.set_tile(tile)
+        if new_region:
+            now = np.searchsorted(tile.timestamps, np.datetime64('now', 'm'), side='right') - 1
+            self.map_slider.setValue(min(max(int(now), 0), len(tile) - 1))
+    
+    def on_tile_fetch_finished(self, thread):
+        """Show the fetched tile and fetch the current region if the spot moved meanwhile"""
+        self.fetch_threads.discard(thread)
+        if thread is self.tile_thread:
+            self.tile_thread = None
+            self.update_map()
+    
+    @METRICS.timed('ui.update_details')
     def update_details(self):
         """Update details display"""
-        if not self.surf_data or not self.surf_data['hourly']:
+        if not self.surf_data or not self.surf_data['hourly'] or not self.details_tab.built:
             return
         
         current = self.surf_data['hourly'][0]
@@ -1011,6 +2303,12 @@ class SurfCastApp(QMainWindow):
             index = int((degrees + 11.25) / 22.5) % 16
             return directions[index]
         
+        nearby = SPOT_LOCATOR.within(self.current_location['lat'], self.current_location['lng'],
+                                     NEARBY_SPOTS_KM)[:5]
+        nearby_text = "\n".join(f"• {spot['name']} ({distance:.0f} km)" for spot, distance in nearby)
+        if not nearby:
+            nearby_text = f"• No known spots within {NEARBY_SPOTS_KM:.0f} km"
+        
         details_text = f"""
 Location: {self.location_name}
 Coordinates: {self.current_location['lat']:.4f}°N, {abs(self.current_location['lng']):.4f}°{'W' if self.current_location['lng'] < 0 else 'E'}
@@ -1030,25 +2328,41 @@ Current Conditions:
 Wave Analysis:
 • Swell Component: {safe_format(current['swell_height'] / current['wave_height'] * 100 if current['wave_height'] else 0, '{:.0f}%')}
 • Wind Wave Component: {safe_format(current['wind_wave_height'] / current['wave_height'] * 100 if current['wave_height'] else 0, '{:.0f}%')}
+
+Nearby Spots:
+{nearby_text}
 """
         self.details_text.setText(details_text)
     
     def get_direction_text(self, degrees):
         """Convert wind direction in degrees to cardinal direction"""
-        if degrees is None:
-            return "N/A"
-            
-        directions = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
-                      "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
-        try:
-            index = int((degrees + 11.25) / 22.5) % 16
-            return directions[index]
-        except (TypeError, ValueError):
-            return "N/A"
+        return compass_point(degrees)
 
 
-if __name__ == "__main__":
+def main():
+    METRICS.observe('startup.imports', time.perf_counter() - STARTUP_CLOCK)
     app = QApplication(sys.argv)
-    window = SurfCastApp()
+    try:
+        import qasync
+    except ImportError:
+        with METRICS.span('startup.window'):
+            window = SurfCastApp()
+        window.show()
+        return app.exec_()
+    
+    # Run Qt on an asyncio loop so every request shares one thread
+    import asyncio
+    from surfcast.aio import AsyncFetchEngine
+    loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    with METRICS.span('startup.window'):
+        window = SurfCastApp(engine=AsyncFetchEngine())
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    with loop:
+        loop.run_forever()
+        loop.run_until_complete(window.engine.close())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())